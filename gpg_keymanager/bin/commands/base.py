@@ -6,6 +6,8 @@
 """
 Common base command for gpg-keymanager CLI subcommands
 """
+from argparse import ArgumentParser, Namespace
+
 from cli_toolkit.command import Command
 
 from gpg_keymanager.keys.loader import UserPublicKeys
@@ -15,10 +17,26 @@ class GpgKeymanagerCommand(Command):
     """
     Common base class for gpg-keymanager subcommands
     """
+    keyring_cache: bool = False
+
+    def register_parser_arguments(self, parser: ArgumentParser) -> ArgumentParser:
+        """
+        Register common arguments for gpg-keymanager subcommands
+        """
+        parser.add_argument('--cache', action='store_true', help='Cache parsed user keyring on disk')
+        return parser
+
+    def parse_args(self, args: Namespace = None, namespace: Namespace = None) -> Namespace:
+        """
+        Parse common arguments for gpg-keymanager subcommands
+        """
+        args = super().parse_args(args, namespace)
+        self.keyring_cache = getattr(args, 'cache', False)
+        return args
 
     @property
     def user_keyring(self) -> UserPublicKeys:
         """
         Return user PGP keyring
         """
-        return UserPublicKeys()
+        return UserPublicKeys(cache=self.keyring_cache)
@@ -0,0 +1,68 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+CLI subcommand to compare user keyring to a saved keyring snapshot
+"""
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from ...exceptions import PGPKeyError
+from ...keys.snapshot import KeyringSnapshot, diff
+from .base import GpgKeymanagerCommand
+
+
+def format_expiration(value: Optional[int]) -> str:
+    """
+    Format snapshot expiration timestamp for output
+    """
+    if value is None:
+        return 'never'
+    return f'{datetime.fromtimestamp(value, tz=timezone.utc).date()}'
+
+
+class DiffKeyring(GpgKeymanagerCommand):
+    """
+    Command 'gpg-keymanager diff-keyring'
+    """
+    name = 'diff-keyring'
+
+    def register_parser_arguments(self, parser: ArgumentParser) -> ArgumentParser:
+        """
+        Register arguments for comparing keyring to snapshot
+        """
+        parser = super().register_parser_arguments(parser)
+        parser.add_argument('--update', action='store_true', help='Save current keyring to snapshot file')
+        parser.add_argument('snapshot', help='Keyring snapshot file')
+        return parser
+
+    def run(self, args: Namespace) -> None:
+        """
+        Report keys added, removed or changed since snapshot was saved
+        """
+        path = Path(args.snapshot).expanduser()
+        current = self.user_keyring.snapshot()
+        if path.exists():
+            try:
+                changes = diff(KeyringSnapshot.from_file(path), current)
+            except PGPKeyError as error:
+                self.exit(1, error)
+            for record in changes.added:
+                self.message(f'added {record}')
+            for record in changes.removed:
+                self.message(f'removed {record}')
+            for old, new in changes.validity_changed:
+                self.message(f'validity {new} {old.validity} -> {new.validity}')
+            for old, new in changes.expiration_changed:
+                self.message(
+                    f'expires {new} {format_expiration(old.expiration)} -> {format_expiration(new.expiration)}'
+                )
+        elif not args.update:
+            self.exit(1, f'No such snapshot file: {path}')
+
+        if args.update:
+            current.save(path)
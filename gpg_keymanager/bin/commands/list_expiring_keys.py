@@ -0,0 +1,50 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+CLI subcommand to list PGP keys expiring soon
+"""
+import time
+
+from argparse import ArgumentParser, Namespace
+
+from .list_public_keys import ListPublicKeys
+
+DEFAULT_EXPIRATION_DAYS = 30
+SECONDS_PER_DAY = 86400
+
+
+class ListExpiringKeys(ListPublicKeys):
+    """
+    Command 'gpg-keymanager list-expiring-keys'
+    """
+    name = 'list-expiring-keys'
+
+    def register_parser_arguments(self, parser: ArgumentParser) -> ArgumentParser:
+        """
+        Register arguments for listing expiring keys
+        """
+        parser = super().register_parser_arguments(parser)
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=DEFAULT_EXPIRATION_DAYS,
+            help=f'List keys expiring within specified days (default {DEFAULT_EXPIRATION_DAYS})'
+        )
+        parser.add_argument('--expired', action='store_true', help='Include already expired keys')
+        return parser
+
+    def run(self, args: Namespace) -> None:
+        """
+        List PGP public keys expiring within specified days, ordered by expiration date
+        """
+        now = int(time.time())
+        keyring = self.user_keyring
+        keys = keyring.get_keys_expiring_before(now + args.days * SECONDS_PER_DAY + 1)
+        if not args.expired:
+            # Both lists are ordered by expiration, expired keys are first in the list
+            keys = keys[len(keyring.get_expired_keys(now)):]
+        for key in keys:
+            self.message(self.format_key_details(key))
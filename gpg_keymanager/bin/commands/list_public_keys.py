@@ -29,6 +29,8 @@ class ListPublicKeys(GpgKeymanagerCommand):
     def run(self, args: Namespace) -> None:
         """
         List PGP public keys
+
+        Keys are printed in keyring order as soon as gpg outputs them
         """
-        for key in self.user_keyring:
+        for key in self.user_keyring.iter_keys():
             self.message(self.format_key_details(key))
@@ -0,0 +1,41 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+CLI subcommand to set owner trust of keys from a trust file
+"""
+from argparse import ArgumentParser, Namespace
+
+from ...exceptions import PGPKeyError
+from ...keys.trustdb import load_owner_trust_file
+from .base import GpgKeymanagerCommand
+
+
+class SetOwnerTrust(GpgKeymanagerCommand):
+    """
+    Command 'gpg-keymanager set-owner-trust'
+    """
+    name = 'set-owner-trust'
+
+    def register_parser_arguments(self, parser: ArgumentParser) -> ArgumentParser:
+        """
+        Register arguments for setting owner trust
+        """
+        parser = super().register_parser_arguments(parser)
+        parser.add_argument('--dry-run', action='store_true', help='Only show owner trust changes')
+        parser.add_argument('trust_file', help='File with FINGERPRINT:TRUST: lines')
+        return parser
+
+    def run(self, args: Namespace) -> None:
+        """
+        Update owner trust database to match trust file
+        """
+        try:
+            trust = load_owner_trust_file(args.trust_file)
+            changes = self.user_keyring.trustdb.update_trust(trust, dry_run=args.dry_run)
+        except PGPKeyError as error:
+            self.exit(1, error)
+        for item in changes:
+            self.message(f'set owner trust {item}')
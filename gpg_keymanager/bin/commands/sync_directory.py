@@ -0,0 +1,55 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+CLI subcommand to synchronize public key directory to user keyring
+"""
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+from ...exceptions import PGPKeyError
+from ...keys.directory import PublicKeyDirectory
+from ...keys.sync import sync_directory_to_keyring
+from .base import GpgKeymanagerCommand
+
+
+class SyncDirectory(GpgKeymanagerCommand):
+    """
+    Command 'gpg-keymanager sync-directory'
+    """
+    name = 'sync-directory'
+
+    def register_parser_arguments(self, parser: ArgumentParser) -> ArgumentParser:
+        """
+        Register arguments for synchronizing key directory to keyring
+        """
+        parser = super().register_parser_arguments(parser)
+        parser.add_argument('--delete', action='store_true', help='Delete keys not in directory from keyring')
+        parser.add_argument('--dry-run', action='store_true', help='Only show keyring changes')
+        parser.add_argument('directory', help='Public key directory')
+        return parser
+
+    def run(self, args: Namespace) -> None:
+        """
+        Import missing and updated keys from key directory to user keyring
+        """
+        path = Path(args.directory).expanduser()
+        if not path.is_dir():
+            self.exit(1, f'No such directory: {path}')
+        try:
+            changes = sync_directory_to_keyring(
+                PublicKeyDirectory(path),
+                self.user_keyring,
+                delete=args.delete,
+                dry_run=args.dry_run
+            )
+        except PGPKeyError as error:
+            self.exit(1, error)
+        for key in changes.missing:
+            self.message(f'import {key.key_id} {key.primary_user_id}')
+        for key in changes.updated:
+            self.message(f'update {key.key_id} {key.primary_user_id}')
+        for key in changes.removed:
+            self.message(f'delete {key.key_id} {key.primary_user_id}')
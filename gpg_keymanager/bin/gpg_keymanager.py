@@ -8,7 +8,11 @@ CLI command gpg-keymanager
 """
 from cli_toolkit.script import Script
 
+from .commands.diff_keyring import DiffKeyring
+from .commands.list_expiring_keys import ListExpiringKeys
 from .commands.list_public_keys import ListPublicKeys
+from .commands.set_owner_trust import SetOwnerTrust
+from .commands.sync_directory import SyncDirectory
 
 
 class GpgKeymanager(Script):
@@ -17,6 +21,10 @@ class GpgKeymanager(Script):
     """
     subcommands = (
         ListPublicKeys,
+        ListExpiringKeys,
+        DiffKeyring,
+        SetOwnerTrust,
+        SyncDirectory,
     )
 
 
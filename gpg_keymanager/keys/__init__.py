@@ -7,4 +7,5 @@
 Module to load PGP public keys from user keyring and directories
 """
 # flake8: noqa: F401
-from .loader import UserPublicKeys
+from .keybox import KeyboxPublicKeys
+from .loader import UserPublicKeys, load_user_keyrings
@@ -6,42 +6,79 @@
 """
 Common base classes for GPG key processing
 """
+import threading
+
 from collections.abc import MutableSequence
-from typing import Any, Iterator, List, Optional, Union
+from functools import wraps
+from typing import Any, Callable, Iterator, List, Optional, Union
 
 from ..exceptions import PGPKeyError
 
 
+def synchronized(method: Callable) -> Callable:
+    """
+    Decorator to run collection method while holding the collection lock
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.__lock__:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class GPGItemCollection(MutableSequence):
     """
     List of gpg data items
+
+    Iterating the collection returns an independent iterator over a snapshot of the items,
+    allowing nested iteration and modifying the collection while iterating. Loading and
+    modifying the collection is guarded by a reentrant lock, so a loaded collection can be
+    shared between threads.
+
+    Calling next() directly on the collection uses a shared cursor for backwards compatibility.
     """
     __gpg_args__: List[str]
     __loaded__: bool
     __iter_items__: List[Any]
+    __lock__: threading.RLock
 
     def __init__(self, **kwargs):
+        self.__lock__ = threading.RLock()
         self.__items__ = kwargs.get('keys', [])
         self.__gpg_args__ = []
         self.__loaded__ = self.__items__ != []
         self.__iter_items__ = None
 
-    def __iter__(self) -> Iterator['GPGItemCollection']:
-        if not self.is_loaded:
-            self.load()
-        return self
+    @synchronized
+    def __iter__(self) -> Iterator[Any]:
+        self.__ensure_loaded__()
+        return iter(list(self.__items__))
 
+    @synchronized
     def __next__(self) -> Any:
         if self.__iter_items__ is None:
-            if not self.is_loaded:
-                self.load()
-            self.__iter_items__ = iter(self.__items__)
+            self.__ensure_loaded__()
+            self.__iter_items__ = iter(list(self.__items__))
         try:
             return next(self.__iter_items__)
         except StopIteration as error:
             self.__iter_items__ = None
             raise StopIteration from error
 
+    def __ensure_loaded__(self) -> None:
+        """
+        Load collection if it is not yet loaded
+
+        Loading is done while holding the collection lock, so concurrent callers load the
+        collection only once
+        """
+        if self.is_loaded:
+            return
+        with self.__lock__:
+            if not self.is_loaded:
+                self.load()
+
+    @synchronized
     def __delitem__(self, index) -> None:
         """
         Remove key from collection
@@ -52,8 +89,7 @@ class GPGItemCollection(MutableSequence):
         """
         Get key from collection
         """
-        if not self.is_loaded:
-            self.load()
+        self.__ensure_loaded__()
         if isinstance(item, int):
             try:
                 return self.__items__[item]
@@ -65,25 +101,24 @@ class GPGItemCollection(MutableSequence):
         """
         Return number of keys
         """
-        if not self.is_loaded:
-            self.load()
+        self.__ensure_loaded__()
         return len(self.__items__)
 
+    @synchronized
     def __setitem__(self, index: int, key: Any) -> None:
         """
         Set key to collection
         """
         self.__items__[index] = key
 
+    @synchronized
     def __remove_key__(self, key_id: int) -> None:
         """
         Remove key by ID from loaded identities
 
         This does NOT remove key from keyring or filesystem
         """
-        for index, key in enumerate(self.__items__):
-            if key.match_key_id(key_id):
-                del self.__items__[index]
+        self.__items__[:] = [key for key in self.__items__ if not key.match_key_id(key_id)]
 
     @property
     def is_loaded(self) -> bool:
@@ -92,6 +127,7 @@ class GPGItemCollection(MutableSequence):
         """
         return self.__loaded__
 
+    @synchronized
     def clear(self) -> None:
         """
         Clear key collection and set loaded status to False
@@ -107,6 +143,7 @@ class GPGItemCollection(MutableSequence):
         """
         return self.__items__.count(value)
 
+    @synchronized
     def insert(self, index: int, value: Any) -> None:
         """
         Insert key to collection
@@ -134,6 +171,7 @@ class FingerprintObject:
     """
     Generic key object with 'fingerprint' attribute used for sorting
     """
+    __slots__ = ()
     fingerprint: Optional[str] = None
 
     def __repr__(self):
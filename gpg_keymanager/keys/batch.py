@@ -0,0 +1,155 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Batched changes to user keyring
+
+Key imports and deletions are queued and applied with one gpg command per operation type
+"""
+from pathlib import Path
+from subprocess import run, PIPE
+from tempfile import TemporaryDirectory
+from typing import Dict, Iterable, List, Tuple, Union, TYPE_CHECKING
+
+from ..exceptions import PGPKeyError
+
+from .index import normalize_key_id
+from .public_key import PublicKey
+from .utils import gpg_command
+
+if TYPE_CHECKING:
+    from .loader import UserPublicKeys
+
+GPG_STATUS_PREFIX = '[GNUPG:] '
+GPG_STATUS_IMPORT_OK = 'IMPORT_OK'
+
+
+def parse_import_status(lines: Iterable[str]) -> List[str]:
+    """
+    Return fingerprints of keys imported or unchanged from gpg --import status output lines
+    """
+    fingerprints = {}
+    for line in lines:
+        if not line.startswith(GPG_STATUS_PREFIX):
+            continue
+        fields = line[len(GPG_STATUS_PREFIX):].split()
+        if len(fields) >= 3 and fields[0] == GPG_STATUS_IMPORT_OK:
+            fingerprints[fields[2].upper()] = True
+    return list(fingerprints)
+
+
+class KeyringBatch:
+    """
+    Queue of key imports and deletions for user keyring
+
+    Queued changes are applied with flush(), or when the batch is used as context manager
+    and the block exits without errors. Imports are applied with one gpg --import command
+    and deletions with one gpg --delete-keys command. Loaded keys and indexes of the
+    keyring are updated in place.
+    """
+    keyring: 'UserPublicKeys'
+    imports: List[Union[Path, bytes]]
+    deletions: Dict[str, PublicKey]
+
+    def __init__(self, keyring: 'UserPublicKeys') -> None:
+        self.keyring = keyring
+        self.imports = []
+        self.deletions = {}
+
+    def __enter__(self) -> 'KeyringBatch':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self.imports) + len(self.deletions)
+
+    def import_key(self, value: Union[str, Path, bytes]) -> None:
+        """
+        Queue key for import from key file path or exported key data as bytes
+        """
+        if isinstance(value, (bytes, bytearray)):
+            self.imports.append(bytes(value))
+        else:
+            self.imports.append(Path(value).expanduser())
+
+    def delete_key(self, value: Union[str, PublicKey]) -> None:
+        """
+        Queue key in keyring for deletion by key object, key ID or fingerprint
+        """
+        key = value if isinstance(value, PublicKey) else self.keyring.get(value)
+        self.deletions[normalize_key_id(key.fingerprint)] = key
+
+    def __flush_deletions__(self, deletions: Dict[str, PublicKey]) -> List[str]:
+        """
+        Delete keys from keyring with one gpg command and remove them from loaded keys
+        """
+        fingerprints = list(deletions)
+        response = run(
+            gpg_command('--batch', '--yes', '--delete-keys', *fingerprints, homedir=self.keyring.homedir),
+            stdout=PIPE,
+            stderr=PIPE,
+            check=False
+        )
+        if response.returncode != 0:
+            # Some of the keys may have been deleted, reload the keys from keyring
+            self.keyring.refresh(*fingerprints)
+            raise PGPKeyError(f'Error deleting keys from keyring: {response.stderr}')
+        self.keyring.__remove_items__(deletions.values())
+        return fingerprints
+
+    def __flush_imports__(self, imports: List[Union[Path, bytes]]) -> List[PublicKey]:
+        """
+        Import keys to keyring with one gpg command and refresh imported keys in loaded keys
+        """
+        with TemporaryDirectory() as tmpdir:
+            paths = []
+            for index, value in enumerate(imports):
+                if isinstance(value, bytes):
+                    path = Path(tmpdir, f'import-{index}.key')
+                    path.write_bytes(value)
+                    value = path
+                paths.append(str(value))
+            response = run(
+                gpg_command('--batch', '--status-fd', '1', '--import', *paths, homedir=self.keyring.homedir),
+                stdout=PIPE,
+                stderr=PIPE,
+                check=False
+            )
+        fingerprints = parse_import_status(response.stdout.decode('utf-8', errors='replace').splitlines())
+        keys = self.keyring.refresh(*fingerprints) if fingerprints else []
+        if response.returncode != 0:
+            raise PGPKeyError(f'Error importing keys to keyring: {response.stderr}')
+        return keys
+
+    def flush(self) -> Tuple[List[PublicKey], List[str]]:
+        """
+        Apply queued imports and deletions to keyring
+
+        Imports are applied before deletions, and deletions are applied even if imports fail.
+        Returns imported keys and fingerprints of deleted keys. Errors are raised after both
+        have been applied, and the queue is cleared even if applying the changes fails.
+        """
+        imports, self.imports = self.imports, []
+        deletions, self.deletions = self.deletions, {}
+        imported = []
+        deleted = []
+        errors = []
+        with self.keyring.__lock__:
+            if imports:
+                try:
+                    imported = self.__flush_imports__(imports)
+                except PGPKeyError as error:
+                    errors.append(str(error))
+            if deletions:
+                try:
+                    deleted = self.__flush_deletions__(deletions)
+                except PGPKeyError as error:
+                    errors.append(str(error))
+        if errors:
+            raise PGPKeyError('\n'.join(errors))
+        return imported, deleted
@@ -0,0 +1,422 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Persistent on-disk cache for gpg keyring listing output and public key directory files
+
+Cached keyring data is invalidated when any of the keyring files in GnuPG home directory
+changes inode, size or modification time, and when any listed key expires or the trust
+database next check date passes. Cached key directory files are invalidated when the file
+content changes.
+"""
+import hashlib
+import json
+import os
+import time
+
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .constants import (
+    CACHE_DIRECTORY_ENV_VAR,
+    DEFAULT_CACHE_DIRECTORY,
+    FIELD_EXPIRATION_DATE,
+    KEY_DIRECTORY_INDEX_VERSION,
+    KEY_FIELD_INDEXES,
+    KEYRING_CACHE_FILES,
+    KEYRING_CACHE_VERSION,
+    KeyRecordType,
+)
+from .utils import get_gnupg_homedir
+
+# Records with expiration dates affecting validity in gpg key listing output
+EXPIRING_RECORD_TYPES = (
+    KeyRecordType.PUBLIC_KEY.value,
+    KeyRecordType.SUB_KEY.value,
+    KeyRecordType.USER_ID.value,
+)
+EXPIRATION_FIELD_INDEX = KEY_FIELD_INDEXES[FIELD_EXPIRATION_DATE]
+# Date of next trust database check in trust database record
+TRUSTDB_NEXT_CHECK_FIELD_INDEX = 4
+
+
+def get_cache_directory() -> Path:
+    """
+    Return default cache directory for gpg-keymanager
+    """
+    cache_home = os.environ.get(CACHE_DIRECTORY_ENV_VAR, None)
+    if cache_home:
+        return Path(cache_home).expanduser().joinpath('gpg-keymanager')
+    return Path(DEFAULT_CACHE_DIRECTORY).expanduser()
+
+
+def write_cache_file(path: Path, filename: Path, data: Dict[str, Any]) -> None:
+    """
+    Write cache data as JSON atomically to file in cache directory
+
+    Errors writing the file are ignored, since cache is only an optimization. Temporary
+    file is removed if the file can't be written.
+    """
+    tmpfile = None
+    try:
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with NamedTemporaryFile('w', encoding='utf-8', dir=path, delete=False) as filedescriptor:
+            tmpfile = Path(filedescriptor.name)
+            json.dump(data, filedescriptor)
+        os.replace(tmpfile, filename)
+        tmpfile = None
+    except OSError:
+        pass
+    finally:
+        if tmpfile is not None:
+            try:
+                tmpfile.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+def get_output_expiration(lines: Iterable[str], timestamp: Optional[float] = None) -> Optional[int]:
+    """
+    Return first future key expiration or trust database check date in gpg listing output
+
+    Validity in gpg output changes at this time even if keyring files are not modified.
+    Returns None if no keys expire and no trust database check is scheduled.
+    """
+    timestamp = timestamp if timestamp is not None else time.time()
+    expires = None
+    for line in lines:
+        fields = line.rstrip('\r\n').split(':')
+        if fields[0] in EXPIRING_RECORD_TYPES:
+            index = EXPIRATION_FIELD_INDEX
+        elif fields[0] == KeyRecordType.TRUST_DATABASE.value:
+            index = TRUSTDB_NEXT_CHECK_FIELD_INDEX
+        else:
+            continue
+        try:
+            value = int(fields[index])
+        except (IndexError, ValueError):
+            continue
+        if value > timestamp and (expires is None or value < expires):
+            expires = value
+    return expires
+
+
+def get_file_checksum(path: Path) -> str:
+    """
+    Return SHA-256 checksum of file contents
+    """
+    with path.open('rb') as filedescriptor:
+        return hashlib.sha256(filedescriptor.read()).hexdigest()
+
+
+class KeyringCache:
+    """
+    Cache for gpg key listing command output lines
+
+    Cache files are keyed by GnuPG home directory and gpg command arguments
+    """
+    path: Path
+    homedir: Path
+
+    def __init__(self,
+                 path: Optional[Union[str, Path]] = None,
+                 homedir: Optional[Union[str, Path]] = None) -> None:
+        self.path = Path(path).expanduser() if path is not None else get_cache_directory()
+        self.homedir = get_gnupg_homedir(homedir)
+
+    def __repr__(self) -> str:
+        return str(self.path)
+
+    @property
+    def fingerprint(self) -> List[List[Union[str, int, None]]]:
+        """
+        Return inode, size and modification time of keyring files in GnuPG home directory
+        """
+        fingerprint = []
+        for filename in KEYRING_CACHE_FILES:
+            try:
+                stat = self.homedir.joinpath(filename).stat()
+                fingerprint.append([filename, stat.st_ino, stat.st_size, stat.st_mtime_ns])
+            except FileNotFoundError:
+                fingerprint.append([filename, None, None, None])
+        return fingerprint
+
+    def get_filename(self, command: List[str]) -> Path:
+        """
+        Return cache file path for gpg command
+        """
+        key = json.dumps([str(self.homedir), list(command)])
+        return self.path.joinpath(f'keyring-{hashlib.sha256(key.encode("utf-8")).hexdigest()}.json')
+
+    def read(self, command: List[str], timestamp: Optional[float] = None) -> Optional[List[str]]:
+        """
+        Read cached output lines for gpg command
+
+        Returns None if no cached data exists, keyring files have changed or a key in the
+        cached output has expired or trust database check date has passed by the timestamp,
+        defaulting to current time.
+        """
+        try:
+            with self.get_filename(command).open('r', encoding='utf-8') as filedescriptor:
+                data = json.load(filedescriptor)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != KEYRING_CACHE_VERSION:
+            return None
+        if data.get('fingerprint') != self.fingerprint:
+            return None
+        expires = data.get('expires', None)
+        if expires is not None and (timestamp if timestamp is not None else time.time()) >= expires:
+            return None
+        return data.get('lines', None)
+
+    def write(self,
+              command: List[str],
+              lines: List[str],
+              fingerprint: List[List[Union[str, int, None]]],
+              timestamp: Optional[float] = None) -> None:
+        """
+        Write gpg command output lines to cache
+
+        Fingerprint must be the keyring fingerprint collected before the command was run. Data
+        is not cached if keyring files were modified while the command was running. Cached
+        data expires when the first key in the output expires or trust database is due for
+        check after the timestamp, defaulting to current time.
+        """
+        if fingerprint != self.fingerprint:
+            return
+        lines = list(lines)
+        data = {
+            'version': KEYRING_CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'expires': get_output_expiration(lines, timestamp),
+            'lines': lines,
+        }
+        write_cache_file(self.path, self.get_filename(command), data)
+
+    def clear(self) -> None:
+        """
+        Remove all cached keyring data files
+        """
+        if not self.path.is_dir():
+            return
+        for filename in self.path.glob('keyring-*.json'):
+            filename.unlink()
+
+
+class KeyDirectoryIndex:
+    """
+    Persistent index of parsed keys in public key directory files
+
+    Keys are stored as gpg colon listing records for each file by path relative to the
+    directory, with file size, modification time and content checksum. Files with same
+    size and modification time are used without reading them. Files with changed
+    modification time are checksummed and only parsed again if the content has changed.
+
+    Validity of cached keys is computed when the file was parsed. Cached keys are parsed
+    again when any key in the file expires.
+
+    Fingerprints and emails of keys in the files can be stored separately from the parsed
+    keys, for finding files with keys without loading the files. With persistent=False the
+    index is only kept in memory.
+    """
+    path: Path
+    directory: Path
+    persistent: bool
+    files: Dict[str, Dict[str, Any]]
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 path: Optional[Union[str, Path]] = None,
+                 persistent: bool = True) -> None:
+        self.path = Path(path).expanduser() if path is not None else get_cache_directory()
+        self.directory = Path(directory).expanduser().resolve()
+        self.persistent = persistent
+        self.files = {}
+        self.__loaded__ = not persistent
+        self.__modified__ = False
+
+    def __repr__(self) -> str:
+        return str(self.filename)
+
+    def __len__(self) -> int:
+        self.load()
+        return len(self.files)
+
+    @property
+    def filename(self) -> Path:
+        """
+        Return index file path for the key directory
+        """
+        key = hashlib.sha256(str(self.directory).encode('utf-8')).hexdigest()
+        return self.path.joinpath(f'directory-{key}.json')
+
+    def get_relative_path(self, path: Union[str, Path]) -> str:
+        """
+        Return index key for file in the directory
+        """
+        return str(Path(path).expanduser().resolve().relative_to(self.directory))
+
+    @staticmethod
+    def get_file_state(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+        """
+        Return size and modification time of file or None if file can't be accessed
+        """
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def load(self) -> None:
+        """
+        Load index from disk, ignoring missing or incompatible index files
+        """
+        if self.__loaded__:
+            return
+        self.__loaded__ = True
+        try:
+            with self.filename.open('r', encoding='utf-8') as filedescriptor:
+                data = json.load(filedescriptor)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != KEY_DIRECTORY_INDEX_VERSION:
+            return
+        if data.get('directory') != str(self.directory) or not isinstance(data.get('files'), dict):
+            return
+        self.files = data['files']
+
+    def __get_entry__(self, path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        Return index entry for file in the directory if file contents have not changed
+        """
+        self.load()
+        entry = self.files.get(self.get_relative_path(path), None)
+        state = self.get_file_state(path)
+        if entry is None or state is None:
+            return None
+        if [entry.get('size'), entry.get('mtime')] != list(state):
+            if entry.get('size') != state[0]:
+                return None
+            try:
+                if get_file_checksum(Path(path)) != entry.get('checksum'):
+                    return None
+            except OSError:
+                return None
+            entry['mtime'] = state[1]
+            self.__modified__ = True
+        return entry
+
+    def read(self, path: Union[str, Path], timestamp: Optional[int] = None) -> Optional[List[str]]:
+        """
+        Read cached key records for file in the directory
+
+        Returns None if file is not indexed, file contents have changed or any of the cached
+        keys has expired since the file was parsed.
+        """
+        entry = self.__get_entry__(path)
+        if entry is None:
+            return None
+        expires = entry.get('expires', None)
+        if expires is not None and expires <= (timestamp if timestamp is not None else time.time()):
+            return None
+        return entry.get('lines', None)
+
+    def read_identities(self, path: Union[str, Path]) -> Optional[Dict[str, List[str]]]:
+        """
+        Read cached fingerprints and emails of keys in file in the directory
+
+        Returns None if file is not indexed or file contents have changed
+        """
+        entry = self.__get_entry__(path)
+        if entry is None:
+            return None
+        return entry.get('identities', None)
+
+    def write(self,
+              path: Union[str, Path],
+              lines: Optional[List[str]],
+              state: Optional[Tuple[int, int]],
+              expires: Optional[int] = None,
+              identities: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        Store key records for file in the directory
+
+        State must be the file state collected before the file was parsed. Records are not
+        stored if the file was modified while it was parsed. Expires is the first expiration
+        timestamp of keys in the file after the file was parsed.
+        """
+        self.load()
+        if state is None or state != self.get_file_state(path):
+            return
+        try:
+            checksum = get_file_checksum(Path(path))
+        except OSError:
+            return
+        self.files[self.get_relative_path(path)] = {
+            'size': state[0],
+            'mtime': state[1],
+            'checksum': checksum,
+            'expires': expires,
+            'lines': list(lines) if lines is not None else None,
+            'identities': identities,
+        }
+        self.__modified__ = True
+
+    def write_identities(self,
+                         path: Union[str, Path],
+                         identities: Dict[str, List[str]],
+                         state: Optional[Tuple[int, int]]) -> None:
+        """
+        Store fingerprints and emails of keys in file in the directory
+
+        Cached key records are kept if file contents have not changed
+        """
+        entry = self.__get_entry__(path)
+        if entry is None or state != self.get_file_state(path):
+            self.write(path, None, state, identities=identities)
+        elif entry.get('identities') != identities:
+            entry['identities'] = identities
+            self.__modified__ = True
+
+    def prune(self, paths: Iterable[Union[str, Path]]) -> None:
+        """
+        Remove files not in specified paths from index
+        """
+        self.load()
+        existing = set(self.get_relative_path(path) for path in paths)
+        for relative_path in list(self.files):
+            if relative_path not in existing:
+                del self.files[relative_path]
+                self.__modified__ = True
+
+    def save(self) -> None:
+        """
+        Write index to disk if it has been modified
+        """
+        if not self.__modified__ or not self.persistent:
+            return
+        data = {
+            'version': KEY_DIRECTORY_INDEX_VERSION,
+            'directory': str(self.directory),
+            'files': self.files,
+        }
+        write_cache_file(self.path, self.filename, data)
+        self.__modified__ = False
+
+    def clear(self) -> None:
+        """
+        Remove index file and indexed data
+        """
+        self.files = {}
+        self.__loaded__ = True
+        self.__modified__ = False
+        if not self.persistent:
+            return
+        try:
+            self.filename.unlink()
+        except FileNotFoundError:
+            pass
@@ -9,7 +9,7 @@ Constants for PGP key file parsing
 Based on documentation in
 http://git.gnupg.org/cgi-bin/gitweb.cgi?p=gnupg.git;a=blob_plain;f=doc/DETAILS
 """
-from enum import Enum
+from enum import Enum, IntFlag
 
 # Extensions of files parsed as public key files
 PUBLIC_KEY_FILE_EXTENSIONS = (
@@ -56,13 +56,44 @@ class KeyValidityTrust(Enum):
     WELL_KNOWN = 'well-known'
 
 
+class KeyCapabilityFlag(IntFlag):
+    """
+    Key capabilities as integer bitmask flags
+    """
+    NONE = 0
+    ENCRYPT = 1
+    SIGN = 2
+    CERTIFY = 4
+    AUTHENTICATION = 8
+    UNKNOWN = 16
+
+
+class KeyValidityFlag(IntFlag):
+    """
+    Key validity values as integer bitmask flags
+    """
+    NONE = 0
+    UNKNOWN = 1
+    INVALID = 2
+    DISABLED = 4
+    REVOKED = 8
+    EXPIRED = 16
+    SPECIAL = 32
+    MARGINAL = 64
+    FULL = 128
+    ULTIMATE = 256
+    WELL_KNOWN = 512
+
+
 class KeyRecordType(Enum):
     """
     Types of data in key records
     """
     FINGERPRINT = 'fpr'
     PUBLIC_KEY = 'pub'
+    SECRET_KEY = 'sec'
     SUB_KEY = 'sub'
+    TRUST_DATABASE = 'tru'
     USER_ATTRIBUTE = 'uat'
     USER_ID = 'uid'
 
@@ -119,6 +150,42 @@ KEY_VALIDITY_FLAGS = {
     'w': KeyValidityTrust.WELL_KNOWN,
 }
 
+# Capability flags for key capability field values and capability enums
+KEY_CAPABILITY_FLAGS = {
+    'e': KeyCapabilityFlag.ENCRYPT,
+    's': KeyCapabilityFlag.SIGN,
+    'c': KeyCapabilityFlag.CERTIFY,
+    'a': KeyCapabilityFlag.AUTHENTICATION,
+    '?': KeyCapabilityFlag.UNKNOWN,
+}
+KEY_CAPABILITY_ENUM_FLAGS = dict(
+    (KEY_CAPABILITIES[value], flag) for value, flag in KEY_CAPABILITY_FLAGS.items()
+)
+
+# Validity flags for gpg key validity field values
+KEY_VALIDITY_BITMASKS = {
+    'o': KeyValidityFlag.UNKNOWN,
+    'i': KeyValidityFlag.INVALID,
+    'd': KeyValidityFlag.DISABLED,
+    'r': KeyValidityFlag.REVOKED,
+    'e': KeyValidityFlag.EXPIRED,
+    '-': KeyValidityFlag.UNKNOWN,
+    'q': KeyValidityFlag.UNKNOWN,
+    'n': KeyValidityFlag.INVALID,
+    's': KeyValidityFlag.SPECIAL,
+    'm': KeyValidityFlag.MARGINAL,
+    'f': KeyValidityFlag.FULL,
+    'u': KeyValidityFlag.ULTIMATE,
+    'w': KeyValidityFlag.WELL_KNOWN,
+}
+
+# Key validity trust levels from lowest to highest for minimum validity checks
+KEY_VALIDITY_TRUST_LEVELS = (
+    (KeyValidityTrust.MARGINAL, KeyValidityFlag.MARGINAL),
+    (KeyValidityTrust.FULL, KeyValidityFlag.FULL),
+    (KeyValidityTrust.ULTIMATE, KeyValidityFlag.ULTIMATE),
+)
+
 # String representations of trust values
 TRUSTDB_TRUST_LABELS = {
     KeyTrustDB.UNKNOWN: 'unknown',
@@ -158,3 +225,21 @@ KEY_DATE_FIELDS = (
     'expiration_date',
     'last_update',
 )
+
+# Environment variable and default path for GnuPG home directory
+GNUPG_HOME_ENV_VAR = 'GNUPGHOME'
+DEFAULT_GNUPG_HOME = '~/.gnupg'
+
+# Files in GnuPG home directory used to detect keyring changes
+KEYRING_CACHE_FILES = (
+    'pubring.kbx',
+    'pubring.gpg',
+    'trustdb.gpg',
+)
+KEYRING_CACHE_VERSION = 2
+KEY_DIRECTORY_INDEX_VERSION = 1
+DEFAULT_CACHE_DIRECTORY = '~/.cache/gpg-keymanager'
+CACHE_DIRECTORY_ENV_VAR = 'XDG_CACHE_HOME'
+
+# Index of each field in colon separated key records
+KEY_FIELD_INDEXES = dict((field, index) for index, field in enumerate(KEY_FIELDS))
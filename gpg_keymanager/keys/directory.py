@@ -5,19 +5,117 @@
 #
 """
 Public key archive filesystem directory loader
+
+Key files in a directory are loaded with gpg --show-keys commands listing many files at
+once. Keys in gpg output are mapped back to the files by primary key fingerprints read
+from the files. Alternatively keys can be parsed from the files without running gpg.
+
+Loaded keys can be stored in a persistent index, so only files changed since the previous
+load are loaded again. Chunks of key files can be loaded in parallel with a thread pool.
+
+Key lookups only load files with matching keys, found by fingerprints in filenames or by
+fingerprints and emails scanned from the files.
 """
+import math
 import pathlib
-from typing import Any, List, Optional, TYPE_CHECKING
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union, TYPE_CHECKING
 
 from pathlib_tree.tree import Tree, TreeItem
 
+from ..exceptions import PGPKeyError
+
+from .base import synchronized
+from .cache import KeyDirectoryIndex
 from .constants import PUBLIC_KEY_FILE_EXTENSIONS
+from .index import KeyFileIndex
 from .loader import PublicKeyDataParser
+from .openpgp import read_key_fingerprints, read_key_identities, read_public_keys
+from .utils import gpg_command
 
 if TYPE_CHECKING:
     from ..store import PasswordStore
     from .public_key import PublicKey
 
+# Maximum number of key files listed with one gpg --show-keys command
+SHOW_KEYS_BATCH_SIZE = 256
+
+# Key file names with primary key fingerprint, like 0x<fingerprint>.asc
+RE_FINGERPRINT_FILENAME = re.compile(r'^(?:0x)?(?P<fingerprint>[0-9a-fA-F]{40}|[0-9a-fA-F]{64})$')
+
+
+def get_expected_fingerprints(keyfile: 'PublicKeyFile') -> Optional[List[str]]:
+    """
+    Return primary key fingerprints in key file, or None if file can't be loaded in batches
+
+    Files without detected keys or with unsupported key versions are loaded separately,
+    raising errors from gpg like when loading the file alone.
+    """
+    try:
+        fingerprints = read_key_fingerprints(keyfile)
+    except PGPKeyError:
+        return None
+    if not fingerprints or None in fingerprints:
+        return None
+    return fingerprints
+
+
+def get_next_expiration(keys: List['PublicKey'], timestamp: Optional[float] = None) -> Optional[int]:
+    """
+    Return first future expiration timestamp of keys and sub keys, or None if none expire
+    """
+    timestamp = timestamp if timestamp is not None else time.time()
+    expirations = [
+        item.expiration_timestamp
+        for key in keys
+        for item in [key, *key.sub_keys]
+        if item.expiration_timestamp is not None and item.expiration_timestamp > timestamp
+    ]
+    return min(expirations) if expirations else None
+
+
+def get_key_identities(keys: List['PublicKey']) -> Dict[str, List[str]]:
+    """
+    Return primary key fingerprints, sub key fingerprints and emails of loaded keys
+    """
+    return {
+        'fingerprints': [str(key.fingerprint) for key in keys if key.fingerprint is not None],
+        'sub_keys': [
+            str(sub_key.fingerprint)
+            for key in keys for sub_key in key.sub_keys
+            if sub_key.fingerprint is not None
+        ],
+        'emails': [user_id.email.lower() for key in keys for user_id in key.user_ids],
+    }
+
+
+def match_file_keys(expected: List[Tuple['PublicKeyFile', List[str]]],
+                    keys: List['PublicKey']) -> Dict['PublicKeyFile', List['PublicKey']]:
+    """
+    Map keys listed from multiple files with one gpg command back to the files
+
+    Keys are listed in file order, so each file gets the next keys in output if their
+    fingerprints match the fingerprints read from the file. If gpg skipped any keys in
+    a file, the file is not matched and output keys from the file are skipped.
+    """
+    matches = {}
+    offset = 0
+    for keyfile, fingerprints in expected:
+        count = len(fingerprints)
+        file_keys = keys[offset:offset + count]
+        if [str(key.fingerprint) for key in file_keys] == fingerprints:
+            matches[keyfile] = file_keys
+            offset += count
+            continue
+        for fingerprint in fingerprints:
+            if offset < len(keys) and str(keys[offset].fingerprint) == fingerprint:
+                offset += 1
+    return matches
+
 
 class PublicKeyFile(TreeItem, PublicKeyDataParser):
     """
@@ -48,12 +146,53 @@ class PublicKeyFile(TreeItem, PublicKeyDataParser):
         """
         return ['--show-keys'] + [str(self)]
 
+    @synchronized
+    def __set_loaded_keys__(self, keys: List['PublicKey']) -> None:
+        """
+        Set keys for file loaded with gpg command listing multiple files
+        """
+        self.clear()
+        self.__loaded__ = True
+        for key in keys:
+            key.keyring = self
+        self.extend(sorted(keys, key=attrgetter('primary_user_id')))
+
+    def read_keys(self) -> None:
+        """
+        Load keys by parsing OpenPGP packets in the file without running gpg
+
+        Raises PGPKeyError if the file can't be parsed or contains no keys
+        """
+        keys = read_public_keys(self, keyring=self)
+        if not keys:
+            raise PGPKeyError(f'No public keys found in {self}')
+        self.__set_loaded_keys__(keys)
+
 
 class PublicKeyDirectory(Tree):
     """
     Public key filesystem directory parser
+
+    With use_gpg=False keys are parsed from the key files in Python without running gpg.
+    Parsed keys have unknown validity unless expired or revoked, since trust database is
+    not used. Files that can't be parsed are still loaded with gpg.
+
+    Loaded keys can be stored in a persistent index by passing cache=True or a
+    KeyDirectoryIndex object. Indexed keys are used for files not changed since they
+    were loaded.
+
+    With jobs larger than 1 the key files are split to chunks loaded in parallel by a
+    pool of up to jobs threads, each running its own gpg command.
+
+    Lookups with get() and filter_keys() only load files which may contain matching keys.
+    Files named by primary key fingerprint are indexed without reading them, assuming the
+    file contains the key. Other files are scanned for key fingerprints and emails. Scan
+    results are stored in the directory index if cache is enabled.
     """
     store: 'PasswordStore'
+    use_gpg: bool
+    cache: Optional[KeyDirectoryIndex]
+    jobs: int
     __file_loader_class__ = PublicKeyFile
 
     # pylint: disable=redefined-builtin
@@ -65,7 +204,10 @@ class PublicKeyDirectory(Tree):
                 create_missing: bool = False,
                 sorted: bool = True,
                 mode: Optional[str] = None,
-                excluded: Optional[List[str]] = None) -> None:
+                excluded: Optional[List[str]] = None,
+                use_gpg: bool = True,
+                cache: Optional[Union[bool, KeyDirectoryIndex]] = None,
+                jobs: int = 1) -> None:
         """
         Create a public key directory object
         """
@@ -81,10 +223,32 @@ class PublicKeyDirectory(Tree):
                  create_missing: bool = False,
                  sorted: bool = True,
                  mode: Optional[str] = None,
-                 excluded: Optional[List[str]] = None) -> None:
+                 excluded: Optional[List[str]] = None,
+                 use_gpg: bool = True,
+                 cache: Optional[Union[bool, KeyDirectoryIndex]] = None,
+                 jobs: int = 1) -> None:
+        if jobs < 1:
+            raise PGPKeyError(f'Invalid number of jobs for loading key files: {jobs}')
         self.store = store
+        self.use_gpg = use_gpg
+        self.jobs = jobs
         self.excluded = list(excluded) if isinstance(excluded, (tuple, list)) else []
         super().__init__(path, create_missing, sorted, mode, self.excluded)
+        self.cache = self.__configure_cache__(cache)
+        self.__identities__ = self.cache
+        if self.__identities__ is None:
+            self.__identities__ = KeyDirectoryIndex(self, persistent=False)
+
+    def __configure_cache__(self,
+                            cache: Optional[Union[bool, KeyDirectoryIndex]]) -> Optional[KeyDirectoryIndex]:
+        """
+        Configure key directory index from cache argument
+        """
+        if cache is True:
+            return KeyDirectoryIndex(self)
+        if isinstance(cache, KeyDirectoryIndex):
+            return cache
+        return None
 
     @property
     def keys(self) -> List['PublicKey']:
@@ -92,10 +256,161 @@ class PublicKeyDirectory(Tree):
         Load and return all detected public keys
         """
         keys = []
-        for keyfile in self:
+        for keyfile in self.load_key_files():
             keys.extend(list(keyfile))
         return keys
 
+    def __get_key_files__(self) -> List[PublicKeyFile]:
+        """
+        Return key files in directory in tree order
+        """
+        return [item for item in self if isinstance(item, PublicKeyFile)]
+
+    @staticmethod
+    def __load_key_files_batch__(keyfiles: List[PublicKeyFile]) -> None:
+        """
+        Load keys for key files with one gpg --show-keys command
+
+        Files not matched to keys in gpg output are left unloaded and load their keys
+        separately when accessed.
+        """
+        expected = []
+        for keyfile in keyfiles:
+            fingerprints = get_expected_fingerprints(keyfile)
+            if fingerprints is not None:
+                expected.append((keyfile, fingerprints))
+        if not expected:
+            return
+
+        parser = PublicKeyDataParser()
+        command = list(gpg_command(
+            '--with-colons', '--keyid-format=long', '--show-keys',
+            *[str(keyfile) for keyfile, _fingerprints in expected]
+        ))
+        # gpg returns code 2 if any of the files could not be read
+        stdout = parser.__get_gpg_output__(command, expected_return_codes=[0, 2])
+        keys = list(parser.__iter_parsed_keys__(stdout))
+        for keyfile, file_keys in match_file_keys(expected, keys).items():
+            keyfile.__set_loaded_keys__(file_keys)
+
+    def __load_cached_key_files__(self, keyfiles: List[PublicKeyFile]) -> Dict[PublicKeyFile, Any]:
+        """
+        Load keys for unchanged key files from directory index
+
+        Returns file states for files not found in index, to be stored after loading
+        """
+        states = {}
+        for keyfile in keyfiles:
+            lines = self.cache.read(keyfile)
+            if lines is not None:
+                keyfile.__set_loaded_keys__(list(keyfile.__iter_parsed_keys__(lines)))
+            else:
+                states[keyfile] = self.cache.get_file_state(keyfile)
+        return states
+
+    def __update_cache__(self,
+                         keyfiles: List[PublicKeyFile],
+                         states: Dict[PublicKeyFile, Any],
+                         prune: bool = True) -> None:
+        """
+        Store keys of loaded key files to directory index and remove deleted files from index
+
+        Files are only removed from the index if keyfiles contains all files in directory
+        """
+        for keyfile, state in states.items():
+            if keyfile.is_loaded:
+                keys = list(keyfile)
+                lines = [line for key in keys for line in key.colon_lines]
+                self.cache.write(
+                    keyfile, lines, state,
+                    expires=get_next_expiration(keys),
+                    identities=get_key_identities(keys)
+                )
+        if prune:
+            self.cache.prune(keyfiles)
+        self.cache.save()
+
+    def __get_load_chunks__(self, keyfiles: List[PublicKeyFile]) -> List[List[PublicKeyFile]]:
+        """
+        Split key files to chunks loaded together, one chunk per job if possible
+        """
+        size = min(SHOW_KEYS_BATCH_SIZE, max(1, math.ceil(len(keyfiles) / self.jobs)))
+        return [keyfiles[offset:offset + size] for offset in range(0, len(keyfiles), size)]
+
+    def __load_key_files_chunk__(self, keyfiles: List[PublicKeyFile]) -> List[PublicKeyFile]:
+        """
+        Load keys for a chunk of key files and return the key files
+        """
+        unloaded = keyfiles
+        if not self.use_gpg:
+            for keyfile in keyfiles:
+                try:
+                    keyfile.read_keys()
+                except PGPKeyError:
+                    # Files not parsed are loaded with gpg
+                    pass
+            unloaded = [keyfile for keyfile in keyfiles if not keyfile.is_loaded]
+        if unloaded:
+            self.__load_key_files_batch__(unloaded)
+        return keyfiles
+
+    def __iter_loaded_key_files__(self,
+                                  keyfiles: List[PublicKeyFile],
+                                  prune: bool = True) -> Iterator[PublicKeyFile]:
+        """
+        Load keys for key files and yield each key file when its keys have been loaded
+
+        Already loaded and indexed key files are yielded first, other files in order of
+        completion of their chunks. Directory index is updated when all files are loaded.
+        """
+        unloaded = [keyfile for keyfile in keyfiles if not keyfile.is_loaded]
+        states = self.__load_cached_key_files__(unloaded) if self.cache is not None else {}
+        unloaded = [keyfile for keyfile in unloaded if not keyfile.is_loaded]
+        pending = set(unloaded)
+        yield from (keyfile for keyfile in keyfiles if keyfile not in pending)
+
+        chunks = self.__get_load_chunks__(unloaded)
+        if self.jobs > 1 and len(chunks) > 1:
+            executor = ThreadPoolExecutor(max_workers=self.jobs)
+            try:
+                futures = [executor.submit(self.__load_key_files_chunk__, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    yield from future.result()
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for chunk in chunks:
+                yield from self.__load_key_files_chunk__(chunk)
+
+        if self.cache is not None:
+            self.__update_cache__(keyfiles, states, prune)
+
+    def load_key_files(self) -> List[PublicKeyFile]:
+        """
+        Return key files in directory with keys loaded
+
+        Keys are loaded with one gpg command for up to SHOW_KEYS_BATCH_SIZE files, or parsed
+        from the files if use_gpg is not set. With directory index only files changed since
+        previous load are loaded. Key files are returned in tree order regardless of jobs.
+        """
+        keyfiles = self.__get_key_files__()
+        for _keyfile in self.__iter_loaded_key_files__(keyfiles):
+            pass
+        return keyfiles
+
+    def iter_key_files(self) -> Iterator[PublicKeyFile]:
+        """
+        Iterate key files in directory as soon as keys for each file have been loaded
+        """
+        yield from self.__iter_loaded_key_files__(self.__get_key_files__())
+
+    def iter_keys(self) -> Iterator['PublicKey']:
+        """
+        Iterate public keys in directory as soon as keys for each file have been loaded
+        """
+        for keyfile in self.iter_key_files():
+            yield from keyfile
+
     def is_excluded(self, item) -> bool:
         """
         Only process files with expected filename extensions, exclude any directories
@@ -104,13 +419,110 @@ class PublicKeyDirectory(Tree):
             return True
         return super().is_excluded(item)
 
+    def __scan_key_file__(self, index: KeyFileIndex, keyfile: PublicKeyFile) -> None:
+        """
+        Scan key file for key fingerprints and emails and add the file to key file index
+        """
+        state = self.__identities__.get_file_state(keyfile)
+        try:
+            identities = read_key_identities(keyfile)
+        except PGPKeyError:
+            identities = None
+        if identities is None:
+            # Files not scanned match all lookups and are loaded with gpg
+            index.add_unknown(str(keyfile))
+            return
+        self.__identities__.write_identities(keyfile, identities, state)
+        index.add(str(keyfile), **identities)
+
+    def __get_file_index__(self, keyfiles: List[PublicKeyFile]) -> KeyFileIndex:
+        """
+        Return index of key files by fingerprints, key IDs and emails of keys in the files
+
+        Files are indexed from directory index, filenames with fingerprints or by scanning
+        the files, in this order
+        """
+        index = KeyFileIndex()
+        for keyfile in keyfiles:
+            identities = self.__identities__.read_identities(keyfile)
+            if identities is not None:
+                index.add(str(keyfile), **identities)
+                continue
+            match = RE_FINGERPRINT_FILENAME.match(keyfile.stem)
+            if match:
+                index.add(str(keyfile), [match.group('fingerprint')], partial=True)
+            else:
+                self.__scan_key_file__(index, keyfile)
+        return index
+
+    def __complete_file_index__(self, index: KeyFileIndex, keyfiles: List[PublicKeyFile]) -> None:
+        """
+        Scan files indexed only by filename for sub keys and emails
+        """
+        for keyfile in keyfiles:
+            if str(keyfile) in index.partial:
+                self.__scan_key_file__(index, keyfile)
+
+    def __load_matching_key_files__(self,
+                                    keyfiles: List[PublicKeyFile],
+                                    paths: Set[str]) -> List[PublicKeyFile]:
+        """
+        Load keys for key files with specified paths and return the files in tree order
+        """
+        matching = [keyfile for keyfile in keyfiles if str(keyfile) in paths]
+        for _keyfile in self.__iter_loaded_key_files__(matching, prune=False):
+            pass
+        self.__identities__.save()
+        return matching
+
+    def get(self, value: str) -> 'PublicKey':
+        """
+        Return key for specified key ID or fingerprint
+
+        Sub key IDs and fingerprints are resolved to the public key they belong to. Only files
+        which may contain the key are loaded, and files with errors are skipped.
+        """
+        keyfiles = self.__get_key_files__()
+        index = self.__get_file_index__(keyfiles)
+        for keyfile in self.__load_matching_key_files__(keyfiles, index.find_primary_key(value)):
+            try:
+                keys = keyfile.filter_keys(key_id=value)
+            except PGPKeyError:
+                continue
+            if keys:
+                return keys[0]
+
+        self.__complete_file_index__(index, keyfiles)
+        for keyfile in self.__load_matching_key_files__(keyfiles, index.find_key(value)):
+            try:
+                return keyfile.get(value)
+            except PGPKeyError:
+                continue
+        raise PGPKeyError(f'Key not found: {value}')
+
     def filter_keys(self,
                     email: Optional[str] = None,
                     key_id: Optional[str] = None) -> List[PublicKeyFile]:
         """
         Filter keys matching specified attributes
+
+        Only files which may contain matching keys are loaded
         """
+        if email is None and key_id is None:
+            keyfiles = self.load_key_files()
+        else:
+            keyfiles = self.__get_key_files__()
+            index = self.__get_file_index__(keyfiles)
+            paths = None
+            if key_id is not None:
+                paths = index.find_primary_key(key_id)
+            if email is not None:
+                self.__complete_file_index__(index, keyfiles)
+                found = index.find_email_pattern(email)
+                paths = found if paths is None else paths & found
+            keyfiles = self.__load_matching_key_files__(keyfiles, paths)
+
         matches = []
-        for keyfile in self:
+        for keyfile in keyfiles:
             matches.extend(keyfile.filter_keys(email=email, key_id=key_id))
         return matches
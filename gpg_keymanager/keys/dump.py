@@ -0,0 +1,93 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Offline parsing of saved gpg --with-colons key listing dumps
+
+Dump files are memory mapped and split to chunks at public key record boundaries,
+allowing large dumps to be parsed in parallel in multiple processes.
+"""
+import mmap
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from ..exceptions import PGPKeyError
+
+from .public_key import PublicKey
+
+# Public key record boundary in gpg colon output
+PUBLIC_KEY_RECORD_BOUNDARY = b'\npub:'
+# Dumps smaller than this are parsed in calling process
+MIN_PARALLEL_DUMP_SIZE = 4 * 1024 * 1024
+# Number of chunks per worker process to balance uneven chunks
+CHUNKS_PER_JOB = 4
+
+
+def get_dump_chunks(path: Union[str, Path], count: int) -> List[Tuple[int, int]]:
+    """
+    Split gpg colon dump file to at most count chunks at public key record boundaries
+
+    Returns list of (start, end) byte offsets
+    """
+    with open(path, 'rb') as filedescriptor:
+        size = os.fstat(filedescriptor.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(filedescriptor.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offsets = [0]
+            for index in range(1, count):
+                position = data.find(PUBLIC_KEY_RECORD_BOUNDARY, max(offsets[-1], size * index // count))
+                if position < 0:
+                    break
+                if position + 1 > offsets[-1]:
+                    offsets.append(position + 1)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def parse_dump_chunk(path: Union[str, Path], start: int, end: int) -> List[PublicKey]:
+    """
+    Parse public keys from a chunk of gpg colon dump file
+
+    Returned keys are not linked to any keyring
+    """
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from .loader import PublicKeyDataParser
+
+    with open(path, 'rb') as filedescriptor:
+        with mmap.mmap(filedescriptor.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            lines = data[start:end].decode('utf-8', errors='replace').splitlines()
+    keys = list(PublicKeyDataParser().__iter_parsed_keys__(lines))
+    for key in keys:
+        key.keyring = None
+    return keys
+
+
+def parse_dump_file(path: Union[str, Path], jobs: Optional[int] = None) -> List[PublicKey]:
+    """
+    Parse public keys from gpg colon dump file, in parallel with a process pool for large files
+
+    Keys are returned in dump file order and are not linked to any keyring
+    """
+    path = Path(path).expanduser()
+    try:
+        size = path.stat().st_size
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if jobs <= 1 or size < MIN_PARALLEL_DUMP_SIZE:
+            return [key for start, end in get_dump_chunks(path, 1) for key in parse_dump_chunk(path, start, end)]
+
+        chunks = get_dump_chunks(path, jobs * CHUNKS_PER_JOB)
+        keys = []
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(parse_dump_chunk, str(path), start, end) for start, end in chunks]
+            for future in futures:
+                keys.extend(future.result())
+        return keys
+    except OSError as error:
+        raise PGPKeyError(f'Error reading gpg key dump {path}: {error}') from error
@@ -0,0 +1,126 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Export of keyring keys to public key directory files
+
+Keys are exported with one gpg --export command and split to one ASCII armored file per
+key. Files with unchanged contents are not written, and changed files are replaced
+atomically.
+"""
+import os
+
+from pathlib import Path
+from subprocess import run, PIPE
+from typing import Iterable, List, Union, TYPE_CHECKING
+from uuid import uuid4
+
+from ..exceptions import PGPKeyError
+
+from .constants import PUBLIC_KEY_FILE_EXTENSIONS
+from .index import normalize_key_id
+from .openpgp import armor, split_keys
+from .utils import gpg_command
+
+if TYPE_CHECKING:
+    from .loader import UserPublicKeys
+
+EXPORT_FILE_EXTENSION = '.asc'
+DEFAULT_FILE_MODE = 0o666
+
+
+# pylint: disable=too-few-public-methods
+class KeyExport:
+    """
+    Results of exporting keys to key directory
+    """
+    written: List[Path]
+    unchanged: List[Path]
+    missing: List[str]
+
+    def __init__(self) -> None:
+        self.written = []
+        self.unchanged = []
+        self.missing = []
+
+    def __bool__(self) -> bool:
+        return bool(self.written)
+
+
+def write_key_file(path: Path, data: bytes) -> bool:
+    """
+    Write key file atomically if contents differ from existing file
+
+    Replaced files keep their mode and new files are created with default mode and umask
+    like regular files. Returns True if the file was written
+    """
+    try:
+        if path.read_bytes() == data:
+            return False
+        mode = path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+    except OSError as error:
+        raise PGPKeyError(f'Error reading key file {path}: {error}') from error
+
+    tmpfile = path.parent.joinpath(f'.{path.name}.{uuid4().hex}.tmp')
+    created = False
+    try:
+        # Temporary file is created with default mode, and the umask is applied by the system
+        filedescriptor = os.open(tmpfile, os.O_WRONLY | os.O_CREAT | os.O_EXCL, DEFAULT_FILE_MODE)
+        created = True
+        with os.fdopen(filedescriptor, 'wb') as tmp:
+            tmp.write(data)
+        if mode is not None:
+            os.chmod(tmpfile, mode)
+        os.replace(tmpfile, path)
+    except OSError as error:
+        if created:
+            tmpfile.unlink(missing_ok=True)
+        raise PGPKeyError(f'Error writing key file {path}: {error}') from error
+    return True
+
+
+def export_keys_to_directory(keyring: 'UserPublicKeys',
+                             fingerprints: Iterable[str],
+                             directory: Union[str, Path],
+                             extension: str = EXPORT_FILE_EXTENSION) -> KeyExport:
+    """
+    Export keys from keyring to ASCII armored key files named by key fingerprint
+
+    Keys are exported with one gpg --export command. Files are named <FINGERPRINT><extension>
+    by the primary key fingerprint of exported keys. Primary key fingerprints not exported
+    by gpg are returned as missing.
+    """
+    if extension not in PUBLIC_KEY_FILE_EXTENSIONS:
+        raise PGPKeyError(f'Unexpected key file extension: {extension}')
+    fingerprints = list(dict.fromkeys(normalize_key_id(fingerprint) for fingerprint in fingerprints))
+    changes = KeyExport()
+    if not fingerprints:
+        return changes
+
+    response = run(
+        gpg_command('--export', *fingerprints, homedir=keyring.homedir),
+        stdout=PIPE,
+        stderr=PIPE,
+        check=False
+    )
+    if response.returncode != 0:
+        raise PGPKeyError(f'Error exporting keys from keyring: {response.stderr}')
+
+    directory = Path(directory).expanduser()
+    directory.mkdir(parents=True, exist_ok=True)
+    exported = set()
+    for fingerprint, data in split_keys(response.stdout):
+        if fingerprint is None or fingerprint in exported:
+            continue
+        exported.add(fingerprint)
+        path = directory.joinpath(f'{fingerprint}{extension}')
+        if write_key_file(path, armor(data)):
+            changes.written.append(path)
+        else:
+            changes.unchanged.append(path)
+    changes.missing = [fingerprint for fingerprint in fingerprints if fingerprint not in exported]
+    return changes
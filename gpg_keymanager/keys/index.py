@@ -0,0 +1,478 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Hash indexes for looking up public keys and key files by key ID, fingerprint and email
+
+Key expiration dates are indexed in a sorted list for range queries
+"""
+import fnmatch
+import re
+import time
+
+from bisect import bisect_left, insort
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .public_key import PublicKey
+
+LONG_KEY_ID_LENGTH = 16
+SHORT_KEY_ID_LENGTH = 8
+V5_FINGERPRINT_LENGTH = 64
+
+# Characters with special meaning in fnmatch email patterns
+EMAIL_PATTERN_WILDCARDS = ('*', '?', '[')
+
+
+def normalize_key_id(value: str) -> str:
+    """
+    Normalize key ID or fingerprint value for index lookups
+    """
+    value = str(value).upper()
+    if value[:2] == '0X':
+        value = value[2:]
+    return value
+
+
+def get_timestamp(value: Optional[Union[datetime, int, float]] = None) -> int:
+    """
+    Return value as integer epoch timestamp, defaulting to current time
+    """
+    if value is None:
+        return int(time.time())
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+@lru_cache(maxsize=256)
+def compile_email_patterns(patterns: Tuple[str], ignore_case: bool = True) -> Pattern:
+    """
+    Compile fnmatch email patterns to a single regular expression
+
+    Like email pattern matching with fnmatch, patterns match anywhere in the email address.
+    Multiple patterns are combined as an alternation matching any of the patterns.
+    """
+    if ignore_case:
+        patterns = tuple(pattern.lower() for pattern in patterns)
+    return re.compile('|'.join(fnmatch.translate(f'*{pattern}*') for pattern in patterns))
+
+
+def get_domain_pattern(pattern: str) -> Optional[str]:
+    """
+    Return domain for plain domain email patterns like @example.com, or None for other patterns
+    """
+    if pattern[:1] != '@' or '@' in pattern[1:]:
+        return None
+    if any(wildcard in pattern for wildcard in EMAIL_PATTERN_WILDCARDS):
+        return None
+    return pattern[1:].lower()
+
+
+def get_email_domain(email: str) -> Optional[str]:
+    """
+    Return domain part of email address or None if value has no domain
+    """
+    if '@' not in email:
+        return None
+    return email.rsplit('@', 1)[1].lower()
+
+
+class PublicKeyIndex:
+    """
+    Lookup indexes for public keys in a key collection
+
+    Keys are referenced by object identity, allowing multiple keys with same key ID in one
+    collection. Index values are sets of key references to allow lookups with set operations.
+
+    Keys with expiration date are stored in a list sorted by expiration timestamp, allowing
+    expiration queries with binary search.
+    """
+    keys: Dict[int, 'PublicKey']
+    order: Dict[int, int]
+    values: Dict[int, Dict[str, Set[str]]]
+    fingerprints: Dict[str, Set[int]]
+    key_ids: Dict[str, Set[int]]
+    short_key_ids: Dict[str, Set[int]]
+    sub_keys: Dict[str, Set[int]]
+    emails: Dict[str, Set[int]]
+    domains: Dict[str, Set[int]]
+    expirations: List[Tuple[int, int, int]]
+    expiration_entries: Dict[int, Tuple[int, int, int]]
+
+    def __init__(self, keys: Optional[Iterable['PublicKey']] = None) -> None:
+        self.clear()
+        if keys is not None:
+            for key in keys:
+                self.add(key)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: 'PublicKey') -> bool:
+        return id(key) in self.keys
+
+    @staticmethod
+    def __get_key_values__(key: 'PublicKey') -> Dict[str, Set[str]]:
+        """
+        Return indexed values for a key
+        """
+        values = {
+            'fingerprints': set(),
+            'key_ids': set(),
+            'short_key_ids': set(),
+            'sub_keys': set(),
+            'emails': set(),
+            'domains': set(),
+        }
+        try:
+            key_id = normalize_key_id(key.key_id)
+            values['key_ids'].add(key_id)
+            values['short_key_ids'].add(key_id[-SHORT_KEY_ID_LENGTH:])
+        except (KeyError, TypeError):
+            # Keys without key ID are only indexed by other values
+            pass
+        if key.fingerprint is not None:
+            values['fingerprints'].add(normalize_key_id(key.fingerprint))
+        for sub_key in key.sub_keys:
+            values['sub_keys'].add(normalize_key_id(sub_key.key_id))
+            fingerprint = getattr(sub_key, 'fingerprint', None)
+            if fingerprint is not None:
+                values['sub_keys'].add(normalize_key_id(fingerprint))
+        for user_id in key.user_ids:
+            email = user_id.email.lower()
+            values['emails'].add(email)
+            domain = get_email_domain(email)
+            if domain is not None:
+                values['domains'].add(domain)
+        return values
+
+    def add(self, key: 'PublicKey', order: Optional[int] = None) -> None:
+        """
+        Add key to indexes
+
+        Keys are ordered after previously added keys unless order is specified
+        """
+        ref = id(key)
+        if ref in self.keys:
+            return
+        self.keys[ref] = key
+        if order is None:
+            order = self.__sequence__
+            self.__sequence__ += 1
+        self.order[ref] = order
+        self.values[ref] = self.__get_key_values__(key)
+        for attr, values in self.values[ref].items():
+            index = getattr(self, attr)
+            for value in values:
+                index.setdefault(value, set()).add(ref)
+
+        try:
+            expiration = key.__get_expiration_timestamp__()
+        except ValueError:
+            # Keys with unexpected expiration date values are not indexed by expiration
+            expiration = None
+        if expiration is not None:
+            entry = (expiration, self.order[ref], ref)
+            self.expiration_entries[ref] = entry
+            insort(self.expirations, entry)
+
+    def remove(self, key: 'PublicKey') -> None:
+        """
+        Remove key from indexes
+
+        Key is removed with the values it was indexed with, even if the key has been modified
+        """
+        ref = id(key)
+        if ref not in self.keys:
+            return
+        for attr, values in self.values.pop(ref).items():
+            index = getattr(self, attr)
+            for value in values:
+                refs = index.get(value, None)
+                if refs is None:
+                    continue
+                refs.discard(ref)
+                if not refs:
+                    del index[value]
+        entry = self.expiration_entries.pop(ref, None)
+        if entry is not None:
+            del self.expirations[bisect_left(self.expirations, entry)]
+        del self.keys[ref]
+        del self.order[ref]
+
+    def update(self, key: 'PublicKey') -> None:
+        """
+        Update indexed values of modified key, keeping the key in same order
+        """
+        order = self.order.get(id(key), None)
+        self.remove(key)
+        self.add(key, order=order)
+
+    def reorder(self, keys: Iterable['PublicKey']) -> None:
+        """
+        Order indexed keys in the order of specified keys
+        """
+        self.order = {}
+        for key in keys:
+            ref = id(key)
+            if ref in self.keys and ref not in self.order:
+                self.order[ref] = len(self.order)
+        for ref in self.keys:
+            if ref not in self.order:
+                self.order[ref] = len(self.order)
+        self.__sequence__ = len(self.order)
+        self.expiration_entries = {
+            ref: (expiration, self.order[ref], ref)
+            for expiration, _order, ref in self.expiration_entries.values()
+        }
+        self.expirations = sorted(self.expiration_entries.values())
+
+    def clear(self) -> None:
+        """
+        Clear all indexes
+        """
+        self.keys = {}
+        self.order = {}
+        self.values = {}
+        self.fingerprints = {}
+        self.key_ids = {}
+        self.short_key_ids = {}
+        self.sub_keys = {}
+        self.emails = {}
+        self.domains = {}
+        self.expirations = []
+        self.expiration_entries = {}
+        self.__sequence__ = 0
+
+    def sorted_keys(self, refs: Iterable[int]) -> List['PublicKey']:
+        """
+        Return keys for references in the order keys were added to index
+        """
+        return [self.keys[ref] for ref in sorted(refs, key=self.order.__getitem__)]
+
+    def find_primary_key(self, value: str) -> Set[int]:
+        """
+        Find key references by primary key fingerprint, long key ID or short key ID
+        """
+        value = normalize_key_id(value)
+        if len(value) == SHORT_KEY_ID_LENGTH:
+            return set(self.short_key_ids.get(value, ()))
+        if len(value) == LONG_KEY_ID_LENGTH:
+            return set(self.key_ids.get(value, ()))
+        return set(self.fingerprints.get(value, ()))
+
+    def find_key(self, value: str) -> Set[int]:
+        """
+        Find key references by primary key or sub key ID or fingerprint
+
+        Primary key matches are preferred over sub key matches
+        """
+        refs = self.find_primary_key(value)
+        if refs:
+            return refs
+        return set(self.sub_keys.get(normalize_key_id(value), ()))
+
+    def find_fingerprint(self, value: str) -> Set[int]:
+        """
+        Find key references by exact primary key fingerprint
+        """
+        return set(self.fingerprints.get(normalize_key_id(value), ()))
+
+    def find_email(self, email: str) -> Set[int]:
+        """
+        Find key references by exact email address
+        """
+        return set(self.emails.get(email.lower(), ()))
+
+    def find_domain(self, domain: str) -> Set[int]:
+        """
+        Find key references by email address domain
+        """
+        return set(self.domains.get(domain.lstrip('@').lower(), ()))
+
+    def find_domain_prefix(self, domain: str) -> Set[int]:
+        """
+        Find key references by email address domain starting with specified value
+
+        This matches same keys as pattern @domain matched anywhere in email address
+        """
+        domain = domain.lstrip('@').lower()
+        refs = self.find_domain(domain)
+        for value, domain_refs in self.domains.items():
+            if value != domain and value.startswith(domain):
+                refs.update(domain_refs)
+        return refs
+
+    def find_expiring_before(self, timestamp: Union[datetime, int, float]) -> List[int]:
+        """
+        Find key references for keys expiring before specified time, ordered by expiration
+
+        Keys already expired are included in results
+        """
+        end = bisect_left(self.expirations, (get_timestamp(timestamp),))
+        return [entry[2] for entry in self.expirations[:end]]
+
+    def find_expired(self, timestamp: Optional[Union[datetime, int, float]] = None) -> List[int]:
+        """
+        Find key references for keys expired at specified time or now, ordered by expiration
+        """
+        return self.find_expiring_before(get_timestamp(timestamp) + 1)
+
+    def find_next_expiring(self,
+                           count: int,
+                           timestamp: Optional[Union[datetime, int, float]] = None) -> List[int]:
+        """
+        Find key references for next count keys to expire after specified time or now
+        """
+        start = bisect_left(self.expirations, (get_timestamp(timestamp) + 1,))
+        return [entry[2] for entry in self.expirations[start:start + count]]
+
+
+def get_fingerprint_key_id(fingerprint: str) -> str:
+    """
+    Return long key ID for key fingerprint
+
+    Version 4 key IDs are the last 64 bits of the fingerprint, version 5 and 6 key IDs
+    the first 64 bits
+    """
+    fingerprint = normalize_key_id(fingerprint)
+    if len(fingerprint) == V5_FINGERPRINT_LENGTH:
+        return fingerprint[:LONG_KEY_ID_LENGTH]
+    return fingerprint[-LONG_KEY_ID_LENGTH:]
+
+
+class KeyFileIndex:
+    """
+    Lookup indexes for key files by fingerprints, key IDs and emails of keys in the files
+
+    Files are referenced by path. Partial files are indexed only by primary key fingerprints
+    detected from filenames, and unknown files have no indexed values. Both are included
+    in lookups they may match, and must be loaded to check the keys in the files.
+    """
+    values: Dict[str, Dict[str, Set[str]]]
+    fingerprints: Dict[str, Set[str]]
+    key_ids: Dict[str, Set[str]]
+    short_key_ids: Dict[str, Set[str]]
+    sub_keys: Dict[str, Set[str]]
+    emails: Dict[str, Set[str]]
+    partial: Set[str]
+    unknown: Set[str]
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self.values) + len(self.unknown)
+
+    def __contains__(self, path: str) -> bool:
+        return str(path) in self.values or str(path) in self.unknown
+
+    def add(self,
+            path: str,
+            fingerprints: Iterable[str],
+            sub_keys: Iterable[str] = (),
+            emails: Iterable[str] = (),
+            partial: bool = False) -> None:
+        """
+        Add file with primary key fingerprints, sub key fingerprints and emails to indexes
+        """
+        path = str(path)
+        self.remove(path)
+        values = {
+            'fingerprints': set(),
+            'key_ids': set(),
+            'short_key_ids': set(),
+            'sub_keys': set(),
+            'emails': set(email.lower() for email in emails),
+        }
+        for fingerprint in fingerprints:
+            key_id = get_fingerprint_key_id(fingerprint)
+            values['fingerprints'].add(normalize_key_id(fingerprint))
+            values['key_ids'].add(key_id)
+            values['short_key_ids'].add(key_id[-SHORT_KEY_ID_LENGTH:])
+        for fingerprint in sub_keys:
+            values['sub_keys'].add(normalize_key_id(fingerprint))
+            values['sub_keys'].add(get_fingerprint_key_id(fingerprint))
+        self.values[path] = values
+        for attr, attr_values in values.items():
+            index = getattr(self, attr)
+            for value in attr_values:
+                index.setdefault(value, set()).add(path)
+        if partial:
+            self.partial.add(path)
+
+    def add_unknown(self, path: str) -> None:
+        """
+        Add file with unknown keys, matching all lookups
+        """
+        self.remove(path)
+        self.unknown.add(str(path))
+
+    def remove(self, path: str) -> None:
+        """
+        Remove file from indexes
+        """
+        path = str(path)
+        self.unknown.discard(path)
+        self.partial.discard(path)
+        for attr, values in self.values.pop(path, {}).items():
+            index = getattr(self, attr)
+            for value in values:
+                paths = index.get(value, None)
+                if paths is None:
+                    continue
+                paths.discard(path)
+                if not paths:
+                    del index[value]
+
+    def clear(self) -> None:
+        """
+        Clear all indexes
+        """
+        self.values = {}
+        self.fingerprints = {}
+        self.key_ids = {}
+        self.short_key_ids = {}
+        self.sub_keys = {}
+        self.emails = {}
+        self.partial = set()
+        self.unknown = set()
+
+    def find_primary_key(self, value: str) -> Set[str]:
+        """
+        Find files with primary key fingerprint, long key ID or short key ID
+        """
+        value = normalize_key_id(value)
+        if len(value) == SHORT_KEY_ID_LENGTH:
+            paths = self.short_key_ids.get(value, ())
+        elif len(value) == LONG_KEY_ID_LENGTH:
+            paths = self.key_ids.get(value, ())
+        else:
+            paths = self.fingerprints.get(value, ())
+        return set(paths) | self.unknown
+
+    def find_key(self, value: str) -> Set[str]:
+        """
+        Find files with primary key or sub key ID or fingerprint
+        """
+        return self.find_primary_key(value) | set(self.sub_keys.get(normalize_key_id(value), ())) | self.partial
+
+    def find_email_pattern(self, pattern: Union[str, Iterable[str]]) -> Set[str]:
+        """
+        Find files with any email matching the email pattern or any of the patterns
+
+        Patterns are matched like with fnmatch anywhere in the email address, which matches
+        at least the same keys as filtering loaded keys by email pattern
+        """
+        patterns = (pattern,) if isinstance(pattern, str) else tuple(pattern)
+        match = compile_email_patterns(patterns).match
+        paths = set(self.unknown) | self.partial
+        for email, email_paths in self.emails.items():
+            if match(email):
+                paths.update(email_paths)
+        return paths
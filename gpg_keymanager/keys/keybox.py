@@ -0,0 +1,282 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Read-only parser for GnuPG keybox (pubring.kbx) files
+
+Keybox blobs store fingerprints, key IDs and user ID locations of OpenPGP keys before the
+key block, allowing listing keys in user keyring without running gpg.
+"""
+import mmap
+import struct
+
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..exceptions import PGPKeyError
+
+from .base import synchronized
+from .loader import UserPublicKeys
+from .public_key import (
+    RECORD_TYPE_FINGERPRINT,
+    RECORD_TYPE_PUBLIC_KEY,
+    RECORD_TYPE_SUB_KEY,
+    RECORD_TYPE_USER_ID,
+    PublicKey,
+    format_colon_record,
+)
+from .utils import escape_colon_field, get_gnupg_homedir
+
+KEYBOX_FILENAME = 'pubring.kbx'
+KEYBOX_MAGIC = b'KBXf'
+KEYBOX_HEADER_LENGTH = 32
+
+BLOB_TYPE_EMPTY = 0
+BLOB_TYPE_HEADER = 1
+BLOB_TYPE_OPENPGP = 2
+BLOB_FLAG_EPHEMERAL = 0x0002
+
+# Key info flag for 32 byte fingerprints in version 2 blobs
+KEY_FLAG_32_BYTE_FINGERPRINT = 0x0080
+KEY_ID_LENGTH = 8
+
+BLOB_HEADER = struct.Struct('>IBB')
+OPENPGP_BLOB_HEADER = struct.Struct('>IBBHIIHH')
+UINT16 = struct.Struct('>H')
+UINT32 = struct.Struct('>I')
+USER_ID_HEADER = struct.Struct('>HH')
+USER_ID_INFO = struct.Struct('>II')
+
+
+class KeyboxRecord:
+    """
+    OpenPGP key blob in keybox file
+
+    Keys are (fingerprint, key ID) pairs with the primary key first, followed by sub keys
+    """
+    __slots__ = ('keys', 'user_ids')
+
+    def __init__(self, keys: List[Tuple[str, str]], user_ids: List[str]) -> None:
+        self.keys = keys
+        self.user_ids = user_ids
+
+    def __repr__(self) -> str:
+        return self.fingerprint
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Return primary key fingerprint
+        """
+        return self.keys[0][0]
+
+    @property
+    def key_id(self) -> str:
+        """
+        Return primary key long key ID
+        """
+        return self.keys[0][1]
+
+    @property
+    def colon_lines(self) -> List[str]:
+        """
+        Return key as gpg --with-colons listing records with key IDs, fingerprints and user IDs
+        """
+        lines = []
+        for index, (fingerprint, key_id) in enumerate(self.keys):
+            record_type = RECORD_TYPE_PUBLIC_KEY if index == 0 else RECORD_TYPE_SUB_KEY
+            lines.append(format_colon_record(record_type=record_type, key_id=key_id, user_id=None))
+            lines.append(format_colon_record(record_type=RECORD_TYPE_FINGERPRINT, user_id=fingerprint))
+            if index == 0:
+                lines.extend(
+                    format_colon_record(record_type=RECORD_TYPE_USER_ID, user_id=escape_colon_field(user_id))
+                    for user_id in self.user_ids
+                )
+        return lines
+
+
+def parse_key_info(data: Union[bytes, mmap.mmap], offset: int, position: int, version: int) -> Tuple[str, str]:
+    """
+    Parse fingerprint and long key ID from key information of keybox blob at offset
+    """
+    if version == 1:
+        fingerprint = bytes(data[position:position + 20])
+        key_id_offset = UINT32.unpack_from(data, position + 20)[0]
+        if key_id_offset:
+            key_id = bytes(data[offset + key_id_offset:offset + key_id_offset + KEY_ID_LENGTH])
+        else:
+            key_id = fingerprint[-KEY_ID_LENGTH:]
+    elif UINT16.unpack_from(data, position + 32)[0] & KEY_FLAG_32_BYTE_FINGERPRINT:
+        fingerprint = bytes(data[position:position + 32])
+        key_id = fingerprint[:KEY_ID_LENGTH]
+    else:
+        fingerprint = bytes(data[position:position + 20])
+        key_id = fingerprint[-KEY_ID_LENGTH:]
+    return fingerprint.hex().upper(), key_id.hex().upper()
+
+
+def parse_user_ids(data: Union[bytes, mmap.mmap], offset: int, position: int) -> List[str]:
+    """
+    Parse user IDs from user ID information of keybox blob at offset
+    """
+    length = UINT32.unpack_from(data, offset)[0]
+    count, info_size = USER_ID_HEADER.unpack_from(data, position)
+    position += USER_ID_HEADER.size
+
+    user_ids = []
+    for _index in range(count):
+        user_id_offset, user_id_length = USER_ID_INFO.unpack_from(data, position)
+        position += info_size
+        if user_id_offset + user_id_length > length:
+            raise PGPKeyError(f'Invalid user ID offset in keybox blob at offset {offset}')
+        value = bytes(data[offset + user_id_offset:offset + user_id_offset + user_id_length])
+        # User attribute packets like photo IDs are stored like user IDs, but their binary
+        # subpacket headers always contain zero bytes. gpg lists these as uat records.
+        if b'\x00' in value:
+            continue
+        user_ids.append(value.decode('utf-8', errors='replace'))
+    return user_ids
+
+
+def parse_openpgp_blob(data: Union[bytes, mmap.mmap], offset: int) -> Optional[KeyboxRecord]:
+    """
+    Parse OpenPGP key blob starting at offset in keybox data
+
+    Returns None for ephemeral keys not listed by gpg
+    """
+    _length, _blob_type, version, flags, _keyblock_offset, _keyblock_length, key_count, key_info_size = \
+        OPENPGP_BLOB_HEADER.unpack_from(data, offset)
+    if version not in (1, 2):
+        raise PGPKeyError(f'Unexpected keybox blob version {version} at offset {offset}')
+    if flags & BLOB_FLAG_EPHEMERAL:
+        return None
+    if not key_count:
+        raise PGPKeyError(f'No keys in keybox blob at offset {offset}')
+
+    position = offset + OPENPGP_BLOB_HEADER.size
+    keys = [
+        parse_key_info(data, offset, position + index * key_info_size, version)
+        for index in range(key_count)
+    ]
+    position += key_count * key_info_size
+    # Serial number is only used for X.509 certificates
+    position += UINT16.size + UINT16.unpack_from(data, position)[0]
+    return KeyboxRecord(keys, parse_user_ids(data, offset, position))
+
+
+def iter_keybox_records(data: Union[bytes, mmap.mmap]) -> Iterator[KeyboxRecord]:
+    """
+    Iterate OpenPGP key records in keybox data in file order
+
+    Raises PGPKeyError if data is not a keybox file or a blob can't be parsed
+    """
+    size = len(data)
+    try:
+        length, blob_type, _version = BLOB_HEADER.unpack_from(data, 0)
+        if blob_type != BLOB_TYPE_HEADER or data[8:12] != KEYBOX_MAGIC:
+            raise PGPKeyError('File is not a GnuPG keybox file')
+        if length < KEYBOX_HEADER_LENGTH or length > size:
+            raise PGPKeyError(f'Invalid keybox header length {length}')
+        offset = length
+        while offset < size:
+            length, blob_type, _version = BLOB_HEADER.unpack_from(data, offset)
+            if length < BLOB_HEADER.size or offset + length > size:
+                raise PGPKeyError(f'Invalid keybox blob length {length} at offset {offset}')
+            if blob_type == BLOB_TYPE_OPENPGP:
+                record = parse_openpgp_blob(data, offset)
+                if record is not None:
+                    yield record
+            offset += length
+    except struct.error as error:
+        raise PGPKeyError(f'Error parsing keybox data: {error}') from error
+
+
+def read_keybox(path: Union[str, Path]) -> List[KeyboxRecord]:
+    """
+    Read OpenPGP key records from keybox file
+
+    The file is memory mapped and read once
+    """
+    try:
+        with open(Path(path).expanduser(), 'rb') as filedescriptor:
+            with mmap.mmap(filedescriptor.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return list(iter_keybox_records(data))
+    except (OSError, ValueError) as error:
+        raise PGPKeyError(f'Error reading keybox file {path}: {error}') from error
+
+
+def get_colon_lines(records: Iterable[KeyboxRecord]) -> Iterator[str]:
+    """
+    Iterate gpg colon listing records for keybox records
+    """
+    for record in records:
+        yield from record.colon_lines
+
+
+class KeyboxPublicKeys(UserPublicKeys):
+    """
+    Keys in user keyring loaded from GnuPG keybox file without running gpg
+
+    Keybox contains key IDs, fingerprints and user IDs of the keys. Other key details are
+    loaded with one gpg command when key validity, capabilities, key length or dates are
+    first requested from any of the keys, like validity with fast_list_mode. If the keybox
+    file is missing or not in a recognized format, or if keys are listed with gpg arguments,
+    keys are loaded with gpg instead.
+    """
+    path: Path
+    loaded_from_keybox: bool
+
+    def __init__(self, *gpg_args: Tuple[str], **kwargs: Dict[Any, Any]) -> None:
+        path = kwargs.pop('path', None)
+        super().__init__(*gpg_args, **kwargs)
+        if path is not None:
+            self.path = Path(path).expanduser()
+        else:
+            self.path = get_gnupg_homedir(self.homedir).joinpath(KEYBOX_FILENAME)
+        self.loaded_from_keybox = False
+
+    def __read_keybox_keys__(self) -> Optional[List[PublicKey]]:
+        """
+        Return keys parsed from keybox file or None if keys must be loaded with gpg
+        """
+        if self.__gpg_args__:
+            return None
+        try:
+            records = read_keybox(self.path)
+        except PGPKeyError:
+            return None
+        return list(self.__iter_parsed_keys__(get_colon_lines(records)))
+
+    @synchronized
+    def load(self) -> None:
+        """
+        Load keys from keybox file, falling back to gpg command if keybox can't be read
+        """
+        keys = self.__read_keybox_keys__()
+        if keys is None:
+            self.loaded_from_keybox = False
+            super().load()
+            return
+
+        self.clear()
+        self.__loaded__ = True
+        self.__details_loaded__ = False
+        self.__fields_loaded__ = False
+        self.loaded_from_keybox = True
+        keys.sort(key=attrgetter('primary_user_id'))
+        self.extend(keys)
+
+    def iter_keys(self) -> Iterator[PublicKey]:
+        """
+        Iterate keys from keybox file, falling back to gpg command if keybox can't be read
+
+        Keys streamed from keybox are not enriched with full details
+        """
+        keys = self.__read_keybox_keys__() if not self.is_loaded else None
+        if keys is None:
+            yield from super().iter_keys()
+            return
+        yield from keys
@@ -6,35 +6,77 @@
 """
 Parser for GPG command line output for public key data
 """
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from operator import attrgetter
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 from sys_toolkit.subprocess import run_command_lineoutput
 
 from ..exceptions import PGPKeyError
 
-from .base import GPGItemCollection
+from .base import GPGItemCollection, synchronized
+from .batch import KeyringBatch
+from .cache import KeyringCache
+from .index import (
+    EMAIL_PATTERN_WILDCARDS,
+    PublicKeyIndex,
+    compile_email_patterns,
+    get_domain_pattern,
+    normalize_key_id,
+)
+from .dump import parse_dump_file
 from .constants import (
-    KEY_FIELDS,
-    FIELD_RECORD_TYPE,
+    REQUIRED_CAPABILITIES,
     KeyValidityStatus,
-    KeyRecordType,
+    KeyValidityTrust,
+)
+from .public_key import (
+    RECORD_TYPE_FINGERPRINT,
+    RECORD_TYPE_PUBLIC_KEY,
+    RECORD_TYPE_SECRET_KEY,
+    RECORD_TYPE_TRUST_DATABASE,
+    PublicKey,
+    get_capability_flags,
 )
-from .public_key import PublicKey
+from .snapshot import KeyringSnapshot
 from .trustdb import OwnerTrustDB
+from .utils import gpg_command, iter_command_lineoutput
+from .validation import KeyValidationReport, get_accepted_validity_flags
 
 
 class PublicKeyDataParser(GPGItemCollection):
     """
     Parser for public key data from gpg command output
+
+    Loaded keys are indexed by fingerprint, key IDs, sub keys and emails for lookups. Indexes
+    are built when first used, so creating filtered collections does not index the matches.
+
+    With fast_list_mode=True keys are listed with gpg --fast-list-mode, which skips trust
+    and validity computation. Full key details are loaded for all loaded keys with one gpg
+    command when key validity is first requested from any of the keys.
+
+    With homedir set, gpg commands are run with --homedir to use keyring in specified GnuPG
+    home directory instead of the default one.
     """
     __gpg_args__: Tuple[str]
     __loaded__: bool
+    __details_loaded__: bool
+    __fields_loaded__: bool
+    fast_list_mode: bool
+    homedir: Optional[Path]
     __items__: List[PublicKey]
+    __index_data__: Optional[PublicKeyIndex]
 
     def __init__(self, *gpg_args, **kwargs: Dict[Any, Any]):
         super().__init__()
         self.__gpg_args__ = gpg_args
+        self.fast_list_mode = kwargs.pop('fast_list_mode', False)
+        homedir = kwargs.pop('homedir', None)
+        self.homedir = Path(homedir).expanduser() if homedir is not None else None
+        self.__details_loaded__ = True
+        self.__fields_loaded__ = True
 
         keys = kwargs.pop('keys', None)
         if isinstance(keys, (list, tuple)):
@@ -43,6 +85,119 @@ class PublicKeyDataParser(GPGItemCollection):
         else:
             self.__items__ = []
             self.__loaded__ = False
+        self.__index_data__ = None
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], jobs: Optional[int] = None) -> 'PublicKeyDataParser':
+        """
+        Load keys from a saved gpg --with-colons --list-keys output file without running gpg
+
+        The file is memory mapped and large files are parsed in chunks in parallel in up
+        to jobs processes, defaulting to number of CPUs. Keys are sorted like in load().
+        """
+        keys = parse_dump_file(path, jobs=jobs)
+        keys.sort(key=attrgetter('primary_user_id'))
+        collection = cls(keys=keys)
+        for key in keys:
+            key.keyring = collection
+        return collection
+
+    @property
+    @synchronized
+    def __key_index__(self) -> PublicKeyIndex:
+        """
+        Return lookup indexes for keys, building the indexes on first access
+        """
+        if self.__index_data__ is None:
+            self.__index_data__ = PublicKeyIndex(self.__items__)
+        return self.__index_data__
+
+    @synchronized
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        """
+        Remove key from collection and indexes
+        """
+        removed = self.__items__[index]
+        super().__delitem__(index)
+        if self.__index_data__ is not None:
+            for key in removed if isinstance(index, slice) else (removed,):
+                self.__index_data__.remove(key)
+
+    @synchronized
+    def __setitem__(self, index: int, key: PublicKey) -> None:
+        """
+        Replace key in collection and indexes
+        """
+        removed = self.__items__[index]
+        super().__setitem__(index, key)
+        if self.__index_data__ is not None:
+            order = self.__index_data__.order.get(id(removed), None)
+            self.__index_data__.remove(removed)
+            self.__index_data__.add(key, order=order)
+
+    @synchronized
+    def __remove_key__(self, key_id: str) -> None:
+        """
+        Remove key by ID from loaded identities
+
+        This does NOT remove key from keyring or filesystem
+        """
+        self.__remove_items__(self.__key_index__.sorted_keys(self.__key_index__.find_primary_key(key_id)))
+
+    @synchronized
+    def __remove_item__(self, key: PublicKey) -> None:
+        """
+        Remove specified key object from loaded keys
+        """
+        for index, item in enumerate(self.__items__):
+            if item is key:
+                del self[index]
+                return
+
+    @synchronized
+    def __remove_items__(self, keys: Iterable[PublicKey]) -> None:
+        """
+        Remove specified key objects from loaded keys in one pass
+        """
+        refs = set(id(key) for key in keys)
+        if not refs:
+            return
+        if self.__index_data__ is not None:
+            for key in self.__items__:
+                if id(key) in refs:
+                    self.__index_data__.remove(key)
+        self.__items__[:] = [key for key in self.__items__ if id(key) not in refs]
+
+    def __find_email_pattern__(self, pattern: Union[str, Iterable[str]]) -> Set[int]:
+        """
+        Find key references with any email matching the email pattern or any of the patterns
+
+        Plain domain patterns like @example.com are looked up from domain index and patterns
+        without wildcards are matched as substrings. Other patterns are compiled to a single
+        regular expression matched once per email.
+        """
+        patterns = (pattern,) if isinstance(pattern, str) else tuple(pattern)
+        refs = set()
+        substrings = []
+        email_patterns = []
+        for value in patterns:
+            domain = get_domain_pattern(value)
+            if domain is not None:
+                refs.update(self.__key_index__.find_domain_prefix(domain))
+            elif any(wildcard in value for wildcard in EMAIL_PATTERN_WILDCARDS):
+                email_patterns.append(value)
+            else:
+                substrings.append(value.lower())
+        if email_patterns:
+            match = compile_email_patterns(tuple(substrings + email_patterns)).match
+            for email, email_refs in self.__key_index__.emails.items():
+                if match(email):
+                    refs.update(email_refs)
+        elif substrings:
+            for email, email_refs in self.__key_index__.emails.items():
+                if any(value in email for value in substrings):
+                    refs.update(email_refs)
+        return refs
 
     def __get_gpg_command_args__(self) -> List[str]:
         """
@@ -52,6 +207,104 @@ class PublicKeyDataParser(GPGItemCollection):
         """
         return ['--list-keys'] + list(self.__gpg_args__)
 
+    def __get_gpg_command__(self, fast_list_mode: Optional[bool] = None) -> List[str]:
+        """
+        Full gpg command to list key details
+
+        Fast list mode defaults to the fast_list_mode setting of the collection
+        """
+        if fast_list_mode is None:
+            fast_list_mode = self.fast_list_mode
+        command = list(gpg_command('--with-colons', '--keyid-format=long', homedir=self.homedir))
+        if fast_list_mode:
+            command.append('--fast-list-mode')
+        return command + self.__get_gpg_command_args__()
+
+    def __get_gpg_output__(self,
+                           command: List[str],
+                           expected_return_codes: Optional[List[int]] = None) -> List[str]:
+        """
+        Run gpg command and return output lines
+        """
+        try:
+            stdout, _stderr = run_command_lineoutput(*command, expected_return_codes=expected_return_codes)
+        except Exception as error:
+            raise PGPKeyError(error) from error
+        return stdout
+
+    def __iter_gpg_output__(self, command: List[str]) -> Iterator[str]:
+        """
+        Run gpg command and iterate output lines as they are received
+        """
+        yield from iter_command_lineoutput(*command)
+
+    def __iter_parsed_keys__(self, lines: Iterable[str]) -> Iterator[PublicKey]:
+        """
+        Parse gpg output lines, yielding each public key when all of its child records are loaded
+        """
+        public_key = None
+        for line in lines:
+            try:
+                line = line.rstrip('\r\n')
+                record_type = line.split(':', 1)[0]
+                if record_type == RECORD_TYPE_PUBLIC_KEY:
+                    if public_key is not None:
+                        yield public_key
+                    public_key = PublicKey(line, keyring=self)
+                elif record_type == RECORD_TYPE_TRUST_DATABASE:
+                    # Trust database record starts listing output, for example in concatenated dumps
+                    if public_key is not None:
+                        yield public_key
+                    public_key = None
+                elif public_key is not None:
+                    public_key.__load_child_record__(line)
+            except PGPKeyError as error:
+                raise PGPKeyError(f'Error parsing GPG output line {line}: {error}') from error
+        if public_key is not None:
+            yield public_key
+
+    def __load_key_details__(self) -> None:
+        """
+        Load full details for keys loaded with gpg fast list mode
+
+        All loaded keys are updated in place from a single gpg listing without fast list mode.
+        Does nothing if key details are already loaded.
+        """
+        if not self.__details_loaded__:
+            self.__update_key_details__()
+
+    def __load_key_fields__(self) -> None:
+        """
+        Load key fields for keys loaded without capabilities, key lengths and dates
+
+        Keys listed in gpg fast list mode have these fields, so only collections loaded from
+        other sources like keybox files load full key details here.
+        """
+        if not self.__fields_loaded__:
+            self.__update_key_details__()
+
+    @synchronized
+    def __update_key_details__(self) -> None:
+        """
+        Update loaded keys from gpg listing without fast list mode
+        """
+        if self.__details_loaded__:
+            return
+        fields_loaded = self.__fields_loaded__
+        self.__details_loaded__ = True
+        self.__fields_loaded__ = True
+        try:
+            stdout = self.__get_gpg_output__(self.__get_gpg_command__(fast_list_mode=False))
+        except PGPKeyError:
+            self.__details_loaded__ = False
+            self.__fields_loaded__ = fields_loaded
+            raise
+
+        for key in self.__iter_parsed_keys__(stdout):
+            for loaded in self.__key_index__.sorted_keys(self.__key_index__.find_fingerprint(key.fingerprint)):
+                loaded.__update_from__(key)
+                self.__key_index__.update(loaded)
+
     @property
     def expired_keys(self) -> List[PublicKey]:
         """
@@ -66,79 +319,171 @@ class PublicKeyDataParser(GPGItemCollection):
         """
         return [key for key in self if key.key_validity == KeyValidityStatus.REVOKED]
 
+    @synchronized
     def load(self) -> None:
         """
         Load public key details with gpg CLI command
         """
         self.clear()
 
-        command = ['gpg', '--with-colons', '--keyid-format=long'] + self.__get_gpg_command_args__()
-        try:
-            stdout, _stderr = run_command_lineoutput(*command)
-            self.__loaded__ = True
-        except Exception as error:
-            raise PGPKeyError(error) from error
+        stdout = self.__get_gpg_output__(self.__get_gpg_command__())
+        self.__loaded__ = True
+        self.__details_loaded__ = not self.fast_list_mode
+        self.__fields_loaded__ = True
 
-        public_key = None
-        for line in stdout:
-            try:
-                fields = line.split(':')
-                data = dict(
-                    (KEY_FIELDS[index], field if field else None)
-                    for index, field in enumerate(fields)
-                )
-                record_type = data[FIELD_RECORD_TYPE]
-                if record_type == KeyRecordType.PUBLIC_KEY.value:
-                    public_key = PublicKey(keyring=self, **data)
-                    self.append(public_key)
-                elif public_key is not None:
-                    public_key.__load_child_record__(**data)
-            except PGPKeyError as error:
-                raise PGPKeyError(f'Error parsing GPG output line {line}: {error}') from error
+        keys = list(self.__iter_parsed_keys__(stdout))
+        keys.sort(key=attrgetter('primary_user_id'))
+        self.extend(keys)
 
-        self.__items__.sort(key=attrgetter('primary_user_id'))
+    def iter_keys(self) -> Iterator[PublicKey]:
+        """
+        Iterate public keys while gpg command output is read
 
+        Keys are yielded in gpg output order as soon as each key is parsed, without storing
+        the keys to the collection. If the collection is already loaded, loaded keys are
+        returned instead. Keys streamed in fast list mode are not enriched with full details.
+        """
+        if self.is_loaded:
+            yield from list(self.__items__)
+            return
+        yield from self.__iter_parsed_keys__(self.__iter_gpg_output__(self.__get_gpg_command__()))
+
+    @synchronized
     def filter_keys(self,
-                    email: Optional[str] = None,
+                    email: Optional[Union[str, Iterable[str]]] = None,
                     fingerprint: Optional[str] = None,
                     key_id: Optional[str] = None) -> List[PublicKey]:
         """
         Filter keys matching specified attributes
 
-        Email address can be a fnmatch pattern.
+        Email address can be a fnmatch pattern or list of patterns, matched case insensitively.
         Key ID is matched by both short and long ID, with and without 0x prefix
         """
-        def match_key(key,
-                      email: Optional[str],
-                      fingerprint: Optional[str],
-                      key_id: Optional[str]) -> bool:
-            """
-            Return True if key matches all specified filter conditions
-            """
-            if key_id is not None and not key.match_key_id(key_id):
-                return False
-            if email is not None and not key.match_email_pattern(email):
-                return False
-            if fingerprint is not None and not key.fingerprint == fingerprint:
-                return False
-            return True
-
-        matches = []
-        for key in self:
-            if match_key(key, email, fingerprint, key_id):
-                matches.append(key)
-        return self.__class__(*self.__gpg_args__, keys=matches)
+        self.__ensure_loaded__()
+
+        refs = None
+        if key_id is not None:
+            refs = self.__key_index__.find_primary_key(key_id)
+        if fingerprint is not None:
+            found = self.__key_index__.find_fingerprint(fingerprint)
+            refs = found if refs is None else refs & found
+        if email is not None:
+            found = self.__find_email_pattern__(email)
+            refs = found if refs is None else refs & found
+
+        matches = self.__key_index__.sorted_keys(refs) if refs is not None else list(self.__items__)
+        keys = self.__class__(*self.__gpg_args__, keys=matches)
+        keys.fast_list_mode = self.fast_list_mode
+        keys.__fields_loaded__ = self.__fields_loaded__
+        keys.homedir = self.homedir
+        return keys
+
+    @synchronized
+    def get_expired_keys(self, timestamp: Optional[Union[datetime, int, float]] = None) -> List[PublicKey]:
+        """
+        Return keys with expiration date at or before specified time or now
+
+        Unlike expired_keys, keys are detected by expiration date instead of gpg validity.
+        Keys are returned ordered by expiration date.
+        """
+        self.__ensure_loaded__()
+        self.__load_key_fields__()
+        return [self.__key_index__.keys[ref] for ref in self.__key_index__.find_expired(timestamp)]
+
+    @synchronized
+    def get_keys_expiring_before(self, timestamp: Union[datetime, int, float]) -> List[PublicKey]:
+        """
+        Return keys expiring before specified time, including already expired keys
+
+        Keys are returned ordered by expiration date.
+        """
+        self.__ensure_loaded__()
+        self.__load_key_fields__()
+        return [self.__key_index__.keys[ref] for ref in self.__key_index__.find_expiring_before(timestamp)]
+
+    @synchronized
+    def get_next_expiring_keys(self,
+                               count: int,
+                               timestamp: Optional[Union[datetime, int, float]] = None) -> List[PublicKey]:
+        """
+        Return next count keys to expire after specified time or now
+
+        Keys are returned ordered by expiration date.
+        """
+        self.__ensure_loaded__()
+        self.__load_key_fields__()
+        return [self.__key_index__.keys[ref] for ref in self.__key_index__.find_next_expiring(count, timestamp)]
+
+    @synchronized
+    def snapshot(self) -> KeyringSnapshot:
+        """
+        Return snapshot of loaded keys for comparing keyring changes
+        """
+        self.__ensure_loaded__()
+        return KeyringSnapshot.from_keys(self.__items__)
 
+    @synchronized
+    def validate_all(self,
+                     capabilities: Iterable[Any] = REQUIRED_CAPABILITIES,
+                     min_validity: Optional[Union[KeyValidityTrust, str]] = None) -> KeyValidationReport:
+        """
+        Validate all keys in collection for required capabilities and minimum validity
+
+        Capabilities are checked with precomputed key capability bitmasks. Key validity is
+        only checked if min_validity is given. Returns a report with results for each key.
+        """
+        self.__ensure_loaded__()
+        accepted_validity = get_accepted_validity_flags(min_validity) if min_validity is not None else None
+        report = KeyValidationReport(get_capability_flags(capabilities), accepted_validity)
+        return report.validate(self.__items__)
+
+    @synchronized
+    def clear(self) -> None:
+        """
+        Clear key collection and indexes
+        """
+        super().clear()
+        self.__index_data__ = None
+
+    @synchronized
+    def insert(self, index: int, value: PublicKey) -> None:
+        """
+        Insert key to collection and indexes
+
+        Index order is updated to match the collection when key is not inserted last
+        """
+        super().insert(index, value)
+        if self.__index_data__ is not None:
+            self.__index_data__.add(value)
+            if self.__items__[-1] is not value:
+                self.__index_data__.reorder(self.__items__)
+
+    @synchronized
+    def __insert_sorted__(self, key: PublicKey) -> None:
+        """
+        Insert key to collection after keys with same or lower primary user ID
+
+        Loaded keys are sorted by primary user ID, and this keeps the order when adding keys
+        """
+        primary_user_id = key.primary_user_id
+        index = next(
+            (index for index, item in enumerate(self.__items__) if primary_user_id < item.primary_user_id),
+            len(self.__items__)
+        )
+        self.insert(index, key)
+
+    @synchronized
     def get(self, value: str) -> PublicKey:
         """
         Return key for specified key ID or fingerprint
+
+        Sub key IDs and fingerprints are resolved to the public key they belong to
         """
-        if not self.is_loaded:
-            self.load()
-        for key in self.__items__:
-            if key.match_key_id(value) or key.fingerprint == value:
-                return key
-        raise PGPKeyError(f'Key not found: {value}')
+        self.__ensure_loaded__()
+        refs = self.__key_index__.find_key(value)
+        if not refs:
+            raise PGPKeyError(f'Key not found: {value}')
+        return self.__key_index__.sorted_keys(refs)[0]
 
 
 class UserPublicKeys(PublicKeyDataParser):
@@ -146,12 +491,137 @@ class UserPublicKeys(PublicKeyDataParser):
     List of keys in user keyring
 
     Just like PublicKeyDataParser but extended with some arguments
+
+    Parsed gpg output can be cached on disk by passing cache=True or a KeyringCache
+    object. Cached data is used until keyring files in GnuPG home directory change.
+
+    With read_trustdb_file=True the owner trust database is read from trustdb.gpg file
+    without running gpg.
     """
     trustdb: OwnerTrustDB
+    cache: Optional[KeyringCache]
 
     def __init__(self, *gpg_args: Tuple[str], **kwargs: Dict[Any, Any]) -> None:
+        cache = kwargs.pop('cache', None)
+        read_trustdb_file = kwargs.pop('read_trustdb_file', False)
         super().__init__(*gpg_args, **kwargs)
-        self.trustdb = OwnerTrustDB(self)
+        self.cache = self.__configure_cache__(cache)
+        self.trustdb = OwnerTrustDB(self, read_file=read_trustdb_file)
+
+    def __configure_cache__(self, cache: Optional[Union[bool, KeyringCache]]) -> Optional[KeyringCache]:
+        """
+        Configure keyring cache from cache argument
+        """
+        if cache is True:
+            return KeyringCache(homedir=self.homedir)
+        if isinstance(cache, KeyringCache):
+            return cache
+        return None
+
+    def __get_gpg_output__(self,
+                           command: List[str],
+                           expected_return_codes: Optional[List[int]] = None) -> List[str]:
+        """
+        Return gpg command output lines from cache or by running gpg command
+        """
+        if self.cache is None or expected_return_codes is not None:
+            return super().__get_gpg_output__(command, expected_return_codes=expected_return_codes)
+
+        stdout = self.cache.read(command)
+        if stdout is not None:
+            return stdout
+        fingerprint = self.cache.fingerprint
+        stdout = super().__get_gpg_output__(command)
+        self.cache.write(command, stdout, fingerprint)
+        return stdout
+
+    def __iter_gpg_output__(self, command: List[str]) -> Iterator[str]:
+        """
+        Iterate gpg command output lines from cache or while running gpg command
+
+        Streamed output is written to cache when the command has been completely read
+        """
+        if self.cache is None:
+            yield from super().__iter_gpg_output__(command)
+            return
+
+        stdout = self.cache.read(command)
+        if stdout is not None:
+            yield from stdout
+            return
+        fingerprint = self.cache.fingerprint
+        stdout = []
+        for line in super().__iter_gpg_output__(command):
+            stdout.append(line)
+            yield line
+        self.cache.write(command, stdout, fingerprint)
+
+    @synchronized
+    def refresh(self, *fingerprints: str) -> List[PublicKey]:
+        """
+        Reload specified keys from user keyring and update them in loaded keys
+
+        Only the specified keys are listed and parsed with gpg. Loaded key objects are
+        updated in place without changing their order, keys no longer in keyring are removed
+        and keys not yet loaded are inserted to the collection in primary user ID order.
+        Returns the refreshed keys found in keyring.
+        """
+        if not self.is_loaded:
+            self.load()
+            return [key for value in fingerprints for key in self.filter_keys(key_id=value)]
+        if not fingerprints:
+            return []
+
+        command = list(gpg_command(
+            '--with-colons', '--keyid-format=long', '--list-keys', *fingerprints,
+            homedir=self.homedir
+        ))
+        # gpg returns code 2 if any of the listed keys is not found
+        stdout = super().__get_gpg_output__(command, expected_return_codes=[0, 2])
+        refreshed = PublicKeyIndex(self.__iter_parsed_keys__(stdout))
+
+        keys = []
+        removed = []
+        for value in fingerprints:
+            refs = refreshed.find_primary_key(value)
+            if not refs:
+                removed.extend(self.__key_index__.sorted_keys(self.__key_index__.find_primary_key(value)))
+                continue
+            for key in refreshed.sorted_keys(refs):
+                loaded = self.__key_index__.sorted_keys(self.__key_index__.find_fingerprint(key.fingerprint))
+                if loaded:
+                    loaded[0].__update_from__(key)
+                    self.__key_index__.update(loaded[0])
+                    keys.append(loaded[0])
+                else:
+                    self.__insert_sorted__(key)
+                    keys.append(key)
+        self.__remove_items__(removed)
+        return keys
+
+    def get_secret_key_fingerprints(self) -> Set[str]:
+        """
+        Return primary key fingerprints of keys with secret keys in user keyring
+
+        Secret keys are listed with gpg each time, without using the keyring cache
+        """
+        command = list(gpg_command('--with-colons', '--list-secret-keys', homedir=self.homedir))
+        fingerprints = set()
+        record_type = None
+        for line in super().__get_gpg_output__(command):
+            fields = line.rstrip('\r\n').split(':')
+            if fields[0] == RECORD_TYPE_FINGERPRINT and record_type == RECORD_TYPE_SECRET_KEY and len(fields) > 9:
+                fingerprints.add(normalize_key_id(fields[9]))
+            record_type = fields[0]
+        return fingerprints
+
+    def batch(self) -> KeyringBatch:
+        """
+        Return batch for queuing key imports and deletions applied with one gpg command each
+
+        Use the batch as context manager to apply queued changes when the block exits
+        """
+        return KeyringBatch(self)
 
     def cleanup_owner_trust_database(self) -> None:
         """
@@ -165,3 +635,34 @@ class UserPublicKeys(PublicKeyDataParser):
             )
         self.trustdb.load()
         self.trustdb.remove_stale_entries()
+
+
+def load_user_keyrings(homedirs: Iterable[Union[str, Path]],
+                       jobs: Optional[int] = None,
+                       **kwargs: Dict[Any, Any]) -> Dict[Path, Union[UserPublicKeys, PGPKeyError]]:
+    """
+    Load user public keys from multiple GnuPG home directories concurrently
+
+    Each home directory is loaded with separate gpg commands in a thread pool with at most
+    jobs threads, defaulting to one thread per home directory. Keyword arguments are passed
+    to UserPublicKeys.
+
+    Returns dictionary of home directory paths to loaded keys. Errors loading a home directory
+    do not prevent loading other home directories and are returned as PGPKeyError values.
+    """
+    homedirs = list(dict.fromkeys(Path(homedir).expanduser() for homedir in homedirs))
+    if not homedirs:
+        return {}
+    if jobs is not None and jobs < 1:
+        raise PGPKeyError(f'Invalid number of jobs: {jobs}')
+
+    def load_keyring(homedir: Path) -> Union[UserPublicKeys, PGPKeyError]:
+        try:
+            keys = UserPublicKeys(homedir=homedir, **kwargs)
+            keys.load()
+            return keys
+        except PGPKeyError as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=min(jobs or len(homedirs), len(homedirs))) as executor:
+        return dict(zip(homedirs, executor.map(load_keyring, homedirs)))
@@ -0,0 +1,807 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Minimal OpenPGP packet reader for public key export files
+
+Implements ASCII armor decoding, packet framing, key fingerprint calculation and parsing
+of public key, user ID, sub key and self-signature packets as specified in RFC 4880 and
+RFC 9580. Keys are converted to gpg colon listing records, allowing loading public key
+files without running gpg.
+
+Signatures are not cryptographically verified. Signatures are matched to the primary key
+only by issuer key ID or fingerprint, and self-signatures are used to detect key expiration
+dates, capabilities and revocations. User IDs and sub keys without a self-signature from
+the primary key are dropped like gpg does, but forged or corrupted self-signatures are
+accepted where gpg would reject them.
+"""
+import base64
+import binascii
+import hashlib
+import time
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from ..exceptions import PGPKeyError
+
+from .constants import KeyCapabilityFlag
+from .public_key import (
+    RECORD_TYPE_FINGERPRINT,
+    RECORD_TYPE_PUBLIC_KEY,
+    RECORD_TYPE_SUB_KEY,
+    RECORD_TYPE_USER_ID,
+    RE_USER_ID,
+    PublicKey,
+    format_colon_record,
+)
+from .utils import escape_colon_field
+
+ARMOR_HEADER_PREFIX = b'-----BEGIN PGP '
+ARMOR_FOOTER_PREFIX = b'-----END PGP '
+ARMOR_PUBLIC_KEY_BLOCK = 'PUBLIC KEY BLOCK'
+ARMOR_LINE_LENGTH = 64
+
+CRC24_INIT = 0xb704ce
+CRC24_POLYNOMIAL = 0x1864cfb
+
+PACKET_TAG_SIGNATURE = 2
+PACKET_TAG_PUBLIC_KEY = 6
+PACKET_TAG_USER_ID = 13
+PACKET_TAG_PUBLIC_SUB_KEY = 14
+PACKET_TAG_USER_ATTRIBUTE = 17
+
+# Packet header bits
+PACKET_HEADER_BIT = 0x80
+PACKET_NEW_FORMAT_BIT = 0x40
+
+# Prefix bytes for fingerprint hashes of key packets by key version
+FINGERPRINT_PREFIX_V4 = b'\x99'
+FINGERPRINT_PREFIX_V5 = b'\x9a'
+FINGERPRINT_PREFIX_V6 = b'\x9b'
+KEY_ID_LENGTH = 16
+# Length of key packet fields before key material by key version
+KEY_PACKET_HEADER_LENGTHS = {4: 6, 5: 10, 6: 10}
+
+# Public key algorithms with key length from the bit count of first MPI in key material
+MPI_KEY_ALGORITHMS = (1, 2, 3, 16, 17, 20)
+# Public key algorithms with curve OID in key material
+ECC_KEY_ALGORITHMS = (18, 19, 22)
+# Curve names and key lengths for curve OIDs like gpg lists them
+CURVE_OIDS = {
+    bytes.fromhex('2b06010401da470f01'): ('ed25519', 255),
+    bytes.fromhex('2b060104019755010501'): ('cv25519', 255),
+    bytes.fromhex('2b6570'): ('ed25519', 255),
+    bytes.fromhex('2b656e'): ('cv25519', 255),
+    bytes.fromhex('2b6571'): ('ed448', 448),
+    bytes.fromhex('2b656f'): ('cv448', 448),
+    bytes.fromhex('2a8648ce3d030107'): ('nistp256', 256),
+    bytes.fromhex('2b81040022'): ('nistp384', 384),
+    bytes.fromhex('2b81040023'): ('nistp521', 521),
+    bytes.fromhex('2b2403030208010107'): ('brainpoolP256r1', 256),
+    bytes.fromhex('2b240303020801010b'): ('brainpoolP384r1', 384),
+    bytes.fromhex('2b240303020801010d'): ('brainpoolP512r1', 512),
+}
+# Curve names and key lengths for algorithms with fixed curve
+ALGORITHM_CURVES = {
+    25: ('cv25519', 255),
+    26: ('cv448', 448),
+    27: ('ed25519', 255),
+    28: ('ed448', 448),
+}
+
+USAGE_SIGN_CERTIFY = KeyCapabilityFlag.SIGN | KeyCapabilityFlag.CERTIFY
+# Key usage by algorithm for keys without key flags in self-signatures
+ALGORITHM_USAGE = {
+    1: KeyCapabilityFlag.ENCRYPT | USAGE_SIGN_CERTIFY | KeyCapabilityFlag.AUTHENTICATION,
+    2: KeyCapabilityFlag.ENCRYPT,
+    3: USAGE_SIGN_CERTIFY,
+    16: KeyCapabilityFlag.ENCRYPT,
+    17: USAGE_SIGN_CERTIFY | KeyCapabilityFlag.AUTHENTICATION,
+    18: KeyCapabilityFlag.ENCRYPT,
+    19: USAGE_SIGN_CERTIFY | KeyCapabilityFlag.AUTHENTICATION,
+    22: USAGE_SIGN_CERTIFY | KeyCapabilityFlag.AUTHENTICATION,
+    25: KeyCapabilityFlag.ENCRYPT,
+    26: KeyCapabilityFlag.ENCRYPT,
+    27: USAGE_SIGN_CERTIFY | KeyCapabilityFlag.AUTHENTICATION,
+    28: USAGE_SIGN_CERTIFY | KeyCapabilityFlag.AUTHENTICATION,
+}
+# Key usage for bits in first octet of key flags signature subpacket
+KEY_FLAG_USAGE = (
+    (0x01, KeyCapabilityFlag.CERTIFY),
+    (0x02, KeyCapabilityFlag.SIGN),
+    (0x04, KeyCapabilityFlag.ENCRYPT),
+    (0x08, KeyCapabilityFlag.ENCRYPT),
+    (0x20, KeyCapabilityFlag.AUTHENTICATION),
+)
+# Capability letters in gpg colon listing in gpg output order
+CAPABILITY_LETTERS = (
+    (KeyCapabilityFlag.ENCRYPT, 'e'),
+    (KeyCapabilityFlag.SIGN, 's'),
+    (KeyCapabilityFlag.CERTIFY, 'c'),
+    (KeyCapabilityFlag.AUTHENTICATION, 'a'),
+)
+
+SIGNATURE_TYPE_CERTIFICATIONS = (0x10, 0x11, 0x12, 0x13)
+SIGNATURE_TYPE_SUB_KEY_BINDING = 0x18
+SIGNATURE_TYPE_DIRECT_KEY = 0x1f
+SIGNATURE_TYPE_KEY_REVOCATION = 0x20
+SIGNATURE_TYPE_SUB_KEY_REVOCATION = 0x28
+SIGNATURE_TYPE_CERTIFICATION_REVOCATION = 0x30
+
+SUBPACKET_CREATION_TIME = 2
+SUBPACKET_KEY_EXPIRATION_TIME = 9
+SUBPACKET_ISSUER = 16
+SUBPACKET_KEY_FLAGS = 27
+SUBPACKET_ISSUER_FINGERPRINT = 33
+
+VALIDITY_UNKNOWN = '-'
+VALIDITY_EXPIRED = 'e'
+VALIDITY_REVOKED = 'r'
+
+
+def is_armored(data: bytes) -> bool:
+    """
+    Check if data is ASCII armored instead of binary OpenPGP packets
+    """
+    return not data[:1] or not data[0] & PACKET_HEADER_BIT
+
+
+def dearmor(data: bytes) -> bytes:
+    """
+    Decode all ASCII armored blocks in data to binary packet data
+
+    Armor headers and CRC24 checksum lines are skipped. Text outside the armored blocks
+    is ignored.
+    """
+    decoded = []
+    block = None
+    in_headers = False
+    for line in data.splitlines():
+        line = line.strip()
+        if block is None:
+            if line.startswith(ARMOR_HEADER_PREFIX):
+                block = []
+                in_headers = True
+            continue
+        if line.startswith(ARMOR_FOOTER_PREFIX):
+            try:
+                decoded.append(base64.b64decode(b''.join(block), validate=True))
+            except binascii.Error as error:
+                raise PGPKeyError(f'Error decoding ASCII armor: {error}') from error
+            block = None
+        elif in_headers:
+            # Armor headers end with an empty line. Some encoders omit the empty line
+            # when there are no headers.
+            if not line:
+                in_headers = False
+            elif b': ' not in line:
+                in_headers = False
+                block.append(line)
+        elif line[:1] != b'=':
+            block.append(line)
+    if block is not None:
+        raise PGPKeyError('ASCII armor block without end line')
+    return b''.join(decoded)
+
+
+def crc24(data: bytes) -> int:
+    """
+    Return CRC24 checksum of data used in ASCII armor checksum line
+    """
+    crc = CRC24_INIT
+    for value in data:
+        crc ^= value << 16
+        for _bit in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= CRC24_POLYNOMIAL
+    return crc & 0xffffff
+
+
+def armor(data: bytes, block_type: str = ARMOR_PUBLIC_KEY_BLOCK) -> bytes:
+    """
+    Encode binary packet data as ASCII armored block
+
+    Output is formatted like gpg --armor output without armor headers
+    """
+    encoded = base64.b64encode(data)
+    lines = [f'-----BEGIN PGP {block_type}-----'.encode('ascii'), b'']
+    lines.extend(encoded[offset:offset + ARMOR_LINE_LENGTH] for offset in range(0, len(encoded), ARMOR_LINE_LENGTH))
+    lines.append(b'=' + base64.b64encode(crc24(data).to_bytes(3, 'big')))
+    lines.append(f'-----END PGP {block_type}-----'.encode('ascii'))
+    return b'\n'.join(lines) + b'\n'
+
+
+def read_packet_length(data: bytes, offset: int) -> Tuple[int, int, bool]:
+    """
+    Read new format packet body length at offset
+
+    Returns the length, offset after the length octets and flag for partial body length
+    """
+    first = data[offset]
+    if first < 192:
+        return first, offset + 1, False
+    if first < 224:
+        return ((first - 192) << 8) + data[offset + 1] + 192, offset + 2, False
+    if first == 255:
+        return int.from_bytes(data[offset + 1:offset + 5], 'big'), offset + 5, False
+    return 1 << (first & 0x1f), offset + 1, True
+
+
+def iter_packet_ranges(data: bytes) -> Iterator[Tuple[int, bytes, int, int]]:
+    """
+    Iterate (tag, body, start, end) tuples of OpenPGP packets in binary packet data
+
+    Start and end are the offsets of the whole packet including header in data
+    """
+    size = len(data)
+    offset = 0
+    try:
+        while offset < size:
+            start = offset
+            header = data[offset]
+            if not header & PACKET_HEADER_BIT:
+                raise PGPKeyError(f'Invalid OpenPGP packet header at offset {offset}')
+            offset += 1
+            if header & PACKET_NEW_FORMAT_BIT:
+                tag = header & 0x3f
+                body = b''
+                partial = True
+                while partial:
+                    length, offset, partial = read_packet_length(data, offset)
+                    body += data[offset:offset + length]
+                    offset += length
+            else:
+                tag = (header >> 2) & 0x0f
+                length_type = header & 0x03
+                if length_type == 3:
+                    length = size - offset
+                else:
+                    octets = 1 << length_type
+                    length = int.from_bytes(data[offset:offset + octets], 'big')
+                    offset += octets
+                body = data[offset:offset + length]
+                offset += length
+            if offset > size:
+                raise PGPKeyError('Truncated OpenPGP packet data')
+            yield tag, body, start, offset
+    except IndexError as error:
+        raise PGPKeyError('Truncated OpenPGP packet header') from error
+
+
+def iter_packets(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """
+    Iterate (tag, body) tuples of OpenPGP packets in binary packet data
+    """
+    for tag, body, _start, _end in iter_packet_ranges(data):
+        yield tag, body
+
+
+def split_keys(data: bytes) -> List[Tuple[Optional[str], bytes]]:
+    """
+    Split binary packet data to packets of each public key with primary key fingerprint
+
+    Each key starts with a public key packet and contains all packets until next public key.
+    Packets before first public key are ignored.
+    """
+    keys = []
+    fingerprint = None
+    start = None
+    for tag, body, offset, _end in iter_packet_ranges(data):
+        if tag != PACKET_TAG_PUBLIC_KEY:
+            continue
+        if start is not None:
+            keys.append((fingerprint, data[start:offset]))
+        fingerprint = get_key_fingerprint(body)
+        start = offset
+    if start is not None:
+        keys.append((fingerprint, data[start:]))
+    return keys
+
+
+def get_key_fingerprint(body: bytes) -> Optional[str]:
+    """
+    Return fingerprint of public key or sub key packet body
+
+    Returns None for version 3 and unknown key packet versions
+    """
+    version = body[0] if body else None
+    if version == 4:
+        return hashlib.sha1(FINGERPRINT_PREFIX_V4 + len(body).to_bytes(2, 'big') + body).hexdigest().upper()
+    if version == 5:
+        return hashlib.sha256(FINGERPRINT_PREFIX_V5 + len(body).to_bytes(4, 'big') + body).hexdigest().upper()
+    if version == 6:
+        return hashlib.sha256(FINGERPRINT_PREFIX_V6 + len(body).to_bytes(4, 'big') + body).hexdigest().upper()
+    return None
+
+
+def get_key_id(version: int, fingerprint: str) -> str:
+    """
+    Return long key ID for key fingerprint
+
+    Version 4 key IDs are the end of the fingerprint, later versions use the beginning
+    """
+    if version == 4:
+        return fingerprint[-KEY_ID_LENGTH:]
+    return fingerprint[:KEY_ID_LENGTH]
+
+
+def get_key_length(algorithm: int, material: bytes) -> Tuple[int, Optional[str]]:
+    """
+    Return key length and curve name from public key material
+    """
+    if algorithm in MPI_KEY_ALGORITHMS:
+        return int.from_bytes(material[:2], 'big'), None
+    if algorithm in ECC_KEY_ALGORITHMS:
+        oid = material[1:1 + material[0]]
+        return CURVE_OIDS.get(oid, (None, 0))[::-1]
+    return ALGORITHM_CURVES.get(algorithm, (None, 0))[::-1]
+
+
+def get_user_id_hash(value: bytes) -> Optional[str]:
+    """
+    Return RIPEMD-160 hash of user ID like gpg lists it, or None if hash is not available
+    """
+    try:
+        return hashlib.new('ripemd160', value).hexdigest().upper()
+    except ValueError:
+        return None
+
+
+def iter_subpackets(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """
+    Iterate (type, data) tuples of signature subpackets
+    """
+    size = len(data)
+    offset = 0
+    try:
+        while offset < size:
+            first = data[offset]
+            if first < 192:
+                length, offset = first, offset + 1
+            elif first < 255:
+                length, offset = ((first - 192) << 8) + data[offset + 1] + 192, offset + 2
+            else:
+                length, offset = int.from_bytes(data[offset + 1:offset + 5], 'big'), offset + 5
+            if not length or offset + length > size:
+                raise PGPKeyError('Invalid signature subpacket length')
+            yield data[offset] & 0x7f, data[offset + 1:offset + length]
+            offset += length
+    except IndexError as error:
+        raise PGPKeyError('Truncated signature subpacket data') from error
+
+
+# pylint: disable=too-few-public-methods
+class OpenPGPSignature:
+    """
+    Signature packet details used for key self-signatures and revocations
+    """
+    __slots__ = ('signature_type', 'creation_timestamp', 'issuer', 'key_expiration', 'key_flags')
+
+    def __init__(self, signature_type: int, creation_timestamp: int = 0, issuer: Optional[str] = None) -> None:
+        self.signature_type = signature_type
+        self.creation_timestamp = creation_timestamp
+        self.issuer = issuer
+        self.key_expiration = None
+        self.key_flags = None
+
+    def __load_subpacket__(self, subpacket_type: int, data: bytes, hashed: bool) -> None:
+        """
+        Load signature details from subpacket
+
+        Only issuer details are accepted from unhashed subpackets
+        """
+        if subpacket_type == SUBPACKET_ISSUER:
+            self.issuer = self.issuer or data.hex().upper()
+        elif subpacket_type == SUBPACKET_ISSUER_FINGERPRINT:
+            self.issuer = data[1:].hex().upper()
+        elif not hashed:
+            return
+        elif subpacket_type == SUBPACKET_CREATION_TIME:
+            self.creation_timestamp = int.from_bytes(data[:4], 'big')
+        elif subpacket_type == SUBPACKET_KEY_EXPIRATION_TIME:
+            self.key_expiration = int.from_bytes(data[:4], 'big')
+        elif subpacket_type == SUBPACKET_KEY_FLAGS:
+            self.key_flags = data[0] if data else 0
+
+    def is_issued_by(self, key: 'OpenPGPKeyPacket') -> bool:
+        """
+        Check if signature is issued by key, accepting signatures without issuer details
+        """
+        if self.issuer is None:
+            return True
+        if len(self.issuer) == KEY_ID_LENGTH:
+            return self.issuer == key.key_id
+        return self.issuer == key.fingerprint
+
+
+def parse_signature(body: bytes) -> Optional[OpenPGPSignature]:
+    """
+    Parse signature packet body
+
+    Returns None for unknown signature packet versions
+    """
+    version = body[0] if body else None
+    if version == 3:
+        return OpenPGPSignature(body[2], int.from_bytes(body[3:7], 'big'), body[7:15].hex().upper())
+    if version not in (4, 5, 6):
+        return None
+    length_size = 4 if version == 6 else 2
+    signature = OpenPGPSignature(body[1])
+    offset = 4
+    for hashed in (True, False):
+        length = int.from_bytes(body[offset:offset + length_size], 'big')
+        offset += length_size
+        if offset + length > len(body):
+            raise PGPKeyError('Truncated signature packet')
+        for subpacket_type, data in iter_subpackets(body[offset:offset + length]):
+            signature.__load_subpacket__(subpacket_type, data, hashed)
+        offset += length
+    return signature
+
+
+class OpenPGPKeyPacket:
+    """
+    Public key or sub key packet with details from self-signatures
+    """
+    __slots__ = (
+        'version',
+        'fingerprint',
+        'key_id',
+        'algorithm',
+        'key_length',
+        'curve_name',
+        'creation_timestamp',
+        'self_signature',
+        'revoked',
+    )
+
+    def __init__(self, body: bytes) -> None:
+        self.version = body[0] if body else None
+        if self.version not in KEY_PACKET_HEADER_LENGTHS:
+            raise PGPKeyError(f'Unsupported key packet version {self.version}')
+        if len(body) <= KEY_PACKET_HEADER_LENGTHS[self.version]:
+            raise PGPKeyError('Truncated key packet')
+        if self.version == 4:
+            material = body[6:]
+        else:
+            material = body[10:10 + int.from_bytes(body[6:10], 'big')]
+        self.fingerprint = get_key_fingerprint(body)
+        self.key_id = get_key_id(self.version, self.fingerprint)
+        self.creation_timestamp = int.from_bytes(body[1:5], 'big')
+        self.algorithm = body[5]
+        try:
+            self.key_length, self.curve_name = get_key_length(self.algorithm, material)
+        except IndexError as error:
+            raise PGPKeyError(f'Truncated key material in key {self.fingerprint}') from error
+        self.self_signature = None
+        self.revoked = False
+
+    def __repr__(self) -> str:
+        return self.fingerprint
+
+    def __set_self_signature__(self, signature: OpenPGPSignature) -> None:
+        """
+        Set self-signature for key if it is newer than current self-signature
+        """
+        if self.self_signature is None or signature.creation_timestamp >= self.self_signature.creation_timestamp:
+            self.self_signature = signature
+
+    @property
+    def expiration_timestamp(self) -> Optional[int]:
+        """
+        Return key expiration timestamp from self-signature or None if key does not expire
+        """
+        if self.self_signature is None or not self.self_signature.key_expiration:
+            return None
+        return self.creation_timestamp + self.self_signature.key_expiration
+
+    @property
+    def usage(self) -> KeyCapabilityFlag:
+        """
+        Return key usage flags from self-signature, defaulting to usage allowed by algorithm
+        """
+        if self.self_signature is None or self.self_signature.key_flags is None:
+            return ALGORITHM_USAGE.get(self.algorithm, KeyCapabilityFlag.UNKNOWN)
+        usage = KeyCapabilityFlag.NONE
+        for bit, flag in KEY_FLAG_USAGE:
+            if self.self_signature.key_flags & bit:
+                usage |= flag
+        return usage
+
+    def is_expired(self, timestamp: int) -> bool:
+        """
+        Check if key is expired at specified timestamp
+        """
+        expiration = self.expiration_timestamp
+        return expiration is not None and expiration <= timestamp
+
+    def get_validity(self, timestamp: int) -> str:
+        """
+        Return gpg validity field value for key without trust database
+        """
+        if self.revoked:
+            return VALIDITY_REVOKED
+        if self.is_expired(timestamp):
+            return VALIDITY_EXPIRED
+        return VALIDITY_UNKNOWN
+
+    def get_colon_record(self, record_type: str, validity: str, capabilities: str, **kwargs: Any) -> str:
+        """
+        Return gpg colon listing record for key
+        """
+        return format_colon_record(
+            record_type=record_type,
+            validity=validity,
+            key_length=self.key_length,
+            public_key_algorithm=self.algorithm,
+            key_id=self.key_id,
+            creation_date=self.creation_timestamp,
+            expiration_date=self.expiration_timestamp,
+            key_capabilities=capabilities,
+            curve_name=self.curve_name,
+            **kwargs
+        )
+
+
+class OpenPGPUserID:
+    """
+    User ID packet with self-signature details
+    """
+    __slots__ = ('value', 'self_signature', 'revocation')
+
+    def __init__(self, value: bytes) -> None:
+        self.value = value
+        self.self_signature = None
+        self.revocation = None
+
+    def __repr__(self) -> str:
+        return self.user_id
+
+    @property
+    def user_id(self) -> str:
+        """
+        Return user ID as string
+        """
+        return self.value.decode('utf-8', errors='replace')
+
+    @property
+    def revoked(self) -> bool:
+        """
+        Check if user ID is revoked with revocation newer than the self-signature
+        """
+        if self.revocation is None:
+            return False
+        return self.self_signature is None or \
+            self.revocation.creation_timestamp >= self.self_signature.creation_timestamp
+
+    def __set_self_signature__(self, signature: OpenPGPSignature) -> None:
+        """
+        Set self-signature for user ID if it is newer than current self-signature
+        """
+        if self.self_signature is None or signature.creation_timestamp >= self.self_signature.creation_timestamp:
+            self.self_signature = signature
+
+
+class OpenPGPKey:
+    """
+    OpenPGP public key with user IDs and sub keys parsed from packets
+    """
+    __slots__ = ('primary', 'user_ids', 'sub_keys')
+
+    def __init__(self, primary: OpenPGPKeyPacket) -> None:
+        self.primary = primary
+        self.user_ids = []
+        self.sub_keys = []
+
+    def __repr__(self) -> str:
+        return self.fingerprint
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Return primary key fingerprint
+        """
+        return self.primary.fingerprint
+
+    def __add_signature__(self, target: Union[OpenPGPKeyPacket, OpenPGPUserID],
+                          signature: OpenPGPSignature) -> None:
+        """
+        Add signature following key, sub key or user ID packet
+
+        Signatures not issued by the primary key are ignored
+        """
+        if not signature.is_issued_by(self.primary):
+            return
+        signature_type = signature.signature_type
+        if target is self.primary:
+            if signature_type == SIGNATURE_TYPE_KEY_REVOCATION:
+                self.primary.revoked = True
+            elif signature_type == SIGNATURE_TYPE_DIRECT_KEY:
+                self.primary.__set_self_signature__(signature)
+        elif isinstance(target, OpenPGPUserID):
+            if signature_type in SIGNATURE_TYPE_CERTIFICATIONS:
+                target.__set_self_signature__(signature)
+                self.primary.__set_self_signature__(signature)
+            elif signature_type == SIGNATURE_TYPE_CERTIFICATION_REVOCATION:
+                target.revocation = signature
+        elif signature_type == SIGNATURE_TYPE_SUB_KEY_BINDING:
+            target.__set_self_signature__(signature)
+        elif signature_type == SIGNATURE_TYPE_SUB_KEY_REVOCATION:
+            target.revoked = True
+
+    def __remove_unbound__(self) -> None:
+        """
+        Remove user IDs and sub keys without self-signature from primary key
+
+        gpg ignores user IDs without self-signature and sub keys without binding signature,
+        and their capabilities are not usable
+        """
+        self.user_ids = [user_id for user_id in self.user_ids if user_id.self_signature is not None]
+        self.sub_keys = [sub_key for sub_key in self.sub_keys if sub_key.self_signature is not None]
+
+    def get_capabilities(self, timestamp: int) -> str:
+        """
+        Return gpg capabilities field for primary key
+
+        Lower case letters are the primary key capabilities and upper case letters the
+        capabilities of all usable keys. Primary key can always certify other keys.
+        """
+        usage = self.primary.usage | KeyCapabilityFlag.CERTIFY
+        capabilities = ''.join(letter for flag, letter in CAPABILITY_LETTERS if usage & flag)
+        if self.primary.revoked or self.primary.is_expired(timestamp):
+            return capabilities
+        usable = usage
+        for sub_key in self.sub_keys:
+            if not sub_key.revoked and not sub_key.is_expired(timestamp):
+                usable |= sub_key.usage
+        return capabilities + ''.join(letter.upper() for flag, letter in CAPABILITY_LETTERS if usable & flag)
+
+    def get_colon_lines(self, timestamp: Optional[int] = None) -> List[str]:
+        """
+        Return key as gpg --with-colons --show-keys listing records
+
+        Validity is checked at specified timestamp, defaulting to current time. Without
+        trust database validity is unknown unless the key is expired or revoked.
+        """
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        validity = self.primary.get_validity(timestamp)
+        lines = [
+            self.primary.get_colon_record(
+                RECORD_TYPE_PUBLIC_KEY, validity, self.get_capabilities(timestamp), owner_trust=VALIDITY_UNKNOWN
+            ),
+            format_colon_record(record_type=RECORD_TYPE_FINGERPRINT, user_id=self.fingerprint),
+        ]
+        for user_id in self.user_ids:
+            revoked = user_id.revoked
+            lines.append(format_colon_record(
+                record_type=RECORD_TYPE_USER_ID,
+                validity=VALIDITY_REVOKED if revoked and validity == VALIDITY_UNKNOWN else validity,
+                creation_date=user_id.self_signature.creation_timestamp
+                if user_id.self_signature is not None and not revoked else None,
+                key_hash=get_user_id_hash(user_id.value),
+                user_id=escape_colon_field(user_id.user_id),
+            ))
+        for sub_key in self.sub_keys:
+            sub_key_validity = sub_key.get_validity(timestamp)
+            if validity != VALIDITY_UNKNOWN and sub_key_validity == VALIDITY_UNKNOWN:
+                sub_key_validity = validity
+            capabilities = ''.join(letter for flag, letter in CAPABILITY_LETTERS if sub_key.usage & flag)
+            lines.append(sub_key.get_colon_record(RECORD_TYPE_SUB_KEY, sub_key_validity, capabilities))
+            lines.append(format_colon_record(record_type=RECORD_TYPE_FINGERPRINT, user_id=sub_key.fingerprint))
+        return lines
+
+
+def iter_openpgp_keys(data: bytes) -> Iterator[OpenPGPKey]:
+    """
+    Iterate public keys in binary OpenPGP packet data
+
+    Signatures following user attributes and packets before first public key are ignored.
+    User IDs and sub keys without self-signature from the primary key are dropped.
+    """
+    key = None
+    target = None
+    for tag, body in iter_packets(data):
+        if tag == PACKET_TAG_PUBLIC_KEY:
+            if key is not None:
+                key.__remove_unbound__()
+                yield key
+            key = OpenPGPKey(OpenPGPKeyPacket(body))
+            target = key.primary
+        elif key is None:
+            continue
+        elif tag == PACKET_TAG_PUBLIC_SUB_KEY:
+            target = OpenPGPKeyPacket(body)
+            key.sub_keys.append(target)
+        elif tag == PACKET_TAG_USER_ID:
+            target = OpenPGPUserID(body)
+            key.user_ids.append(target)
+        elif tag == PACKET_TAG_USER_ATTRIBUTE:
+            target = None
+        elif tag == PACKET_TAG_SIGNATURE and target is not None:
+            try:
+                signature = parse_signature(body)
+            except IndexError as error:
+                raise PGPKeyError(f'Truncated signature packet in key {key}') from error
+            if signature is not None:
+                key.__add_signature__(target, signature)
+    if key is not None:
+        key.__remove_unbound__()
+        yield key
+
+
+def read_packet_data(path: Union[str, Path]) -> bytes:
+    """
+    Read binary OpenPGP packet data from binary or ASCII armored file
+    """
+    try:
+        data = Path(path).expanduser().read_bytes()
+    except OSError as error:
+        raise PGPKeyError(f'Error reading {path}: {error}') from error
+    return dearmor(data) if is_armored(data) else data
+
+
+def read_key_fingerprints(path: Union[str, Path]) -> List[Optional[str]]:
+    """
+    Return primary key fingerprints of keys in file in file order
+
+    Fingerprint is None for keys with unsupported key packet version
+    """
+    return [
+        get_key_fingerprint(body)
+        for tag, body in iter_packets(read_packet_data(path))
+        if tag == PACKET_TAG_PUBLIC_KEY
+    ]
+
+
+def read_key_identities(path: Union[str, Path]) -> Optional[Dict[str, List[str]]]:
+    """
+    Return primary key fingerprints, sub key fingerprints and emails of keys in file
+
+    Only packet headers, key packets and user ID packets are read. Returns None if file
+    has no keys or has keys with unsupported key packet versions.
+    """
+    identities = {'fingerprints': [], 'sub_keys': [], 'emails': []}
+    for tag, body in iter_packets(read_packet_data(path)):
+        if tag in (PACKET_TAG_PUBLIC_KEY, PACKET_TAG_PUBLIC_SUB_KEY):
+            fingerprint = get_key_fingerprint(body)
+            if fingerprint is None:
+                return None
+            identities['fingerprints' if tag == PACKET_TAG_PUBLIC_KEY else 'sub_keys'].append(fingerprint)
+        elif tag == PACKET_TAG_USER_ID:
+            match = RE_USER_ID.match(body.decode('utf-8', errors='replace'))
+            if match:
+                identities['emails'].append(match.group('email').lower())
+    if not identities['fingerprints']:
+        return None
+    return identities
+
+
+def read_openpgp_keys(path: Union[str, Path]) -> List[OpenPGPKey]:
+    """
+    Read public keys from binary or ASCII armored key file
+    """
+    return list(iter_openpgp_keys(read_packet_data(path)))
+
+
+def read_public_keys(path: Union[str, Path],
+                     keyring: Optional[Any] = None,
+                     timestamp: Optional[int] = None) -> List[PublicKey]:
+    """
+    Read public keys from key file as PublicKey objects without running gpg
+
+    Keys are listed like gpg --show-keys lists well-formed key files, except validity is
+    unknown unless the key is expired or revoked. Signatures are not cryptographically
+    verified, so keys with invalid self-signatures may differ from gpg output.
+    """
+    keys = []
+    for openpgp_key in read_openpgp_keys(path):
+        lines = openpgp_key.get_colon_lines(timestamp)
+        key = PublicKey(lines[0], keyring=keyring)
+        for line in lines[1:]:
+            key.__load_child_record__(line)
+        keys.append(key)
+    return keys
@@ -6,29 +6,37 @@
 """
 Loading of PGP public key details for password store management
 """
-import fnmatch
 import re
 
+from collections.abc import MutableMapping
 from datetime import datetime, timezone
 from subprocess import run, PIPE, CalledProcessError
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
 
 from ..exceptions import PGPKeyError
 from .base import FingerprintObject
+from .index import compile_email_patterns
+from .utils import gpg_command
 from .constants import (
     FIELD_CREATION_DATE,
     FIELD_EXPIRATION_DATE,
     FIELD_KEY_CAPABILITIES,
     FIELD_KEY_ID,
     FIELD_KEY_LENGTH,
-    FIELD_RECORD_TYPE,
     FIELD_USER_ID,
     FIELD_KEY_VALIDITY,
-    KEY_CAPABILITIES,
+    KEY_CAPABILITY_ENUM_FLAGS,
+    KEY_CAPABILITY_FLAGS,
+    KEY_FIELDS,
+    KEY_FIELD_INDEXES,
+    KEY_VALIDITY_BITMASKS,
     KEY_VALIDITY_FLAGS,
     REQUIRED_CAPABILITIES,
     TRUSTDB_TRUST_LABELS,
     KeyCapability,
+    KeyCapabilityFlag,
+    KeyValidityFlag,
     KeyValidityStatus,
     KeyRecordType,
     KeyTrustDB,
@@ -37,22 +45,166 @@ from .constants import (
 # Parse public key user ID required fields
 RE_USER_ID = re.compile(r'^(?P<fullname>.*) <(?P<email>[^<]+)>$')
 
+# Key capability enums for each capability bitmask flag
+CAPABILITY_FLAG_ENUMS = dict((flag, capability) for capability, flag in KEY_CAPABILITY_ENUM_FLAGS.items())
+
+# Record type values for comparisons when parsing records, avoiding enum lookups per line
+RECORD_TYPE_FINGERPRINT = KeyRecordType.FINGERPRINT.value
+RECORD_TYPE_PUBLIC_KEY = KeyRecordType.PUBLIC_KEY.value
+RECORD_TYPE_SECRET_KEY = KeyRecordType.SECRET_KEY.value
+RECORD_TYPE_SUB_KEY = KeyRecordType.SUB_KEY.value
+RECORD_TYPE_TRUST_DATABASE = KeyRecordType.TRUST_DATABASE.value
+RECORD_TYPE_USER_ATTRIBUTE = KeyRecordType.USER_ATTRIBUTE.value
+RECORD_TYPE_USER_ID = KeyRecordType.USER_ID.value
+
+
+def format_colon_record(*args, **kwargs) -> str:
+    """
+    Format gpg colon record line from a raw line or field values
+
+    Fields can be given as a string with the raw colon separated line, or as dictionary
+    of field names and values. Missing and None fields are left empty.
+    """
+    if len(args) == 1 and not kwargs and isinstance(args[0], str):
+        return args[0].rstrip('\r\n')
+    data = dict(*args, **kwargs)
+    if not data:
+        return ''
+    try:
+        count = max(KEY_FIELD_INDEXES[field] for field in data) + 1
+    except KeyError as error:
+        raise PGPKeyError(f'Unexpected key record field {error}') from error
+    fields = [''] * count
+    for field, value in data.items():
+        fields[KEY_FIELD_INDEXES[field]] = format_colon_field(value)
+    return ':'.join(fields)
+
+
+def get_capability_flags(capabilities: Iterable[Any]) -> KeyCapabilityFlag:
+    """
+    Return capability bitmask for capability names, KeyCapability values or capability flags
+    """
+    flags = KeyCapabilityFlag.NONE
+    for capability in capabilities:
+        if isinstance(capability, KeyCapabilityFlag):
+            flags |= capability
+            continue
+        if isinstance(capability, str):
+            try:
+                capability = KeyCapability(capability)
+            except ValueError as error:
+                raise PGPKeyError(f'Invalid key capability {capability}') from error
+        flags |= KEY_CAPABILITY_ENUM_FLAGS[capability]
+    return flags
+
+
+def format_colon_field(value: Any) -> str:
+    """
+    Format value for gpg colon record field
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ''.join(str(item) for item in value)
+    return str(value)
+
+
+class GpgOutputFields(MutableMapping):
+    """
+    Mapping of field names to values for a gpg output line
+
+    Values are decoded from the raw colon line when accessed. Empty fields are returned
+    as None and fields not present in the line raise KeyError like missing dictionary keys.
+    """
+    __slots__ = ('__record__',)
+
+    def __init__(self, record: 'GpgOutputLine') -> None:
+        self.__record__ = record
+
+    def __getitem__(self, field: str) -> Optional[str]:
+        if field not in KEY_FIELD_INDEXES:
+            raise KeyError(field)
+        return self.__record__.__get_field__(KEY_FIELD_INDEXES[field], strict=True)
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        if field not in KEY_FIELD_INDEXES:
+            raise KeyError(field)
+        self.__record__.__set_field__(KEY_FIELD_INDEXES[field], value)
+
+    def __delitem__(self, field: str) -> None:
+        self[field] = None
+
+    def __iter__(self) -> Iterator[str]:
+        count = self.__record__.__line__.count(':') + 1 if self.__record__.__line__ else 0
+        return iter(KEY_FIELDS[:count])
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
 
 # pylint: disable=too-few-public-methods
 class GpgOutputLine:
     """
     Parsed key fields line from key data output linked to a key
+
+    Only the raw colon separated line is stored. Fields are split from the line each time
+    they are accessed and are not cached.
     """
-    __data__: Dict[Any, Any]
+    __slots__ = ('__line__',)
 
     def __init__(self, *args, **kwargs):
-        self.__data__ = dict(*args, **kwargs)
+        self.__line__ = format_colon_record(*args, **kwargs)
+
+    @property
+    def __data__(self) -> GpgOutputFields:
+        """
+        Return mapping of decoded field names to values
+        """
+        return GpgOutputFields(self)
+
+    @property
+    def line(self) -> str:
+        """
+        Return raw gpg colon output line for record
+        """
+        return self.__line__
+
+    def __get_field__(self, index: int, strict: bool = False) -> Optional[str]:
+        """
+        Decode field by index from raw colon line
+
+        Empty fields are returned as None. Missing fields raise KeyError in strict mode and
+        are otherwise returned as None.
+        """
+        fields = self.__line__.split(':', index + 1) if self.__line__ else []
+        if len(fields) <= index:
+            if strict:
+                raise KeyError(KEY_FIELDS[index])
+            return None
+        value = fields[index]
+        return value if value else None
+
+    def __set_field__(self, index: int, value: Any) -> None:
+        """
+        Set field value by index in raw colon line
+        """
+        fields = self.__line__.split(':') if self.__line__ else []
+        if len(fields) <= index:
+            fields.extend([''] * (index + 1 - len(fields)))
+        fields[index] = format_colon_field(value)
+        self.__line__ = ':'.join(fields)
+
+    def __field__(self, field: str) -> Optional[str]:
+        """
+        Return decoded field value by field name or None if field is not set
+        """
+        return self.__get_field__(KEY_FIELD_INDEXES[field])
 
     def __get_timestamp_as_date__(self, field: Optional[Any]) -> Optional[datetime]:
         """
         Get field timestamp value as date or None if not defined
         """
-        value = self.__data__.get(field, None)
+        value = self.__field__(field)
         if not value:
             return None
         return datetime.fromtimestamp(int(value)).astimezone(timezone.utc)
@@ -61,40 +213,89 @@ class GpgOutputLine:
 class KeyData(GpgOutputLine):
     """
     GPG output line for key (public key, sub key) data
+
+    Subclasses must define __key_flags__ slot for cached capability and validity bitmasks
     """
+    __slots__ = ()
+    __key_flags__: Optional[Tuple[KeyCapabilityFlag, KeyValidityFlag]]
+
+    def __load_details__(self) -> None:
+        """
+        Load full key details if key was listed with gpg fast list mode
+        """
+
+    def __load_fields__(self) -> None:
+        """
+        Load key fields like capabilities, key length and dates if key was listed without them
+        """
+
+    def __set_field__(self, index: int, value: Any) -> None:
+        """
+        Set field value and reset cached key flags
+        """
+        super().__set_field__(index, value)
+        self.__key_flags__ = None
+
+    def __get_key_flags__(self) -> Tuple[KeyCapabilityFlag, KeyValidityFlag]:
+        """
+        Return cached capability and validity bitmasks, decoding them from line on first access
+        """
+        if self.__key_flags__ is None:
+            capabilities = KeyCapabilityFlag.NONE
+            for capability in (self.__field__(FIELD_KEY_CAPABILITIES) or '').lower():
+                capabilities |= KEY_CAPABILITY_FLAGS.get(capability, KeyCapabilityFlag.NONE)
+            validity = KEY_VALIDITY_BITMASKS.get((self.__field__(FIELD_KEY_VALIDITY) or '').lower(), None)
+            self.__key_flags__ = (capabilities, validity if validity is not None else KeyValidityFlag.INVALID)
+        return self.__key_flags__
+
+    @property
+    def capability_flags(self) -> KeyCapabilityFlag:
+        """
+        Return key capabilities as bitmask
+        """
+        self.__load_fields__()
+        return self.__get_key_flags__()[0]
+
+    @property
+    def validity_flags(self) -> KeyValidityFlag:
+        """
+        Return key validity as bitmask
+        """
+        self.__load_details__()
+        return self.__get_key_flags__()[1]
+
     @property
     def key_id(self) -> str:
         """
         Return key ID
         """
-        return f"""0x{self.__data__[FIELD_KEY_ID]}"""
+        return f"""0x{self.__get_field__(KEY_FIELD_INDEXES[FIELD_KEY_ID], strict=True)}"""
 
     @property
     def key_length(self) -> int:
         """
         Return key length
         """
-        return int(self.__data__[FIELD_KEY_LENGTH])
+        self.__load_fields__()
+        return int(self.__get_field__(KEY_FIELD_INDEXES[FIELD_KEY_LENGTH], strict=True))
 
     @property
     def key_capabilities(self) -> Tuple[str]:
         """
         Return key capabilities
         """
-        capabilities = self.__data__.get(FIELD_KEY_CAPABILITIES, [])
-        return tuple(set(
-            KEY_CAPABILITIES[capability.lower()]
-            for capability in capabilities
-        ))
+        flags = self.capability_flags
+        return tuple(capability for flag, capability in CAPABILITY_FLAG_ENUMS.items() if flags & flag)
 
     @property
     def key_validity(self) -> str:
         """
         Return key validity
         """
+        self.__load_details__()
         try:
-            return KEY_VALIDITY_FLAGS[self.__data__[FIELD_KEY_VALIDITY].lower()]
-        except KeyError:
+            return KEY_VALIDITY_FLAGS[self.__field__(FIELD_KEY_VALIDITY).lower()]
+        except (AttributeError, KeyError):
             return KeyValidityStatus.INVALID
 
     @property
@@ -102,20 +303,38 @@ class KeyData(GpgOutputLine):
         """
         Return key creation date
         """
+        self.__load_fields__()
         return self.__get_timestamp_as_date__(FIELD_CREATION_DATE)
 
     @property
     def expiration_date(self) -> datetime:
         """
-        Return key creation date
+        Return key expiration date
         """
+        self.__load_fields__()
         return self.__get_timestamp_as_date__(FIELD_EXPIRATION_DATE)
 
+    @property
+    def expiration_timestamp(self) -> Optional[int]:
+        """
+        Return key expiration date as epoch timestamp or None if key does not expire
+        """
+        self.__load_fields__()
+        return self.__get_expiration_timestamp__()
+
+    def __get_expiration_timestamp__(self) -> Optional[int]:
+        """
+        Return expiration timestamp from loaded fields without loading missing key fields
+        """
+        value = self.__field__(FIELD_EXPIRATION_DATE)
+        return int(value) if value else None
+
 
 class GpgOutputLineChild(GpgOutputLine):
     """
     Parsed key fields linked to parent key
     """
+    __slots__ = ('key',)
     key: 'PublicKey'
 
     def __init__(self, key: 'PublicKey', *args, **kwargs):
@@ -127,32 +346,39 @@ class Fingerprint(GpgOutputLineChild, FingerprintObject):
     """
     Fingerprint for public key file
     """
+    __slots__ = ('fingerprint',)
     fingerprint: str
 
     def __init__(self, key: 'PublicKey', *args, **kwargs):
         super().__init__(key, *args, **kwargs)
-        self.fingerprint = self.__data__[FIELD_USER_ID]
+        self.fingerprint = self.__field__(FIELD_USER_ID)
 
 
 class UserID(GpgOutputLineChild):
     """
     User ID record for public key
     """
-    user_id: str
+    __slots__ = ('email', 'fullname')
     email: str
     fullname: str
 
     def __init__(self, key: 'PublicKey', *args, **kwargs):
         super().__init__(key, *args, **kwargs)
-        match = RE_USER_ID.match(self.__data__[FIELD_USER_ID])
+        match = RE_USER_ID.match(self.user_id or '')
         if not match:
-            raise PGPKeyError(f'Unexpected user ID {self.__data__[FIELD_USER_ID]}')
-        self.user_id = self.__data__[FIELD_USER_ID]
-        for attr, value in match.groupdict().items():
-            setattr(self, attr, value)
+            raise PGPKeyError(f'Unexpected user ID {self.user_id}')
+        self.email = match.group('email')
+        self.fullname = match.group('fullname')
 
     def __repr__(self) -> str:
-        return self.__data__[FIELD_USER_ID]
+        return self.user_id
+
+    @property
+    def user_id(self) -> Optional[str]:
+        """
+        Return user ID string
+        """
+        return self.__field__(FIELD_USER_ID)
 
     def __eq__(self, other: Any) -> bool:
         return str(self) == str(other)
@@ -177,6 +403,7 @@ class UserID(GpgOutputLineChild):
         """
         Return key user ID creation date
         """
+        self.key.__load_fields__()
         return self.__get_timestamp_as_date__(FIELD_CREATION_DATE)
 
 
@@ -184,16 +411,38 @@ class SubKey(KeyData, GpgOutputLineChild):
     """
     Sub key of a public key
     """
+    __slots__ = ('fingerprint', '__key_flags__')
+
+    def __init__(self, key: 'PublicKey', *args, **kwargs):
+        super().__init__(key, *args, **kwargs)
+        self.fingerprint = None
+        self.__key_flags__ = None
+
     def __repr__(self):
         return self.key_id if self.key_id else ''
 
+    def __load_details__(self) -> None:
+        """
+        Load full key details with the public key
+        """
+        self.key.__load_details__()
+
+    def __load_fields__(self) -> None:
+        """
+        Load key fields with the public key
+        """
+        self.key.__load_fields__()
+
 
 class PublicKey(KeyData, GpgOutputLine):
     """
     Public key parsed from gpg output
     """
+    __slots__ = ('keyring', 'fingerprint', 'user_ids', 'sub_keys', '__key_flags__')
+
     def __init__(self, *args, **kwargs) -> None:
         self.keyring = kwargs.pop('keyring', None)
+        self.__key_flags__ = None
         super().__init__(*args, **kwargs)
         self.fingerprint = None
         self.user_ids = []
@@ -220,28 +469,82 @@ class PublicKey(KeyData, GpgOutputLine):
     def __ge__(self, other: Any) -> bool:
         return str(self) >= str(other)
 
-    def __load_child_record__(self, **data) -> None:
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
         """
-        Load a child record from parsed data
+        Pickle key as compact tuples of colon lines and parsed user ID values
+
+        Keys are pickled without keyring, for example when returned from worker processes
         """
-        record_type = data[FIELD_RECORD_TYPE]
-        if record_type == KeyRecordType.FINGERPRINT.value:
+        return (
+            restore_public_key,
+            (
+                self.__line__,
+                self.fingerprint.__line__ if self.fingerprint is not None else None,
+                [(user_id.__line__, user_id.email, user_id.fullname) for user_id in self.user_ids],
+                [
+                    (sub_key.__line__, sub_key.fingerprint.__line__ if sub_key.fingerprint is not None else None)
+                    for sub_key in self.sub_keys
+                ],
+            )
+        )
+
+    def __load_details__(self) -> None:
+        """
+        Load full key details for all keys in keyring if keyring was loaded in fast list mode
+        """
+        if self.keyring is not None:
+            self.keyring.__load_key_details__()
+
+    def __load_fields__(self) -> None:
+        """
+        Load key fields for all keys in keyring if keyring was loaded without them
+        """
+        if self.keyring is not None:
+            self.keyring.__load_key_fields__()
+
+    def __update_from__(self, other: 'PublicKey') -> None:
+        """
+        Update key records in place from another parsed copy of the same key
+        """
+        self.__line__ = other.__line__
+        self.__key_flags__ = None
+        self.fingerprint = other.fingerprint
+        self.user_ids = other.user_ids
+        self.sub_keys = other.sub_keys
+        for record in [self.fingerprint] + self.user_ids + self.sub_keys:
+            if record is not None:
+                record.key = self
+
+    def __load_child_record__(self, *args, **data) -> None:
+        """
+        Load a child record from raw colon line or parsed field data
+        """
+        line = format_colon_record(*args, **data)
+        record_type = line.split(':', 1)[0]
+        if record_type == RECORD_TYPE_FINGERPRINT:
             key = self.sub_keys[-1] if self.sub_keys else self
-            key.fingerprint = Fingerprint(key, **data)
+            key.fingerprint = Fingerprint(key, line)
             return key.fingerprint
-        if record_type == KeyRecordType.SUB_KEY.value:
-            subkey = SubKey(self, **data)
+        if record_type == RECORD_TYPE_SUB_KEY:
+            subkey = SubKey(self, line)
             self.sub_keys.append(subkey)
             return subkey
-        if record_type == KeyRecordType.USER_ID.value:
-            user_id = UserID(self, **data)
+        if record_type == RECORD_TYPE_USER_ID:
+            user_id = UserID(self, line)
             self.user_ids.append(user_id)
             return user_id
-        if record_type == KeyRecordType.USER_ATTRIBUTE.value:
+        if record_type == RECORD_TYPE_USER_ATTRIBUTE:
             # User attributes are ignored for now
             return None
         raise PGPKeyError(f'{self} Unexpected public key child record type {record_type}')
 
+    @property
+    def homedir(self) -> Optional[Path]:
+        """
+        Return GnuPG home directory of the keyring the key was loaded from, None for default
+        """
+        return getattr(self.keyring, 'homedir', None)
+
     @property
     def primary_user_id(self) -> str:
         """
@@ -252,6 +555,23 @@ class PublicKey(KeyData, GpgOutputLine):
         except IndexError as error:
             raise PGPKeyError(f'No user ID detected {self}') from error
 
+    @property
+    def colon_lines(self) -> List[str]:
+        """
+        Return key as gpg colon listing records for the key, user IDs and sub keys
+
+        User attribute records are not stored in parsed keys and are not included
+        """
+        lines = [self.__line__]
+        if self.fingerprint is not None:
+            lines.append(self.fingerprint.__line__)
+        lines.extend(user_id.__line__ for user_id in self.user_ids)
+        for sub_key in self.sub_keys:
+            lines.append(sub_key.__line__)
+            if sub_key.fingerprint is not None:
+                lines.append(sub_key.fingerprint.__line__)
+        return lines
+
     @property
     def emails(self) -> List[str]:
         """
@@ -266,11 +586,10 @@ class PublicKey(KeyData, GpgOutputLine):
         Checks if:
         - key can be used for encryption
         """
-        for capability in capabilities:
-            if isinstance(capability, str):
-                capability = KeyCapability(capability)
-            if capability not in self.key_capabilities:
-                raise PGPKeyError(f'Key does not have capability {capability}')
+        missing = get_capability_flags(capabilities) & ~self.capability_flags
+        if missing:
+            capability = next(capability for flag, capability in CAPABILITY_FLAG_ENUMS.items() if missing & flag)
+            raise PGPKeyError(f'Key does not have capability {capability}')
 
     def match_key_id(self, value: str) -> bool:
         """
@@ -288,8 +607,9 @@ class PublicKey(KeyData, GpgOutputLine):
         """
         Match key user ID emails to specified pattern, returning True if any ID matches pattern
         """
-        for email in self.emails:
-            if email == pattern or fnmatch.fnmatch(email, f'*{pattern}*'):
+        match = compile_email_patterns((pattern,), ignore_case=False).match
+        for user_id in self.user_ids:
+            if user_id.email == pattern or match(user_id.email):
                 return True
         return False
 
@@ -297,7 +617,7 @@ class PublicKey(KeyData, GpgOutputLine):
         """
         Delete key from user keyring
         """
-        command = ('gpg', '--batch', '--yes', '--delete-keys', self.key_id)
+        command = gpg_command('--batch', '--yes', '--delete-keys', self.key_id, homedir=self.homedir)
         try:
             run(command, check=True)
         except CalledProcessError as error:
@@ -320,7 +640,7 @@ class PublicKey(KeyData, GpgOutputLine):
         label = TRUSTDB_TRUST_LABELS[trust]
         print(f'set owner trust key {self} trust {label}')
         response = run(
-            ('gpg', '--import-ownertrust'),
+            gpg_command('--import-ownertrust', homedir=self.homedir),
             input=bytes(f'{self.fingerprint}:{value}:\n', 'utf-8'),
             stdout=PIPE,
             stderr=PIPE,
@@ -328,4 +648,53 @@ class PublicKey(KeyData, GpgOutputLine):
         )
         if response.returncode != 0:
             raise PGPKeyError(f'Error updating key owner trust: {response.stderr}')
-        self.keyring.load()
+        if self.keyring is None:
+            return
+        if hasattr(self.keyring, 'refresh'):
+            self.keyring.refresh(str(self.fingerprint))
+        else:
+            self.keyring.load()
+
+
+def restore_fingerprint(key: KeyData, line: Optional[str]) -> Optional[Fingerprint]:
+    """
+    Restore pickled fingerprint record without parsing the line
+    """
+    if line is None:
+        return None
+    fingerprint = Fingerprint.__new__(Fingerprint)
+    fingerprint.__line__ = line
+    fingerprint.key = key
+    fingerprint.fingerprint = fingerprint.__field__(FIELD_USER_ID)
+    return fingerprint
+
+
+def restore_public_key(line: str,
+                       fingerprint: Optional[str],
+                       user_ids: List[Tuple[str, str, str]],
+                       sub_keys: List[Tuple[str, Optional[str]]]) -> PublicKey:
+    """
+    Restore pickled public key without parsing the records
+    """
+    key = PublicKey.__new__(PublicKey)
+    key.__line__ = line
+    key.keyring = None
+    key.__key_flags__ = None
+    key.fingerprint = restore_fingerprint(key, fingerprint)
+    key.user_ids = []
+    for user_id_line, email, fullname in user_ids:
+        user_id = UserID.__new__(UserID)
+        user_id.__line__ = user_id_line
+        user_id.key = key
+        user_id.email = email
+        user_id.fullname = fullname
+        key.user_ids.append(user_id)
+    key.sub_keys = []
+    for sub_key_line, sub_key_fingerprint in sub_keys:
+        sub_key = SubKey.__new__(SubKey)
+        sub_key.__line__ = sub_key_line
+        sub_key.key = key
+        sub_key.__key_flags__ = None
+        sub_key.fingerprint = restore_fingerprint(sub_key, sub_key_fingerprint)
+        key.sub_keys.append(sub_key)
+    return key
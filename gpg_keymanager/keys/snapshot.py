@@ -0,0 +1,187 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Keyring snapshots for detecting changes in keys between runs
+
+Snapshots store compact records of keys sorted by fingerprint, allowing two snapshots
+to be compared with a linear merge.
+"""
+import json
+import os
+
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from ..exceptions import PGPKeyError
+
+if TYPE_CHECKING:
+    from .public_key import PublicKey
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FIELDS = (
+    'fingerprint',
+    'key_id',
+    'validity',
+    'expiration',
+    'user_id',
+)
+
+
+class SnapshotRecord:
+    """
+    Compact record of a public key in keyring snapshot
+    """
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self,
+                 fingerprint: str,
+                 key_id: str,
+                 validity: str,
+                 expiration: Optional[int],
+                 user_id: Optional[str]) -> None:
+        self.fingerprint = fingerprint
+        self.key_id = key_id
+        self.validity = validity
+        self.expiration = expiration
+        self.user_id = user_id
+
+    def __repr__(self) -> str:
+        return f'{self.key_id} {self.user_id}' if self.user_id else self.key_id
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, SnapshotRecord):
+            return NotImplemented
+        return self.as_list() == other.as_list()
+
+    @classmethod
+    def from_key(cls, key: 'PublicKey') -> 'SnapshotRecord':
+        """
+        Create snapshot record from public key
+        """
+        user_id = key.user_ids[0].user_id if key.user_ids else None
+        return cls(
+            str(key.fingerprint),
+            key.key_id,
+            key.key_validity.value,
+            key.expiration_timestamp,
+            user_id,
+        )
+
+    def as_list(self) -> List[Any]:
+        """
+        Return record fields as list for serialization
+        """
+        return [getattr(self, field) for field in SNAPSHOT_FIELDS]
+
+
+class KeyringSnapshot:
+    """
+    Snapshot of keys in a keyring, sorted by fingerprint
+    """
+    records: List[SnapshotRecord]
+
+    def __init__(self, records: Optional[Iterable[SnapshotRecord]] = None) -> None:
+        self.records = sorted(records or [], key=lambda record: record.fingerprint)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[SnapshotRecord]:
+        return iter(self.records)
+
+    @classmethod
+    def from_keys(cls, keys: Iterable['PublicKey']) -> 'KeyringSnapshot':
+        """
+        Create snapshot from public keys
+        """
+        return cls(SnapshotRecord.from_key(key) for key in keys if key.fingerprint is not None)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> 'KeyringSnapshot':
+        """
+        Load snapshot from file
+        """
+        path = Path(path).expanduser()
+        try:
+            with path.open('r', encoding='utf-8') as filedescriptor:
+                data = json.load(filedescriptor)
+        except (OSError, ValueError) as error:
+            raise PGPKeyError(f'Error reading keyring snapshot {path}: {error}') from error
+        if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+            raise PGPKeyError(f'Unsupported keyring snapshot format: {path}')
+        try:
+            return cls(SnapshotRecord(*record) for record in data['keys'])
+        except (KeyError, TypeError) as error:
+            raise PGPKeyError(f'Invalid keyring snapshot {path}: {error}') from error
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Save snapshot to file atomically
+        """
+        path = Path(path).expanduser()
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'fields': list(SNAPSHOT_FIELDS),
+            'keys': [record.as_list() for record in self.records],
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile('w', encoding='utf-8', dir=path.parent, delete=False) as filedescriptor:
+                json.dump(data, filedescriptor, separators=(',', ':'))
+            os.replace(filedescriptor.name, path)
+        except OSError as error:
+            raise PGPKeyError(f'Error writing keyring snapshot {path}: {error}') from error
+
+
+# pylint: disable=too-few-public-methods
+class KeyringDiff:
+    """
+    Changes between two keyring snapshots
+    """
+    added: List[SnapshotRecord]
+    removed: List[SnapshotRecord]
+    validity_changed: List[Tuple[SnapshotRecord, SnapshotRecord]]
+    expiration_changed: List[Tuple[SnapshotRecord, SnapshotRecord]]
+
+    def __init__(self) -> None:
+        self.added = []
+        self.removed = []
+        self.validity_changed = []
+        self.expiration_changed = []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.validity_changed or self.expiration_changed)
+
+
+def diff(old: KeyringSnapshot, new: KeyringSnapshot) -> KeyringDiff:
+    """
+    Compare two keyring snapshots with a linear merge of the fingerprint sorted records
+    """
+    changes = KeyringDiff()
+    old_records = old.records
+    new_records = new.records
+    old_index = 0
+    new_index = 0
+    while old_index < len(old_records) and new_index < len(new_records):
+        old_record = old_records[old_index]
+        new_record = new_records[new_index]
+        if old_record.fingerprint < new_record.fingerprint:
+            changes.removed.append(old_record)
+            old_index += 1
+        elif old_record.fingerprint > new_record.fingerprint:
+            changes.added.append(new_record)
+            new_index += 1
+        else:
+            if old_record.validity != new_record.validity:
+                changes.validity_changed.append((old_record, new_record))
+            if old_record.expiration != new_record.expiration:
+                changes.expiration_changed.append((old_record, new_record))
+            old_index += 1
+            new_index += 1
+    changes.removed.extend(old_records[old_index:])
+    changes.added.extend(new_records[new_index:])
+    return changes
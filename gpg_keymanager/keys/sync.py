@@ -0,0 +1,174 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Synchronization of public key directory to user keyring
+
+Keys in directory are compared to keyring by fingerprint, update timestamp, revocations and
+expiration dates, and only files with missing or updated keys are imported with one
+gpg --import command
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from .constants import FIELD_KEY_VALIDITY
+from .index import normalize_key_id
+
+if TYPE_CHECKING:
+    from .directory import PublicKeyDirectory
+    from .loader import UserPublicKeys
+    from .public_key import GpgOutputLine, PublicKey, SubKey
+
+VALIDITY_REVOKED = 'r'
+
+
+def get_key_update_timestamp(key: 'PublicKey') -> int:
+    """
+    Return latest creation timestamp of key, user ID self-signatures and sub keys
+    """
+    dates = [key.creation_date]
+    dates.extend(user_id.creation_date for user_id in key.user_ids)
+    dates.extend(sub_key.creation_date for sub_key in key.sub_keys)
+    return max((int(date.timestamp()) for date in dates if date is not None), default=0)
+
+
+def is_revoked(item: 'GpgOutputLine') -> bool:
+    """
+    Check if key, sub key or user ID record has revoked validity
+    """
+    return (item.__field__(FIELD_KEY_VALIDITY) or '').lower() == VALIDITY_REVOKED
+
+
+def is_expiration_extended(source: Union['PublicKey', 'SubKey'], target: Union['PublicKey', 'SubKey']) -> bool:
+    """
+    Check if source key or sub key expires later than target key, keys without expiration last
+    """
+    source_expiration = source.expiration_timestamp
+    target_expiration = target.expiration_timestamp
+    if target_expiration is None:
+        return False
+    return source_expiration is None or source_expiration > target_expiration
+
+
+def is_key_data_updated(source: Union['PublicKey', 'SubKey'], target: Optional[Union['PublicKey', 'SubKey']]) -> bool:
+    """
+    Check if source key or sub key is missing from target, revoked or has extended expiration
+    """
+    if target is None:
+        return True
+    if is_revoked(source) and not is_revoked(target):
+        return True
+    return is_expiration_extended(source, target)
+
+
+def is_key_updated(source: 'PublicKey', target: 'PublicKey') -> bool:
+    """
+    Check if source key has changes not in target key with same fingerprint
+
+    Key is updated if it has newer update timestamp, user IDs or sub keys missing from
+    target key, revocations of key, sub keys or user IDs not in target key, or later
+    expiration dates for key or sub keys
+    """
+    if get_key_update_timestamp(source) > get_key_update_timestamp(target):
+        return True
+    if is_key_data_updated(source, target):
+        return True
+    target_user_ids = {str(user_id): user_id for user_id in target.user_ids}
+    for user_id in source.user_ids:
+        existing = target_user_ids.get(str(user_id), None)
+        if existing is None or (is_revoked(user_id) and not is_revoked(existing)):
+            return True
+    target_sub_keys = {str(sub_key.fingerprint): sub_key for sub_key in target.sub_keys}
+    return any(
+        is_key_data_updated(sub_key, target_sub_keys.get(str(sub_key.fingerprint), None))
+        for sub_key in source.sub_keys
+    )
+
+
+# pylint: disable=too-few-public-methods
+class KeyringSync:
+    """
+    Changes to synchronize user keyring with public key directory
+    """
+    missing: List['PublicKey']
+    updated: List['PublicKey']
+    removed: List['PublicKey']
+    files: List[Path]
+    imported: List['PublicKey']
+    deleted: List[str]
+
+    def __init__(self) -> None:
+        self.missing = []
+        self.updated = []
+        self.removed = []
+        self.files = []
+        self.imported = []
+        self.deleted = []
+
+    def __bool__(self) -> bool:
+        return bool(self.missing or self.updated or self.removed)
+
+
+def get_directory_keys(directory: 'PublicKeyDirectory') -> Dict[str, Tuple[Path, 'PublicKey']]:
+    """
+    Return keys in directory with the files they were loaded from by fingerprint
+
+    If same key is in multiple files, the key from first file in directory is used
+    """
+    keys = {}
+    for keyfile in directory.load_key_files():
+        for key in keyfile:
+            if key.fingerprint is not None:
+                keys.setdefault(normalize_key_id(key.fingerprint), (Path(keyfile), key))
+    return keys
+
+
+def sync_directory_to_keyring(directory: 'PublicKeyDirectory',
+                              keyring: 'UserPublicKeys',
+                              delete: bool = False,
+                              dry_run: bool = False) -> KeyringSync:
+    """
+    Import missing and updated keys from public key directory to user keyring
+
+    Key files with keys missing from keyring or updated in directory are imported with one
+    gpg --import command. With delete=True keys not in directory are deleted from keyring
+    with one gpg --delete-keys command after the imports. Keys with secret keys in keyring
+    are never deleted.
+
+    With dry_run=True the changes are only detected and not applied.
+    """
+    changes = KeyringSync()
+    directory_keys = get_directory_keys(directory)
+    keyring_keys = {normalize_key_id(key.fingerprint): key for key in keyring if key.fingerprint is not None}
+
+    files = set()
+    for fingerprint, (path, key) in directory_keys.items():
+        existing = keyring_keys.get(fingerprint, None)
+        if existing is None:
+            changes.missing.append(key)
+        elif is_key_updated(key, existing):
+            changes.updated.append(key)
+        else:
+            continue
+        if path not in files:
+            files.add(path)
+            changes.files.append(path)
+    if delete:
+        secret_keys = keyring.get_secret_key_fingerprints()
+        changes.removed = [
+            key for fingerprint, key in keyring_keys.items()
+            if fingerprint not in directory_keys and fingerprint not in secret_keys
+        ]
+
+    if dry_run or not changes:
+        return changes
+
+    batch = keyring.batch()
+    for path in changes.files:
+        batch.import_key(path)
+    for key in changes.removed:
+        batch.delete_key(key)
+    changes.imported, changes.deleted = batch.flush()
+    return changes
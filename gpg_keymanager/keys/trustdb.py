@@ -9,24 +9,123 @@ Utilities to manage GPG owner trust database
 import re
 import sys
 
+from functools import lru_cache
 from pathlib import Path
-from subprocess import run, CalledProcessError
-from typing import List, Union, TYPE_CHECKING
+from subprocess import run, CalledProcessError, PIPE
+from typing import Dict, List, Mapping, Optional, Set, Tuple, Union, TYPE_CHECKING
 
 from sys_toolkit.subprocess import run_command_lineoutput
 
 from ..exceptions import PGPKeyError
-from .base import GPGItemCollection, FingerprintObject
+from .base import GPGItemCollection, FingerprintObject, synchronized
 from .constants import TRUSTDB_TRUST_LABELS, KeyTrustDB
+from .index import normalize_key_id
+from .utils import get_gnupg_homedir, gpg_command
 
 if TYPE_CHECKING:
     from .loader import UserPublicKeys
 
-USER_TRUSTDB = Path('~/.gnupg/trustdb.gpg').expanduser()
+TRUSTDB_FILENAME = 'trustdb.gpg'
 
 RE_OWNERTRUST = re.compile(
     r'^(?P<fingerprint>[A-Z0-9]+):(?P<trust>\d+):$'
 )
+# Fingerprints of v4 and v5 keys
+RE_FINGERPRINT = re.compile(r'^([0-9A-F]{40}|[0-9A-F]{64})$')
+
+# Trust database file consists of fixed length records starting with version record
+TRUSTDB_RECORD_LENGTH = 40
+TRUSTDB_RECORD_TYPE_VERSION = 1
+TRUSTDB_RECORD_TYPE_TRUST = 12
+TRUSTDB_MAGIC = b'gpg'
+# Trust record has record type, reserved byte, 20 byte fingerprint and owner trust value
+TRUSTDB_FINGERPRINT_OFFSET = 2
+TRUSTDB_FINGERPRINT_LENGTH = 20
+TRUSTDB_OWNERTRUST_OFFSET = 22
+
+
+def get_owner_trust(value: Union[KeyTrustDB, int, str]) -> KeyTrustDB:
+    """
+    Return owner trust value from KeyTrustDB value, integer or label in TRUSTDB_TRUST_LABELS
+    """
+    if isinstance(value, KeyTrustDB):
+        return value
+    for trust, label in TRUSTDB_TRUST_LABELS.items():
+        if value == label:
+            return trust
+    try:
+        return KeyTrustDB(int(value))
+    except ValueError as error:
+        raise PGPKeyError(f'Invalid trust value {value}: {error}') from error
+
+
+def load_owner_trust_file(path: Union[str, Path]) -> Dict[str, KeyTrustDB]:
+    """
+    Load owner trust values for fingerprints from a file
+
+    File has lines in gpg --export-ownertrust format FINGERPRINT:TRUST: where trust is
+    a trust value or label. Empty lines and comment lines starting with # are ignored.
+    """
+    trust = {}
+    try:
+        with Path(path).expanduser().open('r', encoding='utf-8') as filedescriptor:
+            lines = filedescriptor.readlines()
+    except OSError as error:
+        raise PGPKeyError(f'Error reading owner trust file {path}: {error}') from error
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split(':')
+        if len(fields) not in (2, 3) or (len(fields) == 3 and fields[2]):
+            raise PGPKeyError(f'Unexpected owner trust file line: {line}')
+        trust[fields[0]] = get_owner_trust(fields[1])
+    return trust
+
+
+@lru_cache(maxsize=16)
+def parse_trustdb_file(path: Path,
+                       inode: int,
+                       size: int,
+                       mtime_ns: int) -> Tuple[Tuple[str, int], ...]:
+    """
+    Parse fingerprint and owner trust values from gpg trustdb.gpg file
+
+    Returns same records as gpg --export-ownertrust, i.e. trust records with owner trust set.
+    Results are cached by file path, inode, size and modification time arguments.
+    """
+    # pylint: disable=unused-argument
+    try:
+        data = path.read_bytes()
+    except OSError as error:
+        raise PGPKeyError(f'Error reading trust database {path}: {error}') from error
+    if len(data) < TRUSTDB_RECORD_LENGTH or data[0] != TRUSTDB_RECORD_TYPE_VERSION or data[1:4] != TRUSTDB_MAGIC:
+        raise PGPKeyError(f'File is not a gpg trust database: {path}')
+
+    records = []
+    for offset in range(0, len(data) - TRUSTDB_RECORD_LENGTH + 1, TRUSTDB_RECORD_LENGTH):
+        if data[offset] != TRUSTDB_RECORD_TYPE_TRUST:
+            continue
+        trust = data[offset + TRUSTDB_OWNERTRUST_OFFSET]
+        if not trust:
+            continue
+        start = offset + TRUSTDB_FINGERPRINT_OFFSET
+        records.append((data[start:start + TRUSTDB_FINGERPRINT_LENGTH].hex().upper(), trust))
+    return tuple(records)
+
+
+def read_trustdb_file(path: Union[str, Path]) -> Tuple[Tuple[str, int], ...]:
+    """
+    Read fingerprint and owner trust values from gpg trustdb.gpg file
+
+    Parsed records are cached until the file is modified
+    """
+    path = Path(path).expanduser()
+    try:
+        stat = path.stat()
+    except OSError as error:
+        raise PGPKeyError(f'Error reading trust database {path}: {error}') from error
+    return parse_trustdb_file(path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
 
 
 class TrustDBItem(FingerprintObject):
@@ -54,19 +153,101 @@ class TrustDBItem(FingerprintObject):
 class OwnerTrustDB(GPGItemCollection):
     """
     GPG owner trust database
+
+    Trust database is read from the GnuPG home directory of the keyring
+
+    With read_file=True owner trust values are read directly from trustdb.gpg file instead of
+    running gpg --export-ownertrust. Parsed file is cached until the file is modified. If the
+    file can't be read, owner trust is exported with gpg.
+
+    Items are indexed by fingerprint for lookups. If the database contains same fingerprint
+    multiple times, the first item is returned like with linear search.
     """
     keyring: 'UserPublicKeys'
+    read_file: bool
+    __fingerprints__: Dict[str, TrustDBItem]
 
-    def __init__(self, keyring: 'UserPublicKeys') -> None:
+    def __init__(self, keyring: 'UserPublicKeys', read_file: bool = False) -> None:
         super().__init__()
         self.keyring = keyring
+        self.read_file = read_file
+        self.__fingerprints__ = {}
+
+    def __reindex__(self) -> None:
+        """
+        Rebuild fingerprint index from items
+        """
+        self.__fingerprints__ = {}
+        for item in self.__items__:
+            self.__fingerprints__.setdefault(item.fingerprint, item)
+
+    @synchronized
+    def __delitem__(self, index) -> None:
+        """
+        Remove item from collection and index
+        """
+        super().__delitem__(index)
+        self.__reindex__()
+
+    @synchronized
+    def __setitem__(self, index: int, value: TrustDBItem) -> None:
+        """
+        Set item in collection and index
+        """
+        super().__setitem__(index, value)
+        self.__reindex__()
+
+    @synchronized
+    def clear(self) -> None:
+        """
+        Clear items and fingerprint index
+        """
+        super().clear()
+        self.__fingerprints__ = {}
+
+    @synchronized
+    def insert(self, index: int, value: TrustDBItem) -> None:
+        """
+        Insert item to collection and index
+        """
+        append = index >= len(self.__items__)
+        super().insert(index, value)
+        if append:
+            self.__fingerprints__.setdefault(value.fingerprint, value)
+        else:
+            self.__reindex__()
+
+    @property
+    def keyring_fingerprints(self) -> Set[str]:
+        """
+        Return set of primary key fingerprints in keyring
+        """
+        return set(
+            normalize_key_id(key.fingerprint)
+            for key in self.keyring
+            if key.fingerprint is not None
+        )
+
+    @property
+    def homedir(self) -> Optional[Path]:
+        """
+        Return GnuPG home directory of the keyring, None for default home directory
+        """
+        return getattr(self.keyring, 'homedir', None)
+
+    @property
+    def path(self) -> Path:
+        """
+        Return path to the owner trust database file
+        """
+        return get_gnupg_homedir(self.homedir).joinpath(TRUSTDB_FILENAME)
 
     @property
     def stale_trust(self) -> List[TrustDBItem]:
         """
         Return trust database items for which the key has been removed from user keys
         """
-        fingerprints = [key.fingerprint for key in self.keyring]
+        fingerprints = self.keyring_fingerprints
         return [
             item
             for item in self
@@ -84,21 +265,23 @@ class OwnerTrustDB(GPGItemCollection):
         if not stale:
             return
 
+        stale_fingerprints = set(item.fingerprint for item in stale)
         for trust in self:
-            if trust in stale:
+            if trust.fingerprint in stale_fingerprints:
                 print(f'Remove stale trust {trust}')
             else:
                 valid.append(trust)
 
-        if not USER_TRUSTDB.exists():
-            raise PGPKeyError(f'No trust gpg database detected {USER_TRUSTDB}')
+        path = self.path
+        if not path.exists():
+            raise PGPKeyError(f'No trust gpg database detected {path}')
 
-        backup = USER_TRUSTDB.with_suffix('.gpg.old')
-        USER_TRUSTDB.rename(backup)
+        backup = path.with_suffix('.gpg.old')
+        path.rename(backup)
         data = '\n'.join(item.value for item in valid)
         try:
             run(
-                ('gpg', '--import-ownertrust'),
+                gpg_command('--import-ownertrust', homedir=self.homedir),
                 input=bytes(f'{data}\n', 'utf-8'),
                 stdout=sys.stdout,
                 stderr=sys.stderr,
@@ -106,16 +289,97 @@ class OwnerTrustDB(GPGItemCollection):
             )
             self.load()
         except CalledProcessError as error:
-            backup.rename(USER_TRUSTDB)
+            backup.rename(path)
             raise PGPKeyError('Error cleaning up user gpg owner trust database') from error
 
+    def get_trust_changes(self, trust: Mapping[str, Union[KeyTrustDB, int, str]]) -> List[TrustDBItem]:
+        """
+        Return trust database items for fingerprints with owner trust different from specified
+
+        Trust is a mapping of key fingerprints to trust values or labels
+        """
+        self.__ensure_loaded__()
+        changes = []
+        for fingerprint, value in trust.items():
+            fingerprint = normalize_key_id(fingerprint)
+            if not RE_FINGERPRINT.match(fingerprint):
+                raise PGPKeyError(f'Invalid key fingerprint: {fingerprint}')
+            value = get_owner_trust(value)
+            item = self.__fingerprints__.get(fingerprint, None)
+            if item is None or item.trust != value:
+                changes.append(TrustDBItem(fingerprint, value.value))
+        return changes
+
+    @synchronized
+    def update_trust(self,
+                     trust: Mapping[str, Union[KeyTrustDB, int, str]],
+                     dry_run: bool = False) -> List[TrustDBItem]:
+        """
+        Update owner trust database to match specified fingerprint to trust mapping
+
+        Only changed trust values are imported with a single gpg command. Loaded trust database
+        items and owner trust of loaded keys are updated in place. Validity of loaded keys
+        depends on owner trust and is loaded again with gpg when it is next requested.
+
+        Returns the changed items. With dry_run=True changes are only returned.
+        """
+        changes = self.get_trust_changes(trust)
+        if dry_run or not changes:
+            return changes
+
+        data = ''.join(f'{item.value}\n' for item in changes)
+        response = run(
+            gpg_command('--import-ownertrust', homedir=self.homedir),
+            input=bytes(data, 'utf-8'),
+            stdout=PIPE,
+            stderr=PIPE,
+            check=False
+        )
+        if response.returncode != 0:
+            raise PGPKeyError(f'Error updating owner trust: {response.stderr}')
+
+        for change in changes:
+            item = self.__fingerprints__.get(change.fingerprint, None)
+            if item is not None:
+                item.trust = change.trust
+            else:
+                self.append(change)
+        self.__update_keyring_trust__(changes)
+        return changes
+
+    def __update_keyring_trust__(self, changes: List[TrustDBItem]) -> None:
+        """
+        Refresh loaded keyring keys with changed owner trust
+
+        Only the changed keys are listed again with gpg to update owner trust and key validity
+        """
+        if not self.keyring.is_loaded:
+            return
+        with self.keyring.__lock__:
+            index = self.keyring.__key_index__
+            fingerprints = [item.fingerprint for item in changes if index.find_fingerprint(item.fingerprint)]
+            if fingerprints:
+                self.keyring.refresh(*fingerprints)
+
+    @synchronized
     def load(self) -> None:
         """
         Load keys in owner trust database
         """
         self.clear()
 
-        command = ('gpg', '--export-ownertrust')
+        if self.read_file:
+            try:
+                records = read_trustdb_file(self.path)
+            except PGPKeyError:
+                records = None
+            if records is not None:
+                self.__loaded__ = True
+                for fingerprint, trust in records:
+                    self.append(TrustDBItem(fingerprint, trust))
+                return
+
+        command = gpg_command('--export-ownertrust', homedir=self.homedir)
         try:
             stdout, _stderr = run_command_lineoutput(*command)
             self.__loaded__ = True
@@ -137,14 +401,15 @@ class OwnerTrustDB(GPGItemCollection):
         """
         Get trust database item by key ID or fingerprint
         """
-        for trust in self:
-            if trust.fingerprint == value:
-                return trust
+        self.__ensure_loaded__()
+        trust = self.__fingerprints__.get(normalize_key_id(value), None)
+        if trust is not None:
+            return trust
         try:
             key = self.keyring.get(value)
-            for trust in self:
-                if trust.fingerprint == key.fingerprint:
-                    return trust
+            trust = self.__fingerprints__.get(normalize_key_id(key.fingerprint), None)
+            if trust is not None:
+                return trust
         except PGPKeyError:
             pass
         raise PGPKeyError(f'Trust DB item not found: {value}')
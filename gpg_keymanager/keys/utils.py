@@ -6,11 +6,16 @@
 """
 Utilities for PGP public keys
 """
+import os
 import re
 
-from typing import List, Tuple, Union
+from pathlib import Path
+from subprocess import Popen, PIPE
+from tempfile import TemporaryFile
+from typing import Iterator, List, Optional, Tuple, Union
 
 from ..exceptions import PGPKeyError
+from .constants import DEFAULT_GNUPG_HOME, GNUPG_HOME_ENV_VAR
 
 RE_KEY_ID_FORMATS = (
     re.compile(r'^0x[0-9A-Z]{16}$'),
@@ -48,3 +53,72 @@ def validate_key_ids(value: Union[str, List[str], Tuple[str]]):
             raise PGPKeyError(f'Invalid PGP key ID {value}')
     else:
         raise PGPKeyError(f'Unexpected type: {type(value)}')
+
+
+def escape_colon_field(value: str) -> str:
+    """
+    Escape string value for gpg colon listing field like gpg does
+    """
+    escaped = []
+    for character in value:
+        if character == '\\':
+            escaped.append('\\\\')
+        elif character == ':' or ord(character) < 0x20 or ord(character) == 0x7f:
+            escaped.append(f'\\x{ord(character):02x}')
+        else:
+            escaped.append(character)
+    return ''.join(escaped)
+
+
+def get_gnupg_homedir(homedir: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Return GnuPG home directory path
+
+    Uses specified path, GNUPGHOME environment variable or default ~/.gnupg
+    """
+    if homedir is None:
+        homedir = os.environ.get(GNUPG_HOME_ENV_VAR, DEFAULT_GNUPG_HOME)
+    return Path(homedir).expanduser()
+
+
+def gpg_command(*args: str, homedir: Optional[Union[str, Path]] = None) -> Tuple[str, ...]:
+    """
+    Return gpg command with arguments
+
+    The --homedir option is added only if GnuPG home directory is specified, otherwise gpg
+    uses GNUPGHOME environment variable or default home directory
+    """
+    if homedir is None:
+        return ('gpg',) + tuple(args)
+    return ('gpg', '--homedir', str(Path(homedir).expanduser())) + tuple(args)
+
+
+def iter_command_lineoutput(*command: List[str], encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Run command and yield stdout lines as the command outputs them
+
+    The command is killed if the caller stops iteration before all output is read.
+    Raises PGPKeyError if command fails.
+    """
+    with TemporaryFile() as stderr:
+        try:
+            # pylint: disable=consider-using-with
+            process = Popen(command, stdout=PIPE, stderr=stderr)
+        except OSError as error:
+            raise PGPKeyError(f'Error running {" ".join(command)}: {error}') from error
+        try:
+            for line in process.stdout:
+                try:
+                    yield str(line, encoding).rstrip('\r\n')
+                except ValueError as error:
+                    raise PGPKeyError(f'Error parsing line {line}') from error
+            returncode = process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        if returncode != 0:
+            stderr.seek(0)
+            message = str(stderr.read(), encoding, 'replace').strip()
+            raise PGPKeyError(f'Error running {" ".join(command)}: returns {returncode}: {message}')
@@ -0,0 +1,146 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Bulk validation of public keys with capability and validity bitmasks
+"""
+from typing import Iterable, Iterator, List, Optional, Union, TYPE_CHECKING
+
+from ..exceptions import PGPKeyError
+
+from .constants import (
+    KEY_VALIDITY_TRUST_LEVELS,
+    KeyCapabilityFlag,
+    KeyValidityFlag,
+    KeyValidityTrust,
+)
+from .public_key import CAPABILITY_FLAG_ENUMS
+
+if TYPE_CHECKING:
+    from .public_key import PublicKey
+
+
+def get_accepted_validity_flags(min_validity: Union[KeyValidityTrust, str]) -> KeyValidityFlag:
+    """
+    Return bitmask of validity values accepted with specified minimum validity trust level
+    """
+    if isinstance(min_validity, str):
+        try:
+            min_validity = KeyValidityTrust(min_validity)
+        except ValueError as error:
+            raise PGPKeyError(f'Invalid minimum key validity {min_validity}') from error
+
+    flags = KeyValidityFlag.NONE
+    accepted = False
+    for trust, flag in KEY_VALIDITY_TRUST_LEVELS:
+        accepted = accepted or trust == min_validity
+        if accepted:
+            flags |= flag
+    if not accepted:
+        raise PGPKeyError(f'Unsupported minimum key validity {min_validity}')
+    return flags
+
+
+class KeyValidationResult:
+    """
+    Validation result for a single public key
+    """
+    __slots__ = ('key', 'missing_capabilities', 'validity')
+
+    def __init__(self,
+                 key: 'PublicKey',
+                 missing_capabilities: KeyCapabilityFlag,
+                 validity: Optional[KeyValidityFlag]) -> None:
+        self.key = key
+        self.missing_capabilities = missing_capabilities
+        self.validity = validity
+
+    def __repr__(self) -> str:
+        return f'{self.key} {"valid" if self.valid else ", ".join(self.errors)}'
+
+    @property
+    def valid(self) -> bool:
+        """
+        Return True if key passed validation
+        """
+        return not self.missing_capabilities and self.validity is None
+
+    @property
+    def errors(self) -> List[str]:
+        """
+        Return validation error messages for key
+        """
+        errors = [
+            f'Key does not have capability {capability}'
+            for flag, capability in CAPABILITY_FLAG_ENUMS.items()
+            if self.missing_capabilities & flag
+        ]
+        if self.validity is not None:
+            errors.append(f'Key validity {self.validity.name.lower()} is not accepted')
+        return errors
+
+
+class KeyValidationReport:
+    """
+    Validation report for a collection of public keys
+
+    Report evaluates to True if all keys passed validation
+    """
+    capabilities: KeyCapabilityFlag
+    accepted_validity: Optional[KeyValidityFlag]
+    results: List[KeyValidationResult]
+
+    def __init__(self,
+                 capabilities: KeyCapabilityFlag,
+                 accepted_validity: Optional[KeyValidityFlag] = None) -> None:
+        self.capabilities = capabilities
+        self.accepted_validity = accepted_validity
+        self.results = []
+
+    def __bool__(self) -> bool:
+        return all(result.valid for result in self.results)
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __iter__(self) -> Iterator[KeyValidationResult]:
+        return iter(self.results)
+
+    @property
+    def valid_keys(self) -> List['PublicKey']:
+        """
+        Return keys passing validation
+        """
+        return [result.key for result in self.results if result.valid]
+
+    @property
+    def invalid_keys(self) -> List['PublicKey']:
+        """
+        Return keys failing validation
+        """
+        return [result.key for result in self.results if not result.valid]
+
+    @property
+    def errors(self) -> List[KeyValidationResult]:
+        """
+        Return results for keys failing validation
+        """
+        return [result for result in self.results if not result.valid]
+
+    def validate(self, keys: Iterable['PublicKey']) -> 'KeyValidationReport':
+        """
+        Validate keys, appending the results to report
+        """
+        capabilities = self.capabilities
+        accepted_validity = self.accepted_validity
+        for key in keys:
+            missing = capabilities & ~key.capability_flags
+            validity = None
+            if accepted_validity is not None:
+                validity = key.validity_flags
+                if validity & accepted_validity:
+                    validity = None
+            self.results.append(KeyValidationResult(key, KeyCapabilityFlag(missing), validity))
+        return self
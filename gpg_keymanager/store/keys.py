@@ -9,7 +9,7 @@ Password store encryption keys handling
 from pathlib import Path
 
 from gpg_keymanager.exceptions import PasswordStoreError, PGPKeyError
-from gpg_keymanager.keys.base import GPGItemCollection
+from gpg_keymanager.keys.base import GPGItemCollection, synchronized
 from gpg_keymanager.keys.utils import validate_key_ids
 
 
@@ -26,6 +26,7 @@ class PasswordStoreKeys(GPGItemCollection):
     def __repr__(self) -> str:
         return str(self.path)
 
+    @synchronized
     def load(self) -> None:
         """
         Load password store .gpg-id key list file
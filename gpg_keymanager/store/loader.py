@@ -15,6 +15,7 @@ from sys_toolkit.subprocess import run_command
 from pathlib_tree.tree import Tree, TreeItem
 
 from ..exceptions import PasswordStoreError
+from ..keys.constants import GNUPG_HOME_ENV_VAR
 from ..keys.utils import validate_key_ids
 
 from .constants import (
@@ -66,9 +67,13 @@ class PasswordStoreFile(TreeItem):
 class PasswordStore(Tree):
     """
     GNU password store data directory
+
+    With gpg_homedir set, secrets are encrypted and decrypted with keys in specified GnuPG
+    home directory. Sub directories of the store use the home directory of the store root.
     """
     password_store: Optional['PasswordStore']
     excluded: Optional[List[str]]
+    gpg_homedir: Optional[Path]
 
     __file_loader_class__ = PasswordStoreFile
 
@@ -81,7 +86,8 @@ class PasswordStore(Tree):
                 create_missing: bool = False,
                 sorted: bool = True,
                 mode: Optional[str] = None,
-                excluded: Optional[List[str]] = list):
+                excluded: Optional[List[str]] = list,
+                gpg_homedir: Optional[Union[str, Path]] = None):
         """
         Create a password store object
         """
@@ -96,10 +102,14 @@ class PasswordStore(Tree):
                  password_store: Optional['PasswordStore'] = None,
                  sorted: bool = True,
                  mode: Optional[str] = None,
-                 excluded: Optional[List[str]] = list):
+                 excluded: Optional[List[str]] = list,
+                 gpg_homedir: Optional[Union[str, Path]] = None):
         self.excluded = list(excluded) if isinstance(excluded, (tuple, list)) else []
         super().__init__(path, False, sorted, mode, self.excluded)
         self.password_store = password_store if password_store is not None else self
+        if gpg_homedir is None and password_store is not None:
+            gpg_homedir = password_store.gpg_homedir
+        self.gpg_homedir = Path(gpg_homedir).expanduser() if gpg_homedir is not None else None
 
     def __configure_excluded__(self, excluded: Optional[List[str]]) -> List[str]:
         """
@@ -129,10 +139,12 @@ class PasswordStore(Tree):
     @property
     def environment(self) -> dict:
         """
-        Expand environment variables with PASSWORD_STORE_DIR
+        Expand environment variables with PASSWORD_STORE_DIR and GNUPGHOME if gpg_homedir is set
         """
         env = os.environ.copy()
         env[ENV_VAR] = str(self)
+        if self.gpg_homedir is not None:
+            env[GNUPG_HOME_ENV_VAR] = str(self.gpg_homedir)
         return env
 
     @property
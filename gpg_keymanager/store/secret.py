@@ -13,10 +13,11 @@ from operator import eq, ge, gt, le, lt, ne
 from pathlib import Path
 from subprocess import run, PIPE, CalledProcessError
 from tempfile import mkstemp, NamedTemporaryFile
-from typing import Any, Callable, List, Union, TYPE_CHECKING
+from typing import Any, Callable, List, Optional, Union, TYPE_CHECKING
 
 from ..editor import Editor
 from ..exceptions import PasswordStoreError, KeyManagerError
+from ..keys.utils import gpg_command
 
 from .constants import PASSWORD_ENTRY_ENCODING
 
@@ -121,6 +122,13 @@ class Secret:
         """
         return self.text.splitlines()
 
+    @property
+    def gpg_homedir(self) -> Optional[Path]:
+        """
+        Return GnuPG home directory configured for password store or None for default
+        """
+        return getattr(self.store, 'gpg_homedir', None)
+
     @property
     def password(self) -> str:
         """
@@ -138,7 +146,7 @@ class Secret:
         Return contents of specified PGP file with PGP CLI command
         """
         try:
-            cmd = ('gpg', '-o-', '-d', str(self.path))
+            cmd = gpg_command('-o-', '-d', str(self.path), homedir=self.gpg_homedir)
             res = run(cmd, stdout=PIPE, stderr=PIPE, check=True)
             return res.stdout
         except CalledProcessError as error:
@@ -176,7 +184,7 @@ class Secret:
             with open(tmp_fd, 'wb') as filedescriptor:
                 filedescriptor.write(data)
             recipient_list = list(chain(*[['-r', key_id] for key_id in self.gpg_key_ids]))
-            cmd = ['gpg', '-e', '-o', str(self.path)] + recipient_list + [str(filename)]
+            cmd = gpg_command('-e', '-o', str(self.path), *recipient_list, str(filename), homedir=self.gpg_homedir)
             res = run(cmd, stdout=PIPE, stderr=PIPE, check=True)
             if res.returncode != 0:
                 raise PasswordStoreError(f'Error saving {self}: {res.stderr}')
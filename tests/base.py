@@ -6,8 +6,11 @@
 """
 Common methods for unit tests
 """
-from subprocess import CalledProcessError
-from typing import Any, Dict, Iterator, List, Optional
+from pathlib import Path
+from subprocess import CalledProcessError, run
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sys_toolkit.subprocess import run_command_lineoutput
 
 from gpg_keymanager.exceptions import PGPKeyError
 
@@ -41,6 +44,50 @@ class MockCallArguments:
         return self
 
 
+# pylint: disable=too-few-public-methods
+class CountingRun:
+    """
+    Run commands with subprocess run and record the commands
+    """
+    def __init__(self):
+        self.commands = []
+
+    def __call__(self, command, **kwargs):
+        self.commands.append(command)
+        return run(command, **kwargs)  # pylint: disable=subprocess-run-check
+
+
+# pylint: disable=too-few-public-methods
+class MockGpgCommands:
+    """
+    Record gpg commands run by key loader and return canned or real command output
+
+    Commands return lines from output file when set, raise PGPKeyError when any command
+    argument is in failing arguments, and otherwise return output from the handler, which
+    defaults to running the command.
+    """
+    output: Optional[Path]
+    handler: Callable
+
+    def __init__(self) -> None:
+        self.commands = []
+        self.output = None
+        self.failing = set()
+        self.handler = run_command_lineoutput
+
+    def __call__(self, *args: str, **kwargs: Dict[Any, Any]) -> Tuple[List[str], List[str]]:
+        """
+        Record gpg command and return output lines
+        """
+        self.commands.append(args)
+        if self.failing.intersection(args):
+            raise PGPKeyError(f'Error running command: {args}')
+        if self.output is not None:
+            with Path(self.output).open('r', encoding='utf-8') as filedescriptor:
+                return filedescriptor.readlines(), []
+        return self.handler(*args, **kwargs)
+
+
 # pylint: disable=no-value-for-parameter,unused-argument
 def mock_return_false(*args: List[Any], **kwargs: Dict[Any, Any]) -> Iterator[bool]:
     """
@@ -0,0 +1,58 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for 'gpg-keymanager diff-keyring' command
+"""
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from gpg_keymanager.bin.gpg_keymanager import main
+from gpg_keymanager.keys.snapshot import KeyringSnapshot
+
+from ..conftest import EXPECTED_PUBLIC_KEY_COUNT
+
+
+def run_diff_keyring(monkeypatch, capsys, *args) -> tuple:
+    """
+    Run 'gpg-keymanager diff-keyring' with arguments and return exit code and output lines
+    """
+    monkeypatch.setattr(sys, 'argv', ['gpg-keymanager', 'diff-keyring'] + list(args))
+    with pytest.raises(SystemExit) as exit_status:
+        main()
+    captured = capsys.readouterr()
+    return exit_status.value.code, captured.out.splitlines()
+
+
+# pylint: disable=unused-argument
+def test_gpg_manager_diff_keyring(mock_gpg_key_list, capsys, monkeypatch, tmpdir) -> None:
+    """
+    Test running 'gpg-keymanager diff-keyring'
+    """
+    path = Path(tmpdir, 'keyring.json')
+    code, _lines = run_diff_keyring(monkeypatch, capsys, str(path))
+    assert code == 1
+
+    assert run_diff_keyring(monkeypatch, capsys, '--update', str(path)) == (0, [])
+    assert len(KeyringSnapshot.from_file(path)) == EXPECTED_PUBLIC_KEY_COUNT
+    assert run_diff_keyring(monkeypatch, capsys, str(path)) == (0, [])
+
+    snapshot = KeyringSnapshot.from_file(path)
+    removed = snapshot.records.pop(0)
+    snapshot.records[0].validity = 'full'
+    snapshot.records[1].expiration = None
+    snapshot.save(path)
+    code, lines = run_diff_keyring(monkeypatch, capsys, str(path))
+    assert code == 0
+    assert lines[0] == f'added {removed}'
+    assert lines[1].startswith('validity ')
+    assert lines[2].startswith('expires ') and 'never ->' in lines[2]
+
+    path.write_text('invalid', encoding='utf-8')
+    code, _lines = run_diff_keyring(monkeypatch, capsys, str(path))
+    assert code == 1
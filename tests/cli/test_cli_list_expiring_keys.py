@@ -0,0 +1,49 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for 'gpg-keymanager list-expiring-keys' command
+"""
+import sys
+import time
+
+import pytest
+
+from gpg_keymanager.bin.gpg_keymanager import main
+
+# Keys in mock data with expiration date, one of them expires in 2033
+EXPECTED_EXPIRED_KEY_COUNT = 3
+EXPECTED_EXPIRING_KEY_COUNT = 4
+LAST_EXPIRATION_TIMESTAMP = 2013464897
+
+
+def run_list_expiring_keys(monkeypatch, capsys, *args) -> list:
+    """
+    Run 'gpg-keymanager list-expiring-keys' with arguments and return output lines
+    """
+    monkeypatch.setattr(sys, 'argv', ['gpg-keymanager', 'list-expiring-keys'] + list(args))
+    with pytest.raises(SystemExit) as exit_status:
+        main()
+    assert exit_status.value.code == 0
+    captured = capsys.readouterr()
+    assert captured.err == ''
+    return captured.out.splitlines()
+
+
+# pylint: disable=unused-argument
+def test_gpg_manager_list_expiring_keys(mock_gpg_key_list, capsys, monkeypatch) -> None:
+    """
+    Test running 'gpg-keymanager list-expiring-keys'
+    """
+    days = int((LAST_EXPIRATION_TIMESTAMP - time.time()) / 86400) + 1
+
+    assert run_list_expiring_keys(monkeypatch, capsys, '--days', '0') == []
+    lines = run_list_expiring_keys(monkeypatch, capsys, '--days', '0', '--expired')
+    assert len(lines) == EXPECTED_EXPIRED_KEY_COUNT
+
+    lines = run_list_expiring_keys(monkeypatch, capsys, '--days', str(days))
+    assert len(lines) == EXPECTED_EXPIRING_KEY_COUNT - EXPECTED_EXPIRED_KEY_COUNT
+    lines = run_list_expiring_keys(monkeypatch, capsys, '--days', str(days), '--expired')
+    assert len(lines) == EXPECTED_EXPIRING_KEY_COUNT
@@ -54,3 +54,22 @@ def test_gpg_manager_list_public_keys__no_args(mock_gpg_key_list, capsys, monkey
     for line in lines:
         match = RE_KEY_OUTPUT.match(line)
         assert match is not None
+
+
+# pylint: disable=unused-argument
+def test_gpg_manager_list_public_keys_cached(mock_gpg_key_list, capsys, monkeypatch, tmpdir) -> None:
+    """
+    Test running 'gpg-keymanager list-public-keys --cache'
+    """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir))
+    argv = [
+        'gpg-keymanager',
+        'list-public-keys',
+        '--cache',
+    ]
+    monkeypatch.setattr(sys, 'argv', argv)
+    with pytest.raises(SystemExit) as exit_status:
+        main()
+    assert exit_status.value.code == 0
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == EXPECTED_PUBLIC_KEY_COUNT
@@ -0,0 +1,52 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for 'gpg-keymanager set-owner-trust' command
+"""
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from gpg_keymanager.bin.gpg_keymanager import main
+
+from ..base import MockCallArguments
+from ..conftest import MOCK_TRUSTDB_RUN_METHOD
+
+TRUST_FINGERPRINT = '4AEA7B607FD11C25882D7C8BCB3B6A73C71838F3'
+OTHER_FINGERPRINT = 'D91CBC43256EF761A182FF2D5A7EC13A9F145EBF'
+
+
+def run_set_owner_trust(monkeypatch, capsys, *args) -> tuple:
+    """
+    Run 'gpg-keymanager set-owner-trust' with arguments and return exit code and output lines
+    """
+    monkeypatch.setattr(sys, 'argv', ['gpg-keymanager', 'set-owner-trust'] + list(args))
+    with pytest.raises(SystemExit) as exit_status:
+        main()
+    captured = capsys.readouterr()
+    return exit_status.value.code, captured.out.splitlines()
+
+
+# pylint: disable=unused-argument
+def test_gpg_manager_set_owner_trust(mock_gpg_key_list, capsys, monkeypatch, tmpdir) -> None:
+    """
+    Test running 'gpg-keymanager set-owner-trust'
+    """
+    mock_run = MockCallArguments()
+    monkeypatch.setattr(MOCK_TRUSTDB_RUN_METHOD, mock_run)
+    path = Path(tmpdir, 'trust.txt')
+    path.write_text(f'# Team keys\n{TRUST_FINGERPRINT}:full:\n{OTHER_FINGERPRINT}:5:\n', encoding='utf-8')
+
+    expected = (0, [f'set owner trust {TRUST_FINGERPRINT}:full:'])
+    assert run_set_owner_trust(monkeypatch, capsys, '--dry-run', str(path)) == expected
+    assert mock_run.call_count == 0
+    assert run_set_owner_trust(monkeypatch, capsys, str(path)) == expected
+    assert mock_run.call_count == 1
+
+    code, _lines = run_set_owner_trust(monkeypatch, capsys, str(Path(tmpdir, 'missing.txt')))
+    assert code == 1
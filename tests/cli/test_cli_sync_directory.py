@@ -0,0 +1,62 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for 'gpg-keymanager sync-directory' command
+"""
+import shutil
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from gpg_keymanager.bin.gpg_keymanager import main
+from gpg_keymanager.keys.loader import UserPublicKeys
+
+from ..conftest import MOCK_KEY_FILES_DIRECTORY
+
+TEST_KEY_ID = '0xC8849B9ADD78F46D'
+
+
+def run_sync_directory(monkeypatch, capsys, *args) -> tuple:
+    """
+    Run 'gpg-keymanager sync-directory' with arguments and return exit code and output lines
+    """
+    monkeypatch.setattr(sys, 'argv', ['gpg-keymanager', 'sync-directory'] + list(args))
+    with pytest.raises(SystemExit) as exit_status:
+        main()
+    captured = capsys.readouterr()
+    return exit_status.value.code, captured.out.splitlines()
+
+
+def test_gpg_manager_sync_directory(capsys, monkeypatch, tmpdir) -> None:
+    """
+    Test running 'gpg-keymanager sync-directory' with an empty keyring
+    """
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir(mode=0o700)
+    monkeypatch.setenv('GNUPGHOME', str(homedir))
+    directory = Path(tmpdir, 'keys')
+    shutil.copytree(MOCK_KEY_FILES_DIRECTORY, directory, ignore=shutil.ignore_patterns('invalid.asc'))
+
+    code, lines = run_sync_directory(monkeypatch, capsys, '--dry-run', str(directory))
+    assert code == 0
+    assert len(lines) == 3
+    assert all(line.startswith('import ') for line in lines)
+    assert len(UserPublicKeys()) == 0
+
+    assert run_sync_directory(monkeypatch, capsys, str(directory))[0] == 0
+    assert len(UserPublicKeys()) == 3
+    assert run_sync_directory(monkeypatch, capsys, str(directory)) == (0, [])
+
+    directory.joinpath('test.asc').unlink()
+    code, lines = run_sync_directory(monkeypatch, capsys, '--delete', str(directory))
+    assert code == 0
+    assert lines == [f'delete {TEST_KEY_ID} Test User\\x3a Colon <test@example.com>']
+    assert len(UserPublicKeys()) == 2
+
+    code, _lines = run_sync_directory(monkeypatch, capsys, str(Path(tmpdir, 'missing')))
+    assert code == 1
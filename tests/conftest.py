@@ -17,18 +17,21 @@ from sys_toolkit.tests.mock import MockCalledMethod
 from sys_toolkit.subprocess import run_command_lineoutput
 from sys_toolkit.path import Executables
 
+from gpg_keymanager.keys.utils import iter_command_lineoutput
 from gpg_keymanager.store.loader import PasswordStore
 
-from .base import MockCallArguments
+from .base import MockCallArguments, MockGpgCommands
 
 MOCK_DATA = Path(__file__).parent.joinpath('mock')
 
 MOCK_BIN_DIRECTORY = MOCK_DATA.joinpath('bin')
 MOCK_KEYS_DIRECTORY = MOCK_DATA.joinpath('pgp-keys')
+MOCK_KEY_FILES_DIRECTORY = MOCK_DATA.joinpath('key-files')
 MOCK_STORE_DIRECTORY = MOCK_DATA.joinpath('password-store')
 
 MOCK_KEY_DATA = MOCK_KEYS_DIRECTORY.joinpath('keys.txt')
 MOCK_OWNERTRUST_DATA = MOCK_KEYS_DIRECTORY.joinpath('ownertrust.txt')
+MOCK_TRUSTDB_FILE = MOCK_KEYS_DIRECTORY.joinpath('trustdb.gpg')
 
 MOCK_VALID_STORE_PATH = MOCK_STORE_DIRECTORY.joinpath('valid-store')
 
@@ -60,6 +63,18 @@ def load_key_testdata(*args, **kwargs) -> Tuple[List[str], List[str]]:
     return run_command_lineoutput(*args, **kwargs)
 
 
+def stream_key_testdata(*args) -> Iterator[str]:
+    """
+    Stream test key data lines
+    """
+    if args[:3] == ('gpg', '--with-colons', '--keyid-format=long'):
+        with open(MOCK_KEY_DATA, encoding='utf-8') as filedescriptor:
+            for line in filedescriptor:
+                yield line.rstrip('\n')
+    else:
+        yield from iter_command_lineoutput(*args)
+
+
 def load_trust_data_testdata(*args, **kwargs):
     """
     Load test trust database data
@@ -97,12 +112,26 @@ def mock_gpg_key_list(monkeypatch) -> None:
         'gpg_keymanager.keys.loader.run_command_lineoutput',
         load_key_testdata
     )
+    monkeypatch.setattr(
+        'gpg_keymanager.keys.loader.iter_command_lineoutput',
+        stream_key_testdata
+    )
     monkeypatch.setattr(
         'gpg_keymanager.keys.trustdb.run_command_lineoutput',
         load_trust_data_testdata
     )
 
 
+@pytest.fixture
+def mock_gpg_commands(monkeypatch) -> MockGpgCommands:
+    """
+    Mock and record gpg commands run by keys.PublicKeyDataParser
+    """
+    mock_commands = MockGpgCommands()
+    monkeypatch.setattr('gpg_keymanager.keys.loader.run_command_lineoutput', mock_commands)
+    return mock_commands
+
+
 @pytest.fixture
 def mock_gpg_trustdb_cleanup(monkeypatch) -> Dict[str, Callable]:
     """
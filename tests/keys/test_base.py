@@ -6,6 +6,10 @@
 """
 Unit tests for gpg_keymanager.keys.base module
 """
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 import pytest
@@ -77,6 +81,51 @@ def test_gpg_item_collection_load_get() -> None:
     assert obj.__items__ == [TEST_KEY]
 
 
+def test_gpg_item_collection_nested_iteration() -> None:
+    """
+    Test nested iteration and modifying collection while iterating
+    """
+    obj = LoadableCollection()
+    pairs = [(str(a), str(b)) for a in obj for b in obj]
+    assert pairs == [(a, b) for a in (TEST_KEY, OTHER_KEY) for b in (TEST_KEY, OTHER_KEY)]
+
+    iterator = iter(obj)
+    assert next(obj) == TEST_KEY
+    for item in obj:
+        obj.__remove_key__(str(item))
+    assert list(iterator) == [TEST_KEY, OTHER_KEY]
+    assert obj.__items__ == []
+
+
+def test_gpg_item_collection_threaded_load() -> None:
+    """
+    Test collection shared by threads is loaded only once
+    """
+    class SlowLoadingCollection(LoadableCollection):
+        """
+        Collection counting load() calls and loading slowly
+        """
+        load_count = 0
+
+        def load(self):
+            self.load_count += 1
+            time.sleep(0.05)
+            super().load()
+            self.__loaded__ = True
+
+    obj = SlowLoadingCollection()
+    barrier = threading.Barrier(8)
+
+    def read_collection(_index):
+        barrier.wait()
+        return [str(item) for item in obj]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(read_collection, range(8)))
+    assert obj.load_count == 1
+    assert results == [[TEST_KEY, OTHER_KEY]] * 8
+
+
 def test_gpg_item_collection_properties() -> None:
     """
     Test properties of GPGItemCollection base class
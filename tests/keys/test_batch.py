@@ -0,0 +1,192 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.batch module
+"""
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.batch import KeyringBatch, parse_import_status
+from gpg_keymanager.keys.loader import UserPublicKeys
+
+from ..base import MockCallArguments
+
+MOCK_BATCH_RUN_METHOD = 'gpg_keymanager.keys.batch.run'
+
+TEST_FINGERPRINT = '87DF5EA2B85E025D159888ACC660ACF1DA570475'
+TEST_KEY_ID = '0xC660ACF1DA570475'
+OTHER_FINGERPRINT = '4AEA7B607FD11C25882D7C8BCB3B6A73C71838F3'
+TEST_IMPORT_STATUS = f"""[GNUPG:] IMPORT_OK 1 {TEST_FINGERPRINT}
+[GNUPG:] IMPORT_OK 0 {OTHER_FINGERPRINT}
+[GNUPG:] IMPORT_OK 0 {TEST_FINGERPRINT.lower()}
+[GNUPG:] IMPORT_RES 2 0 1 0 1 0 0 0 0 0 0 0 0 0 0
+"""
+
+
+# pylint: disable=too-few-public-methods
+class MockRunCommands:
+    """
+    Mock subprocess run recording the commands and input files
+
+    With failing argument set, only commands with the argument return the return code
+    """
+    def __init__(self, returncode: int = 0, stdout: bytes = b'', failing: Optional[str] = None) -> None:
+        self.returncode = returncode
+        self.stdout = stdout
+        self.failing = failing
+        self.commands = []
+        self.files = []
+
+    def __call__(self, command, **kwargs) -> MockCallArguments:
+        self.commands.append(command)
+        self.files.extend(Path(arg).read_bytes() for arg in command if arg.endswith('.key'))
+        returncode = self.returncode if self.failing is None or self.failing in command else 0
+        return MockCallArguments(returncode=returncode, stdout=self.stdout, stderr=b'error')(command, **kwargs)
+
+
+def test_batch_parse_import_status() -> None:
+    """
+    Test parsing fingerprints of imported keys from gpg status output
+    """
+    assert parse_import_status(TEST_IMPORT_STATUS.splitlines()) == [TEST_FINGERPRINT, OTHER_FINGERPRINT]
+    assert parse_import_status(['IMPORT_OK 1 ABCD', '[GNUPG:] IMPORT_OK 1']) == []
+
+
+# pylint: disable=unused-argument
+def test_batch_delete_keys(mock_gpg_key_list, monkeypatch) -> None:
+    """
+    Test deleting multiple keys from keyring with one gpg command
+    """
+    mock_run = MockRunCommands()
+    monkeypatch.setattr(MOCK_BATCH_RUN_METHOD, mock_run)
+    keys = UserPublicKeys()
+    count = len(keys)
+    other = keys.get(OTHER_FINGERPRINT)
+
+    with keys.batch() as batch:
+        assert isinstance(batch, KeyringBatch)
+        batch.delete_key(TEST_KEY_ID)
+        batch.delete_key(TEST_FINGERPRINT)
+        batch.delete_key(other)
+        assert len(batch) == 2
+    assert len(batch) == 0
+    assert mock_run.commands == [(
+        'gpg', '--batch', '--yes', '--delete-keys', TEST_FINGERPRINT, OTHER_FINGERPRINT
+    )]
+    assert len(keys) == count - 2
+    assert len(keys.__key_index__) == len(keys)
+    for fingerprint in (TEST_FINGERPRINT, OTHER_FINGERPRINT):
+        with pytest.raises(PGPKeyError):
+            keys.get(fingerprint)
+
+    assert keys.batch().flush() == ([], [])
+    assert len(mock_run.commands) == 1
+
+
+# pylint: disable=unused-argument
+def test_batch_delete_keys_error(mock_gpg_key_list, monkeypatch) -> None:
+    """
+    Test error deleting keys reloads the keys from keyring
+    """
+    monkeypatch.setattr(MOCK_BATCH_RUN_METHOD, MockRunCommands(returncode=2))
+    keys = UserPublicKeys()
+    count = len(keys)
+    batch = keys.batch()
+    batch.delete_key(TEST_FINGERPRINT)
+    with pytest.raises(PGPKeyError):
+        batch.flush()
+    assert len(batch) == 0
+    assert len(keys) == count
+    assert str(keys.get(TEST_FINGERPRINT).fingerprint) == TEST_FINGERPRINT
+
+    with pytest.raises(PGPKeyError):
+        batch.delete_key(TEST_FINGERPRINT[:-1])
+
+
+# pylint: disable=unused-argument
+def test_batch_import_keys(mock_gpg_key_list, monkeypatch, tmpdir) -> None:
+    """
+    Test importing multiple keys to keyring with one gpg command
+    """
+    mock_run = MockRunCommands(stdout=TEST_IMPORT_STATUS.encode('utf-8'))
+    monkeypatch.setattr(MOCK_BATCH_RUN_METHOD, mock_run)
+    keys = UserPublicKeys()
+    keys.load()
+    key = keys.get(TEST_FINGERPRINT)
+    keys.__remove_key__(TEST_FINGERPRINT)
+    count = len(keys)
+
+    key_file = Path(tmpdir.join('test.asc'))
+    key_file.write_bytes(b'key file')
+    batch = keys.batch()
+    batch.import_key(str(key_file))
+    batch.import_key(b'key data')
+    imported, deleted = batch.flush()
+
+    assert deleted == []
+    assert [str(item.fingerprint) for item in imported] == [TEST_FINGERPRINT, OTHER_FINGERPRINT]
+    assert imported[0] is not key
+    assert len(keys) == count + 1
+    assert keys.get(TEST_FINGERPRINT) is imported[0]
+
+    command = mock_run.commands[0]
+    assert len(mock_run.commands) == 1
+    assert command[:5] == ('gpg', '--batch', '--status-fd', '1', '--import')
+    assert command[5] == str(key_file)
+    assert mock_run.files == [b'key data']
+    assert not Path(command[6]).exists()
+
+
+# pylint: disable=unused-argument
+def test_batch_import_keys_error(mock_gpg_key_list, monkeypatch) -> None:
+    """
+    Test error importing keys refreshes keys reported imported before raising error
+    """
+    status = f'[GNUPG:] IMPORT_OK 1 {TEST_FINGERPRINT}\n'.encode('utf-8')
+    monkeypatch.setattr(MOCK_BATCH_RUN_METHOD, MockRunCommands(returncode=2, stdout=status))
+    keys = UserPublicKeys()
+    keys.load()
+    keys.__remove_key__(TEST_FINGERPRINT)
+
+    with pytest.raises(PGPKeyError):
+        with keys.batch() as batch:
+            batch.import_key(b'key data')
+    assert str(keys.get(TEST_FINGERPRINT).fingerprint) == TEST_FINGERPRINT
+
+    with pytest.raises(ValueError):
+        with keys.batch() as batch:
+            batch.import_key(b'key data')
+            raise ValueError('not flushed')
+    assert len(batch) == 1
+
+
+# pylint: disable=unused-argument
+def test_batch_delete_error_with_imports(mock_gpg_key_list, monkeypatch) -> None:
+    """
+    Test failing deletion does not prevent applying queued imports
+    """
+    mock_run = MockRunCommands(returncode=2, stdout=TEST_IMPORT_STATUS.encode('utf-8'), failing='--delete-keys')
+    monkeypatch.setattr(MOCK_BATCH_RUN_METHOD, mock_run)
+    keys = UserPublicKeys()
+    keys.load()
+    keys.__remove_key__(TEST_FINGERPRINT)
+    count = len(keys)
+
+    batch = keys.batch()
+    batch.import_key(b'key data')
+    batch.delete_key(OTHER_FINGERPRINT)
+    with pytest.raises(PGPKeyError):
+        batch.flush()
+    assert len(batch) == 0
+    assert len(mock_run.commands) == 2
+    assert '--import' in mock_run.commands[0]
+    assert '--delete-keys' in mock_run.commands[1]
+    assert len(keys) == count + 1
+    assert str(keys.get(TEST_FINGERPRINT).fingerprint) == TEST_FINGERPRINT
+    assert str(keys.get(OTHER_FINGERPRINT).fingerprint) == OTHER_FINGERPRINT
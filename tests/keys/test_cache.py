@@ -0,0 +1,309 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.cache module
+"""
+import os
+import shutil
+
+from pathlib import Path
+
+import pytest
+
+from gpg_keymanager.keys.cache import (
+    KeyDirectoryIndex,
+    KeyringCache,
+    get_cache_directory,
+    get_output_expiration,
+    write_cache_file,
+)
+from gpg_keymanager.keys.directory import PublicKeyDirectory
+from gpg_keymanager.keys.loader import UserPublicKeys
+from gpg_keymanager.keys.openpgp import read_key_identities, read_public_keys
+
+from ..conftest import EXPECTED_PUBLIC_KEY_COUNT, MOCK_KEY_FILES_DIRECTORY, load_key_testdata
+
+TEST_COMMAND = ['gpg', '--with-colons', '--keyid-format=long', '--list-keys']
+TEST_LINES = ['pub:u:4096:1:CB3B6A73C71838F3:1442484767:::u:::scESC::::::23::0:']
+# Trust database next check at 3000, key expiring at 2000 and sub key expired at 500
+TEST_EXPIRING_LINES = [
+    'tru::1:100:3000:3:1:5',
+    'pub:u:4096:1:CB3B6A73C71838F3:100:2000::u:::scESC::::::23::0:',
+    'sub:e:4096:1:6BF3D176F9965880:100:500:::::e::::::23:',
+]
+
+
+# pylint: disable=too-few-public-methods
+class CountingKeyLoader:
+    """
+    Load mocked key data and count the calls
+    """
+    def __init__(self):
+        self.call_count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.call_count += 1
+        return load_key_testdata(*args, **kwargs)
+
+
+# pylint: disable=too-few-public-methods
+class CountingKeyFileParser:
+    """
+    Parse keys from key files and record the parsed files
+    """
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self, path, *args, **kwargs):
+        self.paths.append(Path(path).name)
+        return read_public_keys(path, *args, **kwargs)
+
+
+def copy_key_files(tmpdir) -> Path:
+    """
+    Copy valid mock key files to temporary directory
+    """
+    path = Path(tmpdir, 'keys')
+    shutil.copytree(MOCK_KEY_FILES_DIRECTORY, path, ignore=shutil.ignore_patterns('invalid.asc'))
+    return path
+
+
+def test_keyring_cache_directory(monkeypatch, tmpdir) -> None:
+    """
+    Test detecting default cache directory
+    """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir))
+    assert get_cache_directory() == Path(tmpdir, 'gpg-keymanager')
+    monkeypatch.delenv('XDG_CACHE_HOME')
+    assert get_cache_directory() == Path('~/.cache/gpg-keymanager').expanduser()
+
+
+def test_keyring_cache_read_write(tmpdir) -> None:
+    """
+    Test reading and writing keyring cache with changes to keyring files
+    """
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir()
+    pubring = homedir.joinpath('pubring.kbx')
+    pubring.write_text('keys', encoding='utf-8')
+
+    cache = KeyringCache(path=Path(tmpdir, 'cache'), homedir=homedir)
+    assert str(cache) == str(Path(tmpdir, 'cache'))
+    assert cache.read(TEST_COMMAND) is None
+
+    cache.write(TEST_COMMAND, TEST_LINES, cache.fingerprint)
+    assert cache.read(TEST_COMMAND) == TEST_LINES
+    assert cache.read(TEST_COMMAND + ['--fast-list-mode']) is None
+
+    pubring.write_text('more keys', encoding='utf-8')
+    assert cache.read(TEST_COMMAND) is None
+
+    cache.clear()
+    assert list(cache.path.glob('*')) == []
+
+
+def test_keyring_cache_expiration(tmpdir) -> None:
+    """
+    Test cached keyring data expires when keys expire or trust database check is due
+    """
+    assert get_output_expiration(TEST_EXPIRING_LINES, timestamp=1000) == 2000
+    assert get_output_expiration(TEST_EXPIRING_LINES, timestamp=2000) == 3000
+    assert get_output_expiration(TEST_EXPIRING_LINES, timestamp=3000) is None
+    assert get_output_expiration(TEST_LINES + ['pub:u:4096:1:CB3B6A73C71838F3:100:invalid']) is None
+
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir()
+    cache = KeyringCache(path=Path(tmpdir, 'cache'), homedir=homedir)
+    cache.write(TEST_COMMAND, TEST_EXPIRING_LINES, cache.fingerprint, timestamp=1000)
+    assert cache.read(TEST_COMMAND, timestamp=1999) == TEST_EXPIRING_LINES
+    assert cache.read(TEST_COMMAND, timestamp=2000) is None
+    assert cache.read(TEST_COMMAND) is None
+
+    cache.write(TEST_COMMAND, TEST_EXPIRING_LINES, cache.fingerprint, timestamp=2500)
+    assert cache.read(TEST_COMMAND, timestamp=2999) == TEST_EXPIRING_LINES
+    assert cache.read(TEST_COMMAND, timestamp=3000) is None
+
+    cache.write(TEST_COMMAND, TEST_LINES, cache.fingerprint)
+    assert cache.read(TEST_COMMAND) == TEST_LINES
+
+
+def test_write_cache_file_errors(monkeypatch, tmpdir) -> None:
+    """
+    Test temporary files are removed when writing cache file fails
+    """
+    def mock_error(*args, **kwargs):
+        raise OSError('mock error')
+
+    path = Path(tmpdir, 'cache')
+    filename = path.joinpath('test.json')
+    with monkeypatch.context() as context:
+        context.setattr('gpg_keymanager.keys.cache.os.replace', mock_error)
+        write_cache_file(path, filename, {'lines': TEST_LINES})
+    assert list(path.iterdir()) == []
+
+    with pytest.raises(TypeError):
+        write_cache_file(path, filename, {'lines': object()})
+    assert list(path.iterdir()) == []
+
+    write_cache_file(path, filename, {'lines': TEST_LINES})
+    assert list(path.iterdir()) == [filename]
+
+
+def test_keyring_cache_write_changed_keyring(tmpdir) -> None:
+    """
+    Test data is not written to cache if keyring changes during command
+    """
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir()
+    cache = KeyringCache(path=Path(tmpdir, 'cache'), homedir=homedir)
+    fingerprint = cache.fingerprint
+    homedir.joinpath('trustdb.gpg').write_text('trust', encoding='utf-8')
+    cache.write(TEST_COMMAND, TEST_LINES, fingerprint)
+    assert cache.read(TEST_COMMAND) is None
+
+
+def test_user_keys_load_cached(monkeypatch, tmpdir) -> None:
+    """
+    Test loading user keys with keyring cache enabled
+    """
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir()
+    pubring = homedir.joinpath('pubring.kbx')
+    pubring.write_text('keys', encoding='utf-8')
+    loader = CountingKeyLoader()
+    monkeypatch.setattr('gpg_keymanager.keys.loader.run_command_lineoutput', loader)
+
+    cache = KeyringCache(path=Path(tmpdir, 'cache'), homedir=homedir)
+    for _count in range(2):
+        keys = UserPublicKeys(cache=cache)
+        assert len(keys) == EXPECTED_PUBLIC_KEY_COUNT
+    assert loader.call_count == 1
+
+    pubring.write_text('changed keys', encoding='utf-8')
+    keys = UserPublicKeys(cache=cache)
+    assert len(keys) == EXPECTED_PUBLIC_KEY_COUNT
+    assert loader.call_count == 2
+
+
+def test_user_keys_cache_disabled() -> None:
+    """
+    Test keyring cache is not configured by default
+    """
+    assert UserPublicKeys().cache is None
+    assert isinstance(UserPublicKeys(cache=True).cache, KeyringCache)
+
+
+# pylint: disable=unused-argument
+def test_user_keys_iter_keys_cached(mock_gpg_key_list, tmpdir) -> None:
+    """
+    Test streaming user keys with keyring cache enabled
+    """
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir()
+    cache = KeyringCache(path=Path(tmpdir, 'cache'), homedir=homedir)
+    command = UserPublicKeys().__get_gpg_command__()
+
+    assert len(list(UserPublicKeys(cache=cache).iter_keys())) == EXPECTED_PUBLIC_KEY_COUNT
+    assert cache.read(command) is not None
+    assert len(list(UserPublicKeys(cache=cache).iter_keys())) == EXPECTED_PUBLIC_KEY_COUNT
+
+
+def test_key_directory_index_read_write(tmpdir) -> None:
+    """
+    Test reading and writing key directory index entries with file changes
+    """
+    directory = copy_key_files(tmpdir)
+    keyfile = directory.joinpath('test.asc')
+    index = KeyDirectoryIndex(directory, path=Path(tmpdir, 'cache'))
+    assert str(index) == str(index.filename)
+    assert index.read(keyfile) is None
+
+    state = index.get_file_state(keyfile)
+    index.write(keyfile, TEST_LINES, state, expires=2000)
+    assert index.read(keyfile, timestamp=1000) == TEST_LINES
+    assert index.read(keyfile, timestamp=2000) is None
+    index.save()
+    saved = KeyDirectoryIndex(directory, path=Path(tmpdir, 'cache'))
+    assert len(saved) == 1
+    assert saved.files == index.files
+
+    os.utime(keyfile, ns=(state[1] + 10**9, state[1] + 10**9))
+    assert index.read(keyfile, timestamp=1000) == TEST_LINES
+    assert index.files['test.asc']['mtime'] == state[1] + 10**9
+
+    keyfile.write_bytes(keyfile.read_bytes().replace(b'=', b'x'))
+    assert index.read(keyfile, timestamp=1000) is None
+
+    index.write(keyfile, TEST_LINES, state)
+    assert index.read(keyfile) is None
+
+    index.prune([])
+    assert len(index) == 0
+    index.clear()
+    assert not index.filename.exists()
+
+
+def test_key_directory_load_cached(monkeypatch, tmpdir) -> None:
+    """
+    Test loading key directory with persistent index only parses changed files
+    """
+    directory = copy_key_files(tmpdir)
+    parser = CountingKeyFileParser()
+    monkeypatch.setattr('gpg_keymanager.keys.directory.read_public_keys', parser)
+    index = KeyDirectoryIndex(directory, path=Path(tmpdir, 'cache'))
+
+    keys = PublicKeyDirectory(directory, use_gpg=False, cache=index).keys
+    assert sorted(parser.paths) == ['keys.pub', 'test.asc']
+    assert index.filename.exists()
+
+    cached = PublicKeyDirectory(directory, use_gpg=False, cache=index).keys
+    assert len(parser.paths) == 2
+    assert [key.colon_lines for key in cached] == [key.colon_lines for key in keys]
+    assert all(str(key.keyring) in (str(item.keyring) for item in keys) for key in cached)
+
+    shutil.copy(directory.joinpath('test.asc'), directory.joinpath('team/keys.pub'))
+    directory.joinpath('test.asc').unlink()
+    assert isinstance(PublicKeyDirectory(directory, cache=True).cache, KeyDirectoryIndex)
+    assert PublicKeyDirectory(directory).cache is None
+    keys = PublicKeyDirectory(directory, use_gpg=False, cache=index).keys
+    assert parser.paths[2:] == ['keys.pub']
+    assert len(keys) == 1
+    assert list(index.files) == ['team/keys.pub']
+
+
+def test_key_directory_lookup_cached(monkeypatch, tmpdir) -> None:
+    """
+    Test key lookups use fingerprints and emails stored in key directory index
+    """
+    directory = copy_key_files(tmpdir)
+    scanned = []
+
+    def mock_read_key_identities(path):
+        scanned.append(Path(path).name)
+        return read_key_identities(path)
+
+    monkeypatch.setattr('gpg_keymanager.keys.directory.read_key_identities', mock_read_key_identities)
+    parser = CountingKeyFileParser()
+    monkeypatch.setattr('gpg_keymanager.keys.directory.read_public_keys', parser)
+    index = KeyDirectoryIndex(directory, path=Path(tmpdir, 'cache'))
+
+    keys = PublicKeyDirectory(directory, use_gpg=False, cache=index).filter_keys(email='test@example.org')
+    assert len(keys) == 1
+    assert sorted(scanned) == ['keys.pub', 'test.asc']
+    assert parser.paths == ['test.asc']
+    assert index.read(directory.joinpath('test.asc')) is not None
+    assert index.read(directory.joinpath('team/keys.pub')) is None
+
+    cached = KeyDirectoryIndex(directory, path=Path(tmpdir, 'cache'))
+    key = PublicKeyDirectory(directory, use_gpg=False, cache=cached).get(keys[0].sub_keys[0].key_id)
+    assert str(key.fingerprint) == str(keys[0].fingerprint)
+    assert len(scanned) == 2
+    assert parser.paths == ['test.asc']
+
+    PublicKeyDirectory(directory, use_gpg=False, cache=cached).load_key_files()
+    assert cached.read_identities(directory.joinpath('team/keys.pub'))['emails'] == [
+        'hile@codento.com', 'ilkka.tuohela@codento.com', 'second@example.net'
+    ]
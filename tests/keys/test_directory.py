@@ -6,14 +6,34 @@
 """
 Unit tests for gpg_keymanager.keys.directory module
 """
+import shutil
+
 from pathlib import Path
 
-from gpg_keymanager.keys.directory import PublicKeyDirectory
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.directory import PublicKeyDirectory, match_file_keys
+from gpg_keymanager.keys.openpgp import read_key_identities
 
-from ..conftest import MOCK_KEYS_DIRECTORY
+from ..conftest import MOCK_KEYS_DIRECTORY, MOCK_KEY_FILES_DIRECTORY
 from .test_public_key import KEY_ID
 
 EXPECTED_KEY_COUNT = 1
+EXPECTED_KEY_FILES_KEY_COUNT = 3
+
+TEST_FINGERPRINT = '4A9D7B2E759AB0C865611D6EC8849B9ADD78F46D'
+TEST_SUB_KEY_ID = '7874B30B3257A321'
+TEAM_FINGERPRINTS = ['EA1DAF5C552EEC9BBCEE08D8E8EF3D54894DBC28', 'E5157C36FD26CD25E28603E744AED9C78AA07B50']
+
+
+# pylint: disable=too-few-public-methods
+class MockKey:
+    """
+    Mock public key with fingerprint
+    """
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint = fingerprint
 
 
 def test_keys_directory_init(tmpdir):
@@ -40,3 +60,146 @@ def test_keys_directory_load():
     filtered = directory.filter_keys(key_id=KEY_ID)
     assert len(filtered) == 1
     assert KEY_ID in filtered
+
+
+def test_keys_directory_batch_load(mock_gpg_commands):
+    """
+    Test loading keys from multiple key files with one gpg command
+    """
+    commands = mock_gpg_commands.commands
+    directory = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY)
+    keyfiles = {keyfile.name: keyfile for keyfile in directory.load_key_files()}
+    assert len(commands) == 1
+    assert commands[0][-3:] == ('--show-keys', str(keyfiles['keys.pub']), str(keyfiles['test.asc']))
+
+    assert [str(key.fingerprint) for key in keyfiles['keys.pub']] == TEAM_FINGERPRINTS
+    assert [str(key.fingerprint) for key in keyfiles['test.asc']] == [TEST_FINGERPRINT]
+    assert all(key.keyring is keyfiles['keys.pub'] for key in keyfiles['keys.pub'])
+    assert len(commands) == 1
+    assert not keyfiles['invalid.asc'].is_loaded
+    with pytest.raises(PGPKeyError):
+        keyfiles['invalid.asc'].load()
+
+    directory = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc'])
+    assert len(directory.keys) == EXPECTED_KEY_FILES_KEY_COUNT
+    filtered = directory.filter_keys(email='@example.net')
+    assert [str(key.fingerprint) for key in filtered] == TEAM_FINGERPRINTS[1:]
+
+
+def test_keys_directory_batch_load_fallback(monkeypatch):
+    """
+    Test key files not matched to keys in batched gpg output are loaded separately
+    """
+    monkeypatch.setattr('gpg_keymanager.keys.directory.SHOW_KEYS_BATCH_SIZE', 1)
+    monkeypatch.setattr(
+        'gpg_keymanager.keys.directory.read_key_fingerprints',
+        lambda path: [TEST_FINGERPRINT]
+    )
+    directory = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY)
+    keyfiles = {keyfile.name: keyfile for keyfile in directory.load_key_files()}
+    assert keyfiles['test.asc'].is_loaded
+    assert not keyfiles['keys.pub'].is_loaded
+    assert [str(key.fingerprint) for key in keyfiles['keys.pub']] == TEAM_FINGERPRINTS
+
+
+def test_keys_directory_match_file_keys():
+    """
+    Test mapping keys listed from multiple files back to the files
+    """
+    keys = [MockKey(fingerprint) for fingerprint in ('A', 'B', 'C', 'A', 'D')]
+    expected = [('first', ['A', 'B']), ('second', ['X', 'C']), ('third', ['A']), ('fourth', ['E', 'D'])]
+    assert match_file_keys(expected, keys) == {'first': keys[:2], 'third': keys[3:4]}
+    assert match_file_keys([('first', ['A'])], []) == {}
+
+
+def test_keys_directory_load_without_gpg(mock_gpg_commands):
+    """
+    Test loading keys from key files without running gpg for files that can be parsed
+    """
+    commands = mock_gpg_commands.commands
+    directory = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, use_gpg=False)
+    keyfiles = {keyfile.name: keyfile for keyfile in directory.load_key_files()}
+    assert commands == []
+    assert [str(key.fingerprint) for key in keyfiles['keys.pub']] == TEAM_FINGERPRINTS
+    assert [str(key.fingerprint) for key in keyfiles['test.asc']] == [TEST_FINGERPRINT]
+    assert all(key.keyring is keyfiles['test.asc'] for key in keyfiles['test.asc'])
+    assert not keyfiles['invalid.asc'].is_loaded
+    with pytest.raises(PGPKeyError):
+        keyfiles['invalid.asc'].read_keys()
+
+    gpg_keys = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc']).keys
+    keys = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc'], use_gpg=False).keys
+    assert [(str(key.fingerprint), key.user_ids) for key in keys] == \
+        [(str(key.fingerprint), key.user_ids) for key in gpg_keys]
+
+
+def test_keys_directory_load_parallel(mock_gpg_commands):
+    """
+    Test loading key files in parallel chunks returns key files in stable order
+    """
+    commands = mock_gpg_commands.commands
+    expected = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc'])
+    directory = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc'], jobs=4)
+    assert [str(keyfile) for keyfile in directory.load_key_files()] == \
+        [str(keyfile) for keyfile in expected.load_key_files()]
+    assert len(commands) == 3
+    assert [str(key.fingerprint) for key in directory.keys] == [str(key.fingerprint) for key in expected.keys]
+
+    streamed = list(PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc'], jobs=2).iter_keys())
+    assert sorted(str(key.fingerprint) for key in streamed) == sorted(TEAM_FINGERPRINTS + [TEST_FINGERPRINT])
+
+    with pytest.raises(PGPKeyError):
+        PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, jobs=0)
+
+
+def test_keys_directory_lookup_loads_matching_files(mock_gpg_commands):
+    """
+    Test looking up keys only loads key files with matching keys
+    """
+    commands = mock_gpg_commands.commands
+    assert str(PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY).get(TEST_FINGERPRINT).fingerprint) == TEST_FINGERPRINT
+    commands.clear()
+    directory = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc'])
+
+    assert str(directory.get(TEST_FINGERPRINT[-8:]).fingerprint) == TEST_FINGERPRINT
+    assert [command[-1] for command in commands] == [str(MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc'))]
+    assert str(directory.get(TEST_SUB_KEY_ID).fingerprint) == TEST_FINGERPRINT
+    assert len(commands) == 2
+
+    commands.clear()
+    filtered = directory.filter_keys(email='@example.net')
+    assert [str(key.fingerprint) for key in filtered] == TEAM_FINGERPRINTS[1:]
+    assert [command[-1] for command in commands] == [str(MOCK_KEY_FILES_DIRECTORY.joinpath('team/keys.pub'))]
+
+    commands.clear()
+    assert directory.filter_keys(email='missing@example.com', key_id=TEAM_FINGERPRINTS[0]) == []
+    assert commands == []
+    with pytest.raises(PGPKeyError):
+        directory.get('0x1234567890ABCDEF')
+
+
+def test_keys_directory_lookup_fingerprint_filenames(monkeypatch, tmpdir):
+    """
+    Test key files named by fingerprint are only read when looking up matching keys
+    """
+    scanned = []
+
+    def mock_read_key_identities(path):
+        scanned.append(path.name)
+        return read_key_identities(path)
+
+    monkeypatch.setattr('gpg_keymanager.keys.directory.read_key_identities', mock_read_key_identities)
+    path = Path(tmpdir)
+    shutil.copy(MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc'), path.joinpath(f'0x{TEST_FINGERPRINT}.asc'))
+    shutil.copy(MOCK_KEY_FILES_DIRECTORY.joinpath('team/keys.pub'), path.joinpath(f'{TEAM_FINGERPRINTS[0]}.pub'))
+    directory = PublicKeyDirectory(path, use_gpg=False)
+
+    assert [str(key.fingerprint) for key in directory.filter_keys(key_id=TEST_FINGERPRINT[-16:])] == \
+        [TEST_FINGERPRINT]
+    assert str(directory.get(TEAM_FINGERPRINTS[0]).fingerprint) == TEAM_FINGERPRINTS[0]
+    assert scanned == []
+
+    assert str(directory.get(TEAM_FINGERPRINTS[1]).fingerprint) == TEAM_FINGERPRINTS[1]
+    assert sorted(scanned) == sorted(path.name for path in path.iterdir())
+    assert [str(key.fingerprint) for key in directory.filter_keys(email='test@example.org')] == [TEST_FINGERPRINT]
+    assert len(scanned) == 2
@@ -0,0 +1,87 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.dump module
+"""
+from pathlib import Path
+
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.dump import get_dump_chunks, parse_dump_file
+from gpg_keymanager.keys.loader import PublicKeyDataParser, UserPublicKeys
+
+from ..conftest import EXPECTED_PUBLIC_KEY_COUNT, MOCK_KEY_DATA
+
+DUMP_COPIES = 20
+
+
+def write_test_dump(path: Path) -> Path:
+    """
+    Write test dump with multiple copies of mock key data
+    """
+    data = Path(MOCK_KEY_DATA).read_text(encoding='utf-8')
+    path.write_text(data * DUMP_COPIES, encoding='utf-8')
+    return path
+
+
+def test_dump_chunks(tmpdir) -> None:
+    """
+    Test splitting dump file to chunks at public key boundaries
+    """
+    path = write_test_dump(Path(tmpdir, 'keys.txt'))
+    data = path.read_bytes()
+    chunks = get_dump_chunks(path, 8)
+    assert len(chunks) == 8
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == len(data)
+    for (_start, end), (start, _end) in zip(chunks[:-1], chunks[1:]):
+        assert end == start
+        assert data[start:start + 4] == b'pub:'
+
+    assert get_dump_chunks(path, 1) == [(0, len(data))]
+    # Trust database record before first key is in a chunk of its own
+    assert len(get_dump_chunks(path, len(data))) == EXPECTED_PUBLIC_KEY_COUNT * DUMP_COPIES + 1
+
+    empty = Path(tmpdir, 'empty.txt')
+    empty.write_bytes(b'')
+    assert get_dump_chunks(empty, 4) == []
+    assert parse_dump_file(empty) == []
+
+
+# pylint: disable=unused-argument
+def test_dump_parse_file(mock_gpg_key_list) -> None:
+    """
+    Test loading keys from dump file
+    """
+    keys = PublicKeyDataParser.from_file(MOCK_KEY_DATA, jobs=1)
+    loaded = UserPublicKeys()
+    loaded.load()
+    assert [key.line for key in keys] == [key.line for key in loaded]
+    assert all(key.keyring is keys for key in keys)
+    assert keys.get(str(loaded[0].fingerprint)).fingerprint == loaded[0].fingerprint
+
+    with pytest.raises(PGPKeyError):
+        PublicKeyDataParser.from_file(Path(MOCK_KEY_DATA).with_name('missing.txt'))
+
+
+def test_dump_parse_file_parallel(monkeypatch, tmpdir) -> None:
+    """
+    Test loading keys from dump file in parallel processes
+    """
+    monkeypatch.setattr('gpg_keymanager.keys.dump.MIN_PARALLEL_DUMP_SIZE', 0)
+    path = write_test_dump(Path(tmpdir, 'keys.txt'))
+    serial = parse_dump_file(path, jobs=1)
+    parallel = parse_dump_file(path, jobs=2)
+    assert len(parallel) == EXPECTED_PUBLIC_KEY_COUNT * DUMP_COPIES
+    assert [key.line for key in parallel] == [key.line for key in serial]
+    assert [key.emails for key in parallel] == [key.emails for key in serial]
+    for key in parallel:
+        assert key.keyring is None
+        assert key.fingerprint.key is key
+        assert all(sub_key.key is key for sub_key in key.sub_keys)
+        assert all(user_id.key is key for user_id in key.user_ids)
+    assert len(PublicKeyDataParser.from_file(path, jobs=2)) == len(parallel)
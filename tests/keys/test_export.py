@@ -0,0 +1,135 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.export module
+"""
+import os
+import stat
+
+from pathlib import Path
+
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.directory import PublicKeyDirectory
+from gpg_keymanager.keys.export import export_keys_to_directory, write_key_file
+from gpg_keymanager.keys.loader import UserPublicKeys
+from gpg_keymanager.keys.openpgp import read_key_fingerprints
+
+from ..base import CountingRun, MockCallArguments
+from ..conftest import MOCK_KEY_FILES_DIRECTORY
+
+MOCK_EXPORT_RUN_METHOD = 'gpg_keymanager.keys.export.run'
+
+TEST_KEY_FILE = MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc')
+TEAM_KEY_FILE = MOCK_KEY_FILES_DIRECTORY.joinpath('team/keys.pub')
+MISSING_FINGERPRINT = '87DF5EA2B85E025D159888ACC660ACF1DA570475'
+
+
+def get_keyring(tmpdir) -> UserPublicKeys:
+    """
+    Return keyring in temporary GnuPG home directory with test keys imported
+    """
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir(mode=0o700)
+    keyring = UserPublicKeys(homedir=homedir)
+    with keyring.batch() as batch:
+        batch.import_key(TEST_KEY_FILE)
+        batch.import_key(TEAM_KEY_FILE)
+    return keyring
+
+
+def test_export_write_key_file(tmpdir) -> None:
+    """
+    Test writing key files only when contents change
+    """
+    path = Path(tmpdir, 'test.asc')
+    assert write_key_file(path, b'key')
+    assert not write_key_file(path, b'key')
+    assert write_key_file(path, b'changed key')
+    assert path.read_bytes() == b'changed key'
+    assert [item.name for item in Path(tmpdir).iterdir()] == ['test.asc']
+    with pytest.raises(PGPKeyError):
+        write_key_file(Path(tmpdir, 'missing', 'test.asc'), b'key')
+
+
+def test_export_write_key_file_mode(tmpdir) -> None:
+    """
+    Test key file mode follows umask for new files and is kept for replaced files
+    """
+    path = Path(tmpdir, 'test.asc')
+    umask = os.umask(0o022)
+    try:
+        assert write_key_file(path, b'key')
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+
+    path.chmod(0o640)
+    assert write_key_file(path, b'changed key')
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+
+def test_export_write_key_file_errors(monkeypatch, tmpdir) -> None:
+    """
+    Test temporary files are removed when writing key file fails
+    """
+    def mock_error(*args, **kwargs):
+        raise OSError('mock error')
+
+    path = Path(tmpdir, 'test.asc')
+    for method in ('gpg_keymanager.keys.export.os.chmod', 'gpg_keymanager.keys.export.os.replace'):
+        with monkeypatch.context() as context:
+            if method.endswith('chmod'):
+                path.write_bytes(b'key')
+            context.setattr(method, mock_error)
+            with pytest.raises(PGPKeyError):
+                write_key_file(path, b'changed key')
+        assert [item.name for item in Path(tmpdir).iterdir()] == ['test.asc']
+
+
+def test_export_keys_to_directory(monkeypatch, tmpdir) -> None:
+    """
+    Test exporting keys to key directory with one gpg command and skipping unchanged files
+    """
+    keyring = get_keyring(tmpdir)
+    mock_run = CountingRun()
+    monkeypatch.setattr(MOCK_EXPORT_RUN_METHOD, mock_run)
+    directory = Path(tmpdir, 'keys')
+    fingerprints = read_key_fingerprints(TEAM_KEY_FILE) + read_key_fingerprints(TEST_KEY_FILE)
+
+    changes = export_keys_to_directory(keyring, fingerprints + [MISSING_FINGERPRINT.lower()], directory)
+    assert len(mock_run.commands) == 1
+    assert changes.missing == [MISSING_FINGERPRINT]
+    assert changes.unchanged == []
+    assert sorted(path.name for path in changes.written) == sorted(f'{value}.asc' for value in fingerprints)
+    for fingerprint in fingerprints:
+        assert read_key_fingerprints(directory.joinpath(f'{fingerprint}.asc')) == [fingerprint]
+    # Armored output matches gpg --export --armor output for the same key
+    assert directory.joinpath(f'{fingerprints[2]}.asc').read_bytes() == TEST_KEY_FILE.read_bytes()
+    assert sorted(str(key.fingerprint) for key in PublicKeyDirectory(directory).keys) == sorted(fingerprints)
+
+    mtime = directory.joinpath(f'{fingerprints[0]}.asc').stat().st_mtime_ns
+    changes = export_keys_to_directory(keyring, fingerprints[:1], directory)
+    assert not changes
+    assert changes.unchanged == [directory.joinpath(f'{fingerprints[0]}.asc')]
+    assert directory.joinpath(f'{fingerprints[0]}.asc').stat().st_mtime_ns == mtime
+    assert len(mock_run.commands) == 2
+
+    assert not export_keys_to_directory(keyring, [], directory)
+    assert len(mock_run.commands) == 2
+
+
+def test_export_keys_errors(monkeypatch, tmpdir) -> None:
+    """
+    Test errors exporting keys
+    """
+    keyring = UserPublicKeys(homedir=tmpdir)
+    with pytest.raises(PGPKeyError):
+        export_keys_to_directory(keyring, [MISSING_FINGERPRINT], tmpdir, extension='.txt')
+    monkeypatch.setattr(MOCK_EXPORT_RUN_METHOD, MockCallArguments(returncode=2))
+    with pytest.raises(PGPKeyError):
+        export_keys_to_directory(keyring, [MISSING_FINGERPRINT], tmpdir)
@@ -0,0 +1,257 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.index module
+"""
+import time
+
+from datetime import datetime, timezone
+
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.index import (
+    KeyFileIndex,
+    PublicKeyIndex,
+    compile_email_patterns,
+    get_domain_pattern,
+    get_email_domain,
+    get_fingerprint_key_id,
+    get_timestamp,
+    normalize_key_id,
+)
+from gpg_keymanager.keys.loader import UserPublicKeys
+
+TEST_FINGERPRINT = '87DF5EA2B85E025D159888ACC660ACF1DA570475'
+TEST_KEY_ID = '0xC660ACF1DA570475'
+TEST_SHORT_KEY_ID = 'DA570475'
+TEST_SUB_KEY_ID = 'CE58307DE58EC6B3'
+TEST_SUB_KEY_FINGERPRINT = '27A3ED87381E5508CD6D243CCE58307DE58EC6B3'
+TEST_EMAIL = 'hile@iki.fi'
+TEST_DOMAIN = 'codento.com'
+
+EXPECTED_EMAIL_KEY_COUNT = 4
+EXPECTED_DOMAIN_KEY_COUNT = 2
+
+# Expiration timestamps of keys in mock key data, last key expires in 2033
+EXPIRATION_TIMESTAMPS = (1520430095, 1521608993, 1567871080, 2013464897)
+EXPECTED_EXPIRING_KEY_COUNT = len(EXPIRATION_TIMESTAMPS)
+TEST_EXPIRATION = 1567871080
+
+
+def test_index_utils() -> None:
+    """
+    Test utility functions for key index
+    """
+    assert normalize_key_id(TEST_KEY_ID.lower()) == TEST_KEY_ID[2:]
+    assert get_email_domain('Test@Example.COM') == 'example.com'
+    assert get_email_domain('invalid') is None
+
+    assert get_domain_pattern('@Example.COM') == 'example.com'
+    for pattern in ('example.com', '@*.example.com', 'test@example.com', '@example.co?'):
+        assert get_domain_pattern(pattern) is None
+
+    regex = compile_email_patterns(('HILE@', '*.tuohela@gmail.*'))
+    assert regex is compile_email_patterns(('HILE@', '*.tuohela@gmail.*'))
+    for email in ('hile@iki.fi', 'ilkka.tuohela@gmail.com'):
+        assert regex.match(email)
+    assert not regex.match('ilkka.tuohela@codento.com')
+    assert not compile_email_patterns(('HILE@',), ignore_case=False).match('hile@iki.fi')
+
+
+# pylint: disable=unused-argument
+def test_index_lookups(mock_gpg_key_list) -> None:
+    """
+    Test looking up keys with index
+    """
+    keys = UserPublicKeys()
+    keys.load()
+    index = PublicKeyIndex(keys)
+    assert len(index) == len(keys)
+    assert keys[0] in index
+
+    for value in (TEST_FINGERPRINT, TEST_KEY_ID, TEST_SHORT_KEY_ID, TEST_SHORT_KEY_ID.lower()):
+        refs = index.find_primary_key(value)
+        assert len(refs) == 1
+        assert index.sorted_keys(refs)[0].fingerprint == TEST_FINGERPRINT
+
+    assert index.find_primary_key(TEST_SUB_KEY_ID) == set()
+    assert index.find_key(TEST_SUB_KEY_ID) == index.find_key(TEST_SUB_KEY_FINGERPRINT)
+    assert index.find_key(TEST_SUB_KEY_ID) == index.find_fingerprint(TEST_FINGERPRINT)
+
+    assert len(index.find_email(TEST_EMAIL.upper())) == EXPECTED_EMAIL_KEY_COUNT
+    assert len(index.find_domain(TEST_DOMAIN)) == EXPECTED_DOMAIN_KEY_COUNT
+    assert index.find_domain(f'@{TEST_DOMAIN}') == index.find_domain(TEST_DOMAIN)
+
+    index.clear()
+    assert len(index) == 0
+    assert index.find_email(TEST_EMAIL) == set()
+
+
+# pylint: disable=unused-argument
+def test_index_collection_mutations(mock_gpg_key_list) -> None:
+    """
+    Test key collection indexes are updated when collection is modified
+    """
+    keys = UserPublicKeys()
+    keys.load()
+    key = keys.get(TEST_FINGERPRINT)
+    assert keys.get(TEST_SUB_KEY_ID) is key
+
+    keys.__remove_key__(TEST_KEY_ID)
+    assert TEST_FINGERPRINT not in [key.fingerprint for key in keys]
+    with pytest.raises(PGPKeyError):
+        keys.get(TEST_FINGERPRINT)
+
+    keys.append(key)
+    assert keys.get(TEST_FINGERPRINT) is key
+    assert keys[-1] is key
+
+    other = keys[0]
+    keys.__remove_key__(TEST_KEY_ID)
+    keys[0] = key
+    assert keys.get(TEST_FINGERPRINT) is key
+    with pytest.raises(PGPKeyError):
+        keys.get(str(other.fingerprint))
+
+    del keys[0:2]
+    assert len(keys.__key_index__) == len(keys)
+    with pytest.raises(PGPKeyError):
+        keys.get(TEST_FINGERPRINT)
+
+    keys.clear()
+    assert len(keys.__key_index__) == 0
+
+
+# pylint: disable=unused-argument
+def test_index_collection_order(mock_gpg_key_list) -> None:
+    """
+    Test index order follows collection order when keys are inserted, replaced and updated
+    """
+    keys = UserPublicKeys()
+    keys.load()
+    index = keys.__key_index__
+    key = keys.get(TEST_FINGERPRINT)
+
+    keys.__remove_key__(TEST_KEY_ID)
+    keys.insert(1, key)
+    assert keys[1] is key
+    assert list(keys.filter_keys()) == list(keys)
+    assert index.sorted_keys(index.keys) == list(keys)
+    assert index.expirations == sorted(index.expirations)
+
+    other = keys[0]
+    index.update(other)
+    keys[2] = keys[2]
+    assert index.sorted_keys(index.keys) == list(keys)
+    assert keys.filter_keys()[0] is other
+
+
+# pylint: disable=unused-argument
+def test_index_filter_keys(mock_gpg_key_list) -> None:
+    """
+    Test filtering keys with indexes
+    """
+    keys = UserPublicKeys()
+    keys.load()
+    assert len(keys.filter_keys(email=TEST_EMAIL, key_id=TEST_KEY_ID)) == 1
+    assert len(keys.filter_keys(email=TEST_DOMAIN)) == EXPECTED_DOMAIN_KEY_COUNT
+    assert len(keys.filter_keys(email=TEST_EMAIL.upper())) == EXPECTED_EMAIL_KEY_COUNT
+    assert len(keys.filter_keys(fingerprint=TEST_FINGERPRINT, key_id=TEST_SUB_KEY_ID)) == 0
+    assert len(keys.filter_keys()) == len(keys)
+
+    filtered = keys.filter_keys(email=TEST_EMAIL)
+    assert [key.fingerprint for key in filtered] == [
+        key.fingerprint for key in keys if key.match_email_pattern(TEST_EMAIL)
+    ]
+
+
+# pylint: disable=unused-argument
+def test_index_expiration_queries(mock_gpg_key_list) -> None:
+    """
+    Test querying keys by expiration date
+    """
+    keys = UserPublicKeys()
+    keys.load()
+    index = keys.__key_index__
+    assert len(index.expirations) == EXPECTED_EXPIRING_KEY_COUNT
+    assert index.expirations == sorted(index.expirations)
+
+    assert get_timestamp(datetime.fromtimestamp(TEST_EXPIRATION, tz=timezone.utc)) == TEST_EXPIRATION
+    assert abs(get_timestamp() - time.time()) < 2
+
+    expired = keys.get_expired_keys(TEST_EXPIRATION)
+    assert [key.expiration_timestamp for key in expired] == sorted(EXPIRATION_TIMESTAMPS)[:3]
+    assert keys.get_keys_expiring_before(TEST_EXPIRATION) == expired[:2]
+    assert keys.get_next_expiring_keys(1, TEST_EXPIRATION)[0].expiration_timestamp == max(EXPIRATION_TIMESTAMPS)
+    assert keys.get_next_expiring_keys(10, 0) == keys.get_keys_expiring_before(max(EXPIRATION_TIMESTAMPS) + 1)
+    assert keys.get_expired_keys(0) == []
+
+    keys.__remove_key__(TEST_KEY_ID)
+    assert len(index.expirations) == EXPECTED_EXPIRING_KEY_COUNT - 1
+    assert TEST_FINGERPRINT not in [key.fingerprint for key in keys.get_expired_keys(TEST_EXPIRATION)]
+
+
+# pylint: disable=unused-argument
+def test_index_filter_keys_email_patterns(mock_gpg_key_list) -> None:
+    """
+    Test filtering keys with domain and multiple email patterns
+    """
+    keys = UserPublicKeys()
+    keys.load()
+    assert keys.__key_index__.find_domain_prefix('@codento.co') == keys.__key_index__.find_domain(TEST_DOMAIN)
+    assert len(keys.filter_keys(email=f'@{TEST_DOMAIN}')) == EXPECTED_DOMAIN_KEY_COUNT
+    assert len(keys.filter_keys(email='@codento.co')) == EXPECTED_DOMAIN_KEY_COUNT
+    assert len(keys.filter_keys(email='@codento.comx')) == 0
+
+    filtered = keys.filter_keys(email=[f'@{TEST_DOMAIN}', '*@gmail.com'])
+    assert [key.fingerprint for key in filtered] == [
+        key.fingerprint for key in keys
+        if key.match_email_pattern(f'@{TEST_DOMAIN}') or key.match_email_pattern('*@gmail.com')
+    ]
+    assert filtered.__index_data__ is None
+    assert len(keys.filter_keys(email=[])) == 0
+
+    for patterns in (['IKI.fi'], ['iki.fi', 'gmail.*']):
+        filtered = keys.filter_keys(email=patterns)
+        assert [key.fingerprint for key in filtered] == [
+            key.fingerprint for key in keys
+            if any(key.match_email_pattern(pattern.lower()) for pattern in patterns)
+        ]
+
+
+def test_key_file_index_lookups() -> None:
+    """
+    Test looking up key files by fingerprints, key IDs and emails
+    """
+    v6_fingerprint = 'AB' * 32
+    assert get_fingerprint_key_id(TEST_FINGERPRINT) == TEST_KEY_ID[2:]
+    assert get_fingerprint_key_id(v6_fingerprint.lower()) == v6_fingerprint[:16]
+
+    index = KeyFileIndex()
+    index.add('keys.asc', [TEST_FINGERPRINT], sub_keys=[TEST_SUB_KEY_FINGERPRINT], emails=['Test@Example.com'])
+    index.add('v6.asc', [v6_fingerprint], partial=True)
+    assert len(index) == 2
+    assert 'keys.asc' in index
+    for value in (TEST_FINGERPRINT, TEST_KEY_ID, TEST_SHORT_KEY_ID):
+        assert index.find_primary_key(value) == {'keys.asc'}
+    assert index.find_primary_key(TEST_SUB_KEY_ID) == set()
+    assert index.find_key(TEST_SUB_KEY_ID) == {'keys.asc', 'v6.asc'}
+    assert index.find_email_pattern('@example.com') == {'keys.asc', 'v6.asc'}
+    assert index.find_email_pattern(['nobody@*', 'test@*']) == {'keys.asc', 'v6.asc'}
+
+    index.add('v6.asc', [v6_fingerprint], emails=['v6@example.org'])
+    assert index.partial == set()
+    assert index.find_email_pattern('@example.org') == {'v6.asc'}
+    assert index.find_primary_key(v6_fingerprint[:16]) == {'v6.asc'}
+
+    index.add_unknown('unknown.asc')
+    assert index.find_primary_key(TEST_FINGERPRINT) == {'keys.asc', 'unknown.asc'}
+    index.remove('keys.asc')
+    assert index.find_key(TEST_SUB_KEY_ID) == {'unknown.asc'}
+    assert index.fingerprints == {v6_fingerprint: {'v6.asc'}}
+    index.clear()
+    assert len(index) == 0
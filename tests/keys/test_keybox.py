@@ -0,0 +1,187 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.keybox module
+"""
+import struct
+
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.keybox import (
+    KeyboxPublicKeys,
+    escape_colon_field,
+    iter_keybox_records,
+    read_keybox,
+)
+from gpg_keymanager.keys.loader import PublicKeyDataParser
+
+from ..conftest import MOCK_DATA, MOCK_KEY_DATA
+
+MOCK_KEYBOX_DIRECTORY = MOCK_DATA.joinpath('keybox')
+# Keybox with 3 keys and one deleted key, and gpg --with-colons listing of the keybox
+MOCK_KEYBOX = MOCK_KEYBOX_DIRECTORY.joinpath('pubring.kbx')
+MOCK_KEYBOX_KEY_DATA = MOCK_KEYBOX_DIRECTORY.joinpath('keys.txt')
+
+EXPECTED_KEYBOX_KEY_COUNT = 3
+EXPECTED_KEY_COUNT = 5
+TEST_FINGERPRINT = '4A9D7B2E759AB0C865611D6EC8849B9ADD78F46D'
+TEST_SUB_KEY_ID = '7874B30B3257A321'
+TEST_EMAIL = 'test@example.com'
+TEST_EXPIRED_FINGERPRINT = 'EA1DAF5C552EEC9BBCEE08D8E8EF3D54894DBC28'
+TEST_EXPIRED_TIMESTAMP = 1600000000
+
+TEST_V5_FINGERPRINT = bytes(range(32))
+TEST_V5_USER_ID = 'Test V5 Key <v5@example.com>'
+
+
+def get_key_details(key):
+    """
+    Return details of a key available both in keybox and gpg output
+    """
+    return (
+        str(key.fingerprint),
+        key.key_id,
+        [(sub_key.key_id, str(sub_key.fingerprint)) for sub_key in key.sub_keys],
+        [str(user_id) for user_id in key.user_ids],
+    )
+
+
+def get_mock_keybox_data() -> bytes:
+    """
+    Return keybox data with a version 2 blob for a key with 32 byte fingerprint, an ephemeral
+    key blob and an empty blob
+    """
+    header = struct.pack('>IBBH4s5I', 32, 1, 1, 0, b'KBXf', 0, 0, 0, 0, 0)
+
+    user_id = TEST_V5_USER_ID.encode('utf-8')
+    user_id_offset = 20 + 56 + 2 + 4 + 12
+    key_info = TEST_V5_FINGERPRINT + struct.pack('>HH', 0x80, 0) + bytes(20)
+    blob = struct.pack('>IBBHIIHH', user_id_offset + len(user_id), 2, 2, 0, 0, 0, 1, 56) + key_info
+    blob += struct.pack('>HHHIIHBB', 0, 1, 12, user_id_offset, len(user_id), 0, 0, 0) + user_id
+
+    ephemeral = struct.pack('>IBBHIIHH', 20, 2, 1, 2, 0, 0, 0, 28)
+    empty = struct.pack('>IBB', 16, 0, 1) + bytes(10)
+    return header + ephemeral + blob + empty
+
+
+def test_keybox_escape_colon_field() -> None:
+    """
+    Test escaping user IDs like gpg does in colon listing
+    """
+    assert escape_colon_field('Test: User <test@example.com>') == 'Test\\x3a User <test@example.com>'
+    assert escape_colon_field('a\\b\n') == 'a\\\\b\\x0a'
+    assert escape_colon_field('Tëst') == 'Tëst'
+
+
+def test_keybox_read_matches_gpg_output() -> None:
+    """
+    Test keys read from keybox file match gpg listing of the same keyring
+    """
+    records = read_keybox(MOCK_KEYBOX)
+    assert len(records) == EXPECTED_KEYBOX_KEY_COUNT
+    assert records[1].fingerprint == TEST_FINGERPRINT
+    assert records[1].key_id == TEST_FINGERPRINT[-16:]
+
+    with MOCK_KEYBOX_KEY_DATA.open('r', encoding='utf-8') as filedescriptor:
+        gpg_keys = list(PublicKeyDataParser().__iter_parsed_keys__(filedescriptor))
+    keybox_keys = list(PublicKeyDataParser().__iter_parsed_keys__(
+        line for record in records for line in record.colon_lines
+    ))
+    assert [get_key_details(key) for key in keybox_keys] == [get_key_details(key) for key in gpg_keys]
+
+
+def test_keybox_parse_blob_versions() -> None:
+    """
+    Test parsing version 2 keybox blobs and skipping ephemeral and empty blobs
+    """
+    records = list(iter_keybox_records(get_mock_keybox_data()))
+    assert len(records) == 1
+    assert records[0].fingerprint == TEST_V5_FINGERPRINT.hex().upper()
+    assert records[0].key_id == TEST_V5_FINGERPRINT[:8].hex().upper()
+    assert records[0].user_ids == [TEST_V5_USER_ID]
+
+
+def test_keybox_parse_errors(tmpdir) -> None:
+    """
+    Test errors parsing invalid keybox data
+    """
+    data = get_mock_keybox_data()
+    for value in (b'', data[:20], b'\x00' * 32, data[:-8]):
+        with pytest.raises(PGPKeyError):
+            list(iter_keybox_records(value))
+    with pytest.raises(PGPKeyError):
+        read_keybox(tmpdir.join('missing.kbx'))
+    with pytest.raises(PGPKeyError):
+        read_keybox(MOCK_KEY_DATA)
+
+
+def test_keybox_public_keys_load(mock_gpg_commands) -> None:
+    """
+    Test loading keys from keybox with lazy loading of key details with gpg
+    """
+    commands = mock_gpg_commands.commands
+    mock_gpg_commands.output = MOCK_KEYBOX_KEY_DATA
+    keys = KeyboxPublicKeys(path=MOCK_KEYBOX)
+    assert len(keys) == EXPECTED_KEYBOX_KEY_COUNT
+    assert keys.loaded_from_keybox
+    key = keys.get(TEST_SUB_KEY_ID)
+    assert str(key.fingerprint) == TEST_FINGERPRINT
+    assert [str(key.fingerprint) for key in keys.filter_keys(email=TEST_EMAIL)] == [TEST_FINGERPRINT]
+    assert commands == []
+
+    assert key.key_validity is not None
+    assert len(commands) == 1
+    assert keys.get(TEST_FINGERPRINT) is key
+    assert [get_key_details(key) for key in keys.iter_keys()] == [get_key_details(key) for key in keys]
+
+    streamed = list(KeyboxPublicKeys(path=MOCK_KEYBOX).iter_keys())
+    assert len(streamed) == EXPECTED_KEYBOX_KEY_COUNT
+    assert len(commands) == 1
+
+
+def test_keybox_public_keys_key_fields(mock_gpg_commands) -> None:
+    """
+    Test key fields missing from keybox are loaded with gpg when requested
+    """
+    commands = mock_gpg_commands.commands
+    mock_gpg_commands.output = MOCK_KEYBOX_KEY_DATA
+    with MOCK_KEYBOX_KEY_DATA.open('r', encoding='utf-8') as filedescriptor:
+        gpg_keyring = PublicKeyDataParser(keys=list(PublicKeyDataParser().__iter_parsed_keys__(filedescriptor)))
+    gpg_keys = {str(key.fingerprint): key for key in gpg_keyring}
+
+    for attr in ('capability_flags', 'key_length', 'creation_date', 'expiration_date', 'expiration_timestamp'):
+        keys = KeyboxPublicKeys(path=MOCK_KEYBOX)
+        key = keys.get(TEST_FINGERPRINT)
+        commands.clear()
+        assert getattr(key, attr) == getattr(gpg_keys[TEST_FINGERPRINT], attr)
+        assert len(commands) == 1
+    assert key.sub_keys[0].key_capabilities == gpg_keys[TEST_FINGERPRINT].sub_keys[0].key_capabilities
+
+    keys = KeyboxPublicKeys(path=MOCK_KEYBOX)
+    invalid = [str(key.fingerprint) for key in keys.validate_all().invalid_keys]
+    assert invalid == [str(key.fingerprint) for key in gpg_keyring.validate_all().invalid_keys]
+    assert TEST_FINGERPRINT not in invalid
+    assert str(keys.get_expired_keys(TEST_EXPIRED_TIMESTAMP)[0].fingerprint) == TEST_EXPIRED_FINGERPRINT
+    assert [str(key.fingerprint) for key in KeyboxPublicKeys(path=MOCK_KEYBOX).get_next_expiring_keys(1, 0)] == [
+        TEST_EXPIRED_FINGERPRINT
+    ]
+
+
+# pylint: disable=unused-argument
+def test_keybox_public_keys_fallback(mock_gpg_key_list, tmpdir) -> None:
+    """
+    Test loading keys with gpg when keybox file can't be used
+    """
+    assert KeyboxPublicKeys(homedir=tmpdir).path == tmpdir.join('pubring.kbx')
+    for keys in (
+            KeyboxPublicKeys(path=tmpdir.join('missing.kbx')),
+            KeyboxPublicKeys(path=MOCK_KEY_DATA),
+            KeyboxPublicKeys('--list-keys', path=MOCK_KEYBOX)):
+        keys.load()
+        assert not keys.loaded_from_keybox
+        assert len(keys) == EXPECTED_KEY_COUNT
+    assert len(list(KeyboxPublicKeys(path=MOCK_KEY_DATA).iter_keys())) == EXPECTED_KEY_COUNT
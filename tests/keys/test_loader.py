@@ -6,13 +6,16 @@
 """
 Unit tests for gpg_keymanager.keys.directory module
 """
+from pathlib import Path
+
 import pytest
 
 from gpg_keymanager.exceptions import PGPKeyError
 from gpg_keymanager.keys import UserPublicKeys
-from gpg_keymanager.keys.loader import PublicKeyDataParser
+from gpg_keymanager.keys.loader import PublicKeyDataParser, load_user_keyrings
 
 from ..base import mock_called_process_error, mock_pgp_key_error
+from ..conftest import load_key_testdata
 
 TOTAL_KEY_COUNT = 5
 EXPIRED_KEY_COUNT = 2
@@ -39,6 +42,26 @@ class MockCalledMethod:
         self.kwargs = kwargs
 
 
+def load_fast_list_key_testdata(*args, **kwargs):
+    """
+    Load test key data without validity and owner trust fields when listing in fast list mode
+    """
+    stdout, stderr = load_key_testdata(*args, **kwargs)
+    if '--fast-list-mode' in args:
+        stdout = [
+            ':'.join(field if index not in (1, 8) else '' for index, field in enumerate(line.split(':')))
+            for line in stdout
+        ]
+    return stdout, stderr
+
+
+def load_homedir_key_testdata(*args, **kwargs):
+    """
+    Load test key data for gpg commands with --homedir arguments
+    """
+    return load_key_testdata(*(args[:1] + args[3:]), **kwargs)
+
+
 def test_parser_init():
     """
     Test initializing a PublicKeyDataParser object
@@ -116,3 +139,133 @@ def test_user_keys_trustdb_cleanup(monkeypatch, mock_gpg_key_list):
     with pytest.raises(PGPKeyError):
         keys.__gpg_args__ = [TEST_KEY_ID]
         keys.cleanup_owner_trust_database()
+
+
+# pylint: disable=unused-argument
+def test_user_keys_iter_keys(mock_gpg_key_list):
+    """
+    Test streaming user keys from gpg output
+    """
+    keys = UserPublicKeys()
+    streamed = list(keys.iter_keys())
+    assert len(streamed) == TOTAL_KEY_COUNT
+    assert keys.is_loaded is False
+    for key in streamed:
+        assert key.keyring == keys
+        assert key.fingerprint is not None
+        assert key.user_ids
+
+    # Stopping iteration early
+    iterator = keys.iter_keys()
+    assert next(iterator).key_id == streamed[0].key_id
+    iterator.close()
+
+    keys.load()
+    assert list(keys.iter_keys()) == list(keys)
+
+
+# pylint: disable=unused-argument
+def test_user_keys_refresh(monkeypatch, mock_gpg_key_list):
+    """
+    Test refreshing individual keys in loaded user keys
+    """
+    keys = UserPublicKeys()
+    refreshed = keys.refresh(TEST_FINGERPRINT)
+    assert keys.is_loaded
+    assert len(refreshed) == 1
+    key = refreshed[0]
+
+    assert keys.refresh() == []
+    assert keys.refresh(TEST_FINGERPRINT) == [key]
+    assert keys.refresh(TEST_FINGERPRINT)[0] is key
+    assert keys.get(TEST_FINGERPRINT) is key
+    assert key.fingerprint.key is key
+    assert len(keys) == TOTAL_KEY_COUNT
+
+    # Refreshed keys keep their order and keys not loaded are inserted in sorted order
+    order = [str(item.fingerprint) for item in keys]
+    assert order != sorted(order)
+    keys.refresh(TEST_FINGERPRINT)
+    assert [str(item.fingerprint) for item in keys] == order
+    keys.__remove_key__(TEST_KEY_ID)
+    assert len(keys) == TOTAL_KEY_COUNT - 1
+    assert keys.refresh(TEST_KEY_ID)[0].key_id == TEST_KEY_ID
+    assert len(keys) == TOTAL_KEY_COUNT
+    user_ids = [str(item.primary_user_id) for item in keys]
+    assert user_ids == sorted(user_ids)
+    assert keys[-1].key_id == TEST_KEY_ID
+    assert list(keys.filter_keys()) == list(keys)
+    assert keys.__key_index__.sorted_keys(keys.__key_index__.keys) == list(keys)
+
+    # Key not found in keyring any more is removed
+    monkeypatch.setattr(
+        'gpg_keymanager.keys.loader.run_command_lineoutput',
+        lambda *args, **kwargs: ([], [])
+    )
+    assert keys.refresh(TEST_FINGERPRINT) == []
+    assert len(keys) == TOTAL_KEY_COUNT - 1
+    with pytest.raises(PGPKeyError):
+        keys.get(TEST_FINGERPRINT)
+
+
+def test_user_keys_fast_list_mode(mock_gpg_commands):
+    """
+    Test loading keys in fast list mode with lazy loading of key details
+    """
+    commands = mock_gpg_commands.commands
+    mock_gpg_commands.handler = load_fast_list_key_testdata
+    keys = UserPublicKeys(fast_list_mode=True)
+    keys.load()
+    assert len(commands) == 1
+    assert '--fast-list-mode' in commands[0]
+    key = keys.get(TEST_FINGERPRINT)
+    assert key.line.split(':')[1] == ''
+
+    filtered = keys.filter_keys(email=TEST_EMAIL)
+    assert filtered.fast_list_mode
+    assert len(keys.expired_keys) == EXPIRED_KEY_COUNT
+    assert len(commands) == 2
+    assert '--fast-list-mode' not in commands[1]
+    assert key.line.split(':')[1] != ''
+    assert keys.get(TEST_FINGERPRINT) is key
+
+    assert len(keys.revoked_keys) == REVOKED_KEYS_COUNT
+    assert len(commands) == 2
+
+
+def test_user_keys_homedir(mock_gpg_commands, tmpdir):
+    """
+    Test gpg commands use GnuPG home directory of the keyring
+    """
+    commands = mock_gpg_commands.commands
+    mock_gpg_commands.handler = load_homedir_key_testdata
+    keys = UserPublicKeys(homedir=tmpdir)
+    keys.load()
+    assert len(keys) == TOTAL_KEY_COUNT
+    assert commands[0][:3] == ('gpg', '--homedir', str(tmpdir))
+
+    keys.refresh(TEST_FINGERPRINT)
+    assert commands[1][:3] == ('gpg', '--homedir', str(tmpdir))
+    assert keys.filter_keys(email=TEST_EMAIL).homedir == Path(tmpdir)
+    assert keys.get(TEST_FINGERPRINT).homedir == Path(tmpdir)
+    assert keys.trustdb.path == Path(tmpdir, 'trustdb.gpg')
+    assert UserPublicKeys(homedir=tmpdir, cache=True).cache.homedir == Path(tmpdir)
+
+
+def test_load_user_keyrings(mock_gpg_commands, tmpdir):
+    """
+    Test loading multiple user keyrings concurrently
+    """
+    homedirs = [Path(tmpdir, name) for name in ('a', 'b', 'c')]
+    mock_gpg_commands.handler = load_homedir_key_testdata
+    mock_gpg_commands.failing.add(str(homedirs[-1]))
+    assert load_user_keyrings([]) == {}
+    with pytest.raises(PGPKeyError):
+        load_user_keyrings(homedirs, jobs=0)
+
+    results = load_user_keyrings(homedirs + [str(homedirs[0])], jobs=2)
+    assert list(results) == homedirs
+    for homedir in homedirs[:2]:
+        assert results[homedir].homedir == homedir
+        assert len(results[homedir]) == TOTAL_KEY_COUNT
+    assert isinstance(results[homedirs[-1]], PGPKeyError)
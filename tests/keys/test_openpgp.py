@@ -0,0 +1,270 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.openpgp module
+"""
+import hashlib
+
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.loader import PublicKeyDataParser
+from gpg_keymanager.keys.openpgp import (
+    PACKET_TAG_PUBLIC_KEY,
+    PACKET_TAG_PUBLIC_SUB_KEY,
+    PACKET_TAG_SIGNATURE,
+    PACKET_TAG_USER_ID,
+    armor,
+    crc24,
+    dearmor,
+    get_key_fingerprint,
+    is_armored,
+    iter_openpgp_keys,
+    iter_packet_ranges,
+    iter_packets,
+    read_key_fingerprints,
+    read_openpgp_keys,
+    read_packet_data,
+    read_public_keys,
+    split_keys,
+)
+
+from ..conftest import MOCK_DATA, MOCK_KEY_FILES_DIRECTORY, MOCK_KEYS_DIRECTORY
+
+# Keys with different algorithms, revocations and expiration and gpg --show-keys output for the keys
+MOCK_OPENPGP_KEYS = MOCK_DATA.joinpath('openpgp/keys.asc')
+MOCK_OPENPGP_KEY_DATA = MOCK_DATA.joinpath('openpgp/keys.txt')
+# Time when gpg output for test keys was generated
+MOCK_OPENPGP_TIMESTAMP = 1792205200
+# Fields compared with gpg output. Later fields contain compliance flags and key origin.
+COMPARED_FIELD_COUNT = 17
+
+TEST_FINGERPRINT = '4A9D7B2E759AB0C865611D6EC8849B9ADD78F46D'
+TEAM_FINGERPRINTS = ['EA1DAF5C552EEC9BBCEE08D8E8EF3D54894DBC28', 'E5157C36FD26CD25E28603E744AED9C78AA07B50']
+TEST_CREATION_TIMESTAMP = 1700000000
+TEST_EXPIRATION = 86400
+
+
+def get_compared_fields(line: str) -> list:
+    """
+    Return gpg colon listing fields compared between gpg output and parsed keys
+    """
+    fields = line.rstrip('\r\n').split(':')
+    return (fields + [''] * COMPARED_FIELD_COUNT)[:COMPARED_FIELD_COUNT]
+
+
+def get_key_details(key):
+    """
+    Return details of PublicKey object for comparisons
+    """
+    return (
+        str(key.fingerprint),
+        key.key_id,
+        key.key_length,
+        key.key_capabilities,
+        key.expiration_timestamp,
+        [(sub_key.key_id, str(sub_key.fingerprint), sub_key.key_capabilities) for sub_key in key.sub_keys],
+        [(str(user_id), user_id.creation_date) for user_id in key.user_ids],
+    )
+
+
+def get_v6_key_data() -> bytes:
+    """
+    Return packets for a version 6 Ed25519 key with expiring self-signature
+    """
+    key = bytes([6]) + TEST_CREATION_TIMESTAMP.to_bytes(4, 'big') + bytes([27]) + (32).to_bytes(4, 'big')
+    key += bytes(range(32))
+    fingerprint = bytes.fromhex(get_key_fingerprint(key))
+    user_id = b'Test V6 <v6@example.com>'
+    hashed = (
+        bytes([5, 2]) + (TEST_CREATION_TIMESTAMP + 10).to_bytes(4, 'big') +
+        bytes([5, 9]) + TEST_EXPIRATION.to_bytes(4, 'big') +
+        bytes([2, 27, 0x03]) +
+        bytes([34, 33, 6]) + fingerprint
+    )
+    signature = bytes([6, 0x13, 27, 10]) + len(hashed).to_bytes(4, 'big') + hashed + (0).to_bytes(4, 'big')
+    return b''.join(
+        bytes([0xc0 | tag, len(body)]) + body
+        for tag, body in ((PACKET_TAG_PUBLIC_KEY, key), (PACKET_TAG_USER_ID, user_id), (2, signature))
+    )
+
+
+def strip_signatures(data: bytes, tag: int, index: int = 0) -> bytes:
+    """
+    Return packet data without signatures following specified packet of given tag
+    """
+    packets = []
+    count = 0
+    target = False
+    for packet_tag, _body, start, end in iter_packet_ranges(data):
+        if packet_tag != PACKET_TAG_SIGNATURE:
+            target = packet_tag == tag and count == index
+            count += packet_tag == tag
+        elif target:
+            continue
+        packets.append(data[start:end])
+    return b''.join(packets)
+
+
+def test_openpgp_read_key_fingerprints() -> None:
+    """
+    Test reading primary key fingerprints from armored and binary key files
+    """
+    assert read_key_fingerprints(MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc')) == [TEST_FINGERPRINT]
+    assert read_key_fingerprints(MOCK_KEY_FILES_DIRECTORY.joinpath('team/keys.pub')) == TEAM_FINGERPRINTS
+    assert read_key_fingerprints(MOCK_KEYS_DIRECTORY.joinpath('ilkka.tuohela@codento.com.asc')) == \
+        TEAM_FINGERPRINTS[:1]
+    assert read_key_fingerprints(MOCK_KEY_FILES_DIRECTORY.joinpath('invalid.asc')) == []
+
+    armored = MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc').read_bytes()
+    assert is_armored(armored)
+    assert not is_armored(read_packet_data(MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc')))
+    assert len(dearmor(armored + armored)) == 2 * len(dearmor(armored))
+
+
+def test_openpgp_packet_formats() -> None:
+    """
+    Test parsing old and new format packet headers
+    """
+    body = b'\x04' + bytes(200)
+    packets = (
+        bytes([0x99, 0, len(body)]) + body +
+        bytes([0xc0 | PACKET_TAG_USER_ID, 0xc0, len(body) - 192]) + body +
+        bytes([0xc0 | PACKET_TAG_USER_ID, 0xff]) + len(body).to_bytes(4, 'big') + body +
+        bytes([0xc0 | PACKET_TAG_USER_ID, 0xe1]) + body[:2] + bytes([0xc0, len(body) - 194]) + body[2:] +
+        bytes([0x9b]) + body
+    )
+    parsed = list(iter_packets(packets))
+    assert [tag for tag, _body in parsed] == [PACKET_TAG_PUBLIC_KEY, *[PACKET_TAG_USER_ID] * 3, PACKET_TAG_PUBLIC_KEY]
+    assert all(value == body for _tag, value in parsed)
+
+    for value in (b'\x00', b'\x99\x00', b'\x99\x00\x10\x04'):
+        with pytest.raises(PGPKeyError):
+            list(iter_packets(value))
+
+
+def test_openpgp_key_fingerprints() -> None:
+    """
+    Test calculating fingerprints for key packet versions
+    """
+    assert get_key_fingerprint(b'') is None
+    assert get_key_fingerprint(b'\x03' + bytes(10)) is None
+    body = b'\x05' + bytes(10)
+    assert get_key_fingerprint(body) == hashlib.sha256(b'\x9a\x00\x00\x00\x0b' + body).hexdigest().upper()
+    body = b'\x06' + bytes(10)
+    assert get_key_fingerprint(body) == hashlib.sha256(b'\x9b\x00\x00\x00\x0b' + body).hexdigest().upper()
+
+
+def test_openpgp_armor_errors(tmpdir) -> None:
+    """
+    Test errors reading invalid key files
+    """
+    for value in (
+            b'-----BEGIN PGP PUBLIC KEY BLOCK-----\n\nmQ==\n',
+            b'-----BEGIN PGP PUBLIC KEY BLOCK-----\n\nm!Q\n-----END PGP PUBLIC KEY BLOCK-----\n'):
+        with pytest.raises(PGPKeyError):
+            dearmor(value)
+    with pytest.raises(PGPKeyError):
+        read_packet_data(tmpdir.join('missing.asc'))
+
+
+def test_openpgp_keys_match_gpg_output() -> None:
+    """
+    Test keys parsed from packets match gpg --show-keys output for the same file
+    """
+    with MOCK_OPENPGP_KEY_DATA.open('r', encoding='utf-8') as filedescriptor:
+        expected = [get_compared_fields(line) for line in filedescriptor]
+    keys = read_openpgp_keys(MOCK_OPENPGP_KEYS)
+    lines = [line for key in keys for line in key.get_colon_lines(MOCK_OPENPGP_TIMESTAMP)]
+    assert [get_compared_fields(line) for line in lines] == expected
+
+    for path in (MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc'), MOCK_KEY_FILES_DIRECTORY.joinpath('team/keys.pub')):
+        assert [key.fingerprint for key in read_openpgp_keys(path)] == read_key_fingerprints(path)
+
+
+def test_openpgp_read_public_keys() -> None:
+    """
+    Test reading keys from file as PublicKey objects
+    """
+    with MOCK_OPENPGP_KEY_DATA.open('r', encoding='utf-8') as filedescriptor:
+        gpg_keys = list(PublicKeyDataParser().__iter_parsed_keys__(filedescriptor))
+    keyring = PublicKeyDataParser(keys=[])
+    keys = read_public_keys(MOCK_OPENPGP_KEYS, keyring=keyring, timestamp=MOCK_OPENPGP_TIMESTAMP)
+    assert [get_key_details(key) for key in keys] == [get_key_details(key) for key in gpg_keys]
+    assert [key.key_validity for key in keys] == [key.key_validity for key in gpg_keys]
+    assert all(key.keyring is keyring for key in keys)
+
+
+def test_openpgp_v6_key() -> None:
+    """
+    Test parsing version 6 key with self-signature details
+    """
+    keys = list(iter_openpgp_keys(get_v6_key_data()))
+    assert len(keys) == 1
+    key = keys[0]
+    assert key.primary.key_id == key.fingerprint[:16]
+    assert key.primary.expiration_timestamp == TEST_CREATION_TIMESTAMP + TEST_EXPIRATION
+    assert key.user_ids[0].self_signature.creation_timestamp == TEST_CREATION_TIMESTAMP + 10
+
+    fields = key.get_colon_lines(TEST_CREATION_TIMESTAMP)[0].split(':')
+    assert fields[1:7] == [
+        '-', '255', '27', key.fingerprint[:16],
+        str(TEST_CREATION_TIMESTAMP), str(TEST_CREATION_TIMESTAMP + TEST_EXPIRATION),
+    ]
+    assert fields[11] == 'scSC'
+    assert fields[16] == 'ed25519'
+    expired = key.get_colon_lines(TEST_CREATION_TIMESTAMP + TEST_EXPIRATION)
+    assert [line.split(':')[1] for line in expired if line[:3] in ('pub', 'uid')] == ['e', 'e']
+    assert expired[0].split(':')[11] == 'sc'
+
+
+def test_openpgp_key_errors() -> None:
+    """
+    Test errors parsing invalid key packets
+    """
+    data = get_v6_key_data()
+    for value in (bytes([0xc6, 6, 3]) + bytes(5), bytes([0xc6, 2, 4, 0]), data[:-8]):
+        with pytest.raises(PGPKeyError):
+            list(iter_openpgp_keys(value))
+    assert list(iter_openpgp_keys(data[2 + data[1]:])) == []
+
+
+def test_openpgp_armor_and_split_keys() -> None:
+    """
+    Test splitting packet data to keys and encoding keys as ASCII armor
+    """
+    assert crc24(b'') == 0xb704ce
+    armored = MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc').read_bytes()
+    assert armor(dearmor(armored)) == armored
+    assert dearmor(armor(bytes(range(256)))) == bytes(range(256))
+
+    data = MOCK_KEY_FILES_DIRECTORY.joinpath('team/keys.pub').read_bytes()
+    keys = split_keys(bytes([0xc0 | PACKET_TAG_USER_ID, 1, 0]) + data)
+    assert [fingerprint for fingerprint, _data in keys] == TEAM_FINGERPRINTS
+    assert b''.join(key_data for _fingerprint, key_data in keys) == data
+    assert split_keys(b'') == []
+
+
+def test_openpgp_unbound_sub_keys_and_user_ids() -> None:
+    """
+    Test sub keys and user IDs without self-signature from primary key are dropped
+    """
+    data = read_packet_data(MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc'))
+    key = list(iter_openpgp_keys(data))[0]
+    assert len(key.sub_keys) == 1
+    assert len(key.user_ids) == 2
+    assert key.get_colon_lines(MOCK_OPENPGP_TIMESTAMP)[0].split(':')[11] == 'cEC'
+
+    key = list(iter_openpgp_keys(strip_signatures(data, PACKET_TAG_PUBLIC_SUB_KEY)))[0]
+    assert key.sub_keys == []
+    assert len(key.user_ids) == 2
+    lines = key.get_colon_lines(MOCK_OPENPGP_TIMESTAMP)
+    assert lines[0].split(':')[11] == 'cC'
+    assert [line[:3] for line in lines] == ['pub', 'fpr', 'uid', 'uid']
+
+    key = list(iter_openpgp_keys(strip_signatures(data, PACKET_TAG_USER_ID, index=1)))[0]
+    assert [user_id.user_id for user_id in key.user_ids] == ['Test User: Colon <test@example.com>']
+    assert len(key.sub_keys) == 1
@@ -18,10 +18,12 @@ from gpg_keymanager.keys.constants import (
     FIELD_RECORD_TYPE,
     FIELD_USER_ID,
     KeyCapability,
+    KeyCapabilityFlag,
+    KeyValidityFlag,
     KeyValidityStatus,
     KeyRecordType,
 )
-from gpg_keymanager.keys.public_key import Fingerprint, PublicKey
+from gpg_keymanager.keys.public_key import Fingerprint, PublicKey, format_colon_record
 from gpg_keymanager.keys.loader import UserPublicKeys
 
 from ..base import MockCallArguments, mock_called_process_error
@@ -236,3 +238,89 @@ def test_public_key_update_trust_error(mock_gpg_key_list, monkeypatch) -> None:
     key = keys[0]
     with pytest.raises(PGPKeyError):
         key.update_trust('ultimate')
+
+
+# pylint: disable=unused-argument
+def test_public_key_compact_records(mock_gpg_key_list) -> None:
+    """
+    Test loaded key records are stored as raw lines with slots and decoded lazily
+    """
+    keys = UserPublicKeys()
+    keys.load()
+    key = keys.get(KEY_ID)
+    records = [key, key.fingerprint, key.primary_user_id, key.sub_keys[0], key.sub_keys[0].fingerprint]
+    for record in records:
+        assert not hasattr(record, '__dict__')
+        assert record.line.split(':', 1)[0] in ('pub', 'fpr', 'uid', 'sub')
+
+    assert key.line.startswith('pub:e:2048:1:E8EF3D54894DBC28:')
+    assert key.__data__[FIELD_KEY_VALIDITY] == 'e'
+    assert key.__data__.get('key_hash') is None
+    assert len(key.__data__) == len(KEY_FIELDS)
+    assert key.primary_user_id.user_id == USER_ID
+    assert key.primary_user_id.email == 'hile@codento.com'
+    assert key.primary_user_id.fullname == 'Ilkka Tuohela (Codento Work Key)'
+
+    other = keys[1]
+    assert key.__data__[FIELD_RECORD_TYPE] == other.__data__[FIELD_RECORD_TYPE] == 'pub'
+
+
+def test_public_key_record_formatting() -> None:
+    """
+    Test formatting records from field data
+    """
+    assert format_colon_record('pub:u:4096:\n') == 'pub:u:4096:'
+    assert format_colon_record(record_type='uid', validity=None, key_length=255) == 'uid::255'
+    with pytest.raises(PGPKeyError):
+        format_colon_record(unknown='value')
+
+    key = PublicKey(record_type='pub')
+    key.__data__[FIELD_KEY_CAPABILITIES] = ['e', 's']
+    assert key.line == 'pub:::::::::::es'
+    del key.__data__[FIELD_KEY_CAPABILITIES]
+    assert key.__data__[FIELD_KEY_CAPABILITIES] is None
+    with pytest.raises(KeyError):
+        # pylint: disable=pointless-statement
+        key.__data__['unknown']
+
+
+# pylint: disable=unused-argument
+def test_public_key_update_trust_refresh(mock_gpg_key_list, monkeypatch) -> None:
+    """
+    Test updating key trust refreshes only the updated key
+    """
+    mock_run = MockCallArguments()
+    monkeypatch.setattr('gpg_keymanager.keys.public_key.run', mock_run)
+    keys = UserPublicKeys()
+    keys.load()
+
+    mock_load = MockCallArguments()
+    monkeypatch.setattr(keys, 'load', mock_load)
+    key = keys[0]
+    key.update_trust('full')
+    assert mock_load.call_count == 0
+    assert keys[0] is key
+
+    key.keyring = None
+    key.update_trust('full')
+    assert mock_run.call_count == 2
+
+
+def test_public_key_flags() -> None:
+    """
+    Test key capability and validity bitmask flags
+    """
+    key = PublicKey('pub:f:4096:1:CB3B6A73C71838F3:1442484767::::::scESC:')
+    assert key.capability_flags == KeyCapabilityFlag.ENCRYPT | KeyCapabilityFlag.SIGN | KeyCapabilityFlag.CERTIFY
+    assert key.validity_flags == KeyValidityFlag.FULL
+    assert set(key.key_capabilities) == {KeyCapability.ENCRYPT, KeyCapability.SIGN, KeyCapability.CERTIFY}
+
+    key.__data__[FIELD_KEY_CAPABILITIES] = 'a'
+    key.__data__[FIELD_KEY_VALIDITY] = 'r'
+    assert key.capability_flags == KeyCapabilityFlag.AUTHENTICATION
+    assert key.validity_flags == KeyValidityFlag.REVOKED
+    assert key.key_capabilities == (KeyCapability.AUTHENTICATION,)
+
+    key.__update_from__(PublicKey('pub:x'))
+    assert key.capability_flags == KeyCapabilityFlag.NONE
+    assert key.validity_flags == KeyValidityFlag.INVALID
@@ -0,0 +1,73 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.snapshot module
+"""
+from pathlib import Path
+
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.loader import UserPublicKeys
+from gpg_keymanager.keys.snapshot import KeyringSnapshot, SnapshotRecord, diff
+
+from ..conftest import EXPECTED_PUBLIC_KEY_COUNT
+
+TEST_FINGERPRINT = '87DF5EA2B85E025D159888ACC660ACF1DA570475'
+TEST_KEY_ID = '0xC660ACF1DA570475'
+
+
+# pylint: disable=unused-argument
+def test_snapshot_save_load(mock_gpg_key_list, tmpdir) -> None:
+    """
+    Test saving and loading keyring snapshot
+    """
+    snapshot = UserPublicKeys().snapshot()
+    assert len(snapshot) == EXPECTED_PUBLIC_KEY_COUNT
+    fingerprints = [record.fingerprint for record in snapshot]
+    assert fingerprints == sorted(fingerprints)
+
+    path = Path(tmpdir, 'snapshots', 'keyring.json')
+    snapshot.save(path)
+    loaded = KeyringSnapshot.from_file(path)
+    assert loaded.records == snapshot.records
+    assert not diff(snapshot, loaded)
+
+    with pytest.raises(PGPKeyError):
+        KeyringSnapshot.from_file(Path(tmpdir, 'missing.json'))
+    path.write_text('{"version": 0}', encoding='utf-8')
+    with pytest.raises(PGPKeyError):
+        KeyringSnapshot.from_file(path)
+    path.write_text('{"version": 1, "keys": [[1]]}', encoding='utf-8')
+    with pytest.raises(PGPKeyError):
+        KeyringSnapshot.from_file(path)
+
+
+# pylint: disable=unused-argument
+def test_snapshot_diff(mock_gpg_key_list) -> None:
+    """
+    Test comparing keyring snapshots
+    """
+    old = UserPublicKeys().snapshot()
+    records = [SnapshotRecord(*record.as_list()) for record in old]
+    removed = [record for record in records if record.fingerprint == TEST_FINGERPRINT][0]
+    records.remove(removed)
+    records[0].validity = 'full'
+    records[-1].expiration = 1
+    added = SnapshotRecord('0' * 40, '0x' + '0' * 16, 'unknown', None, None)
+    new = KeyringSnapshot(records + [added])
+
+    changes = diff(old, new)
+    assert changes
+    assert changes.added == [added]
+    assert changes.removed == [removed]
+    assert repr(changes.removed[0]).startswith(TEST_KEY_ID)
+    assert [new for _old, new in changes.validity_changed] == [records[0]]
+    assert [new for _old, new in changes.expiration_changed] == [records[-1]]
+
+    changes = diff(KeyringSnapshot(), new)
+    assert len(changes.added) == len(new)
+    assert changes.removed == []
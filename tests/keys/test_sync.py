@@ -0,0 +1,177 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.sync module
+"""
+from pathlib import Path
+from subprocess import run
+
+from gpg_keymanager.keys.constants import KeyValidityStatus
+from gpg_keymanager.keys.directory import PublicKeyDirectory
+from gpg_keymanager.keys.loader import PublicKeyDataParser, UserPublicKeys
+from gpg_keymanager.keys.openpgp import read_key_fingerprints, read_public_keys
+from gpg_keymanager.keys.sync import get_key_update_timestamp, is_key_updated, sync_directory_to_keyring
+
+from ..base import CountingRun
+from ..conftest import MOCK_DATA, MOCK_KEY_FILES_DIRECTORY
+
+MOCK_OPENPGP_KEYS = MOCK_DATA.joinpath('openpgp/keys.asc')
+TEST_KEY_FILE = MOCK_KEY_FILES_DIRECTORY.joinpath('test.asc')
+TEAM_KEY_FILE = MOCK_KEY_FILES_DIRECTORY.joinpath('team/keys.pub')
+# Same key before and after importing revocation certificate
+MOCK_SYNC_CURRENT_DIRECTORY = MOCK_DATA.joinpath('sync/current')
+MOCK_SYNC_REVOKED_DIRECTORY = MOCK_DATA.joinpath('sync/revoked')
+
+
+def get_homedir(tmpdir) -> Path:
+    """
+    Return empty GnuPG home directory in temporary directory
+    """
+    homedir = Path(tmpdir, 'gnupg')
+    homedir.mkdir(mode=0o700)
+    return homedir
+
+
+def get_modified_key(lines, record_type, field, value, offset=0):
+    """
+    Return key parsed from colon lines with a field of a record of specified type modified
+    """
+    lines = list(lines)
+    indexes = [index for index, line in enumerate(lines) if line.split(':')[0] == record_type]
+    fields = lines[indexes[offset]].split(':')
+    fields[field] = value
+    lines[indexes[offset]] = ':'.join(fields)
+    return list(PublicKeyDataParser().__iter_parsed_keys__(lines))[0]
+
+
+def test_sync_key_updated() -> None:
+    """
+    Test detecting keys with newer self-signatures, user IDs or sub keys
+    """
+    key = read_public_keys(TEST_KEY_FILE)[0]
+    lines = key.colon_lines
+    timestamp = get_key_update_timestamp(key)
+    assert timestamp >= int(key.creation_date.timestamp())
+    assert not is_key_updated(key, key)
+
+    newer = get_modified_key(lines, 'uid', 5, str(timestamp + 1))
+    assert get_key_update_timestamp(newer) == timestamp + 1
+    assert is_key_updated(newer, key)
+    assert not is_key_updated(key, newer)
+
+    renamed = get_modified_key(lines, 'uid', 9, 'Other User <other@example.com>')
+    assert is_key_updated(renamed, key)
+    assert is_key_updated(get_modified_key(lines, 'fpr', 9, 'A' * 40, offset=1), key)
+
+
+def test_sync_key_updated_validity_and_expiration() -> None:
+    """
+    Test detecting revoked keys, sub keys and user IDs and extended expiration dates
+    """
+    key = read_public_keys(TEST_KEY_FILE)[0]
+    lines = key.colon_lines
+    expiration = key.expiration_timestamp
+    for record_type in ('pub', 'sub', 'uid'):
+        revoked = get_modified_key(lines, record_type, 1, 'r')
+        assert is_key_updated(revoked, key)
+        assert not is_key_updated(key, revoked)
+
+    extended = get_modified_key(lines, 'pub', 6, str(expiration + 1))
+    assert is_key_updated(extended, key)
+    assert not is_key_updated(key, extended)
+    assert is_key_updated(get_modified_key(lines, 'pub', 6, ''), key)
+    assert is_key_updated(get_modified_key(lines, 'sub', 6, str(expiration + 1)), key)
+
+
+def test_sync_revoked_key(monkeypatch, tmpdir) -> None:
+    """
+    Test importing revocation of key already in keyring
+    """
+    mock_run = CountingRun()
+    monkeypatch.setattr('gpg_keymanager.keys.batch.run', mock_run)
+    homedir = get_homedir(tmpdir)
+    keyring = UserPublicKeys(homedir=homedir)
+    assert len(sync_directory_to_keyring(PublicKeyDirectory(MOCK_SYNC_CURRENT_DIRECTORY), keyring).imported) == 1
+
+    keyring = UserPublicKeys(homedir=homedir)
+    assert not sync_directory_to_keyring(PublicKeyDirectory(MOCK_SYNC_CURRENT_DIRECTORY), keyring)
+    for use_gpg in (True, False):
+        directory = PublicKeyDirectory(MOCK_SYNC_REVOKED_DIRECTORY, use_gpg=use_gpg)
+        changes = sync_directory_to_keyring(directory, keyring, dry_run=True)
+        assert changes.missing == []
+        assert [key.key_validity for key in changes.updated] == [KeyValidityStatus.REVOKED]
+
+    changes = sync_directory_to_keyring(PublicKeyDirectory(MOCK_SYNC_REVOKED_DIRECTORY), keyring)
+    assert len(mock_run.commands) == 2
+    assert [key.key_validity for key in changes.imported] == [KeyValidityStatus.REVOKED]
+    keyring = UserPublicKeys(homedir=homedir)
+    assert [key.key_validity for key in keyring] == [KeyValidityStatus.REVOKED]
+    assert not sync_directory_to_keyring(PublicKeyDirectory(MOCK_SYNC_REVOKED_DIRECTORY), keyring)
+
+
+def test_sync_directory_to_keyring(monkeypatch, tmpdir) -> None:
+    """
+    Test importing key directory to empty keyring and deleting keys not in directory
+    """
+    mock_run = CountingRun()
+    monkeypatch.setattr('gpg_keymanager.keys.batch.run', mock_run)
+    homedir = get_homedir(tmpdir)
+    directory = PublicKeyDirectory(MOCK_KEY_FILES_DIRECTORY, excluded=['invalid.asc'], use_gpg=False)
+    expected = sorted(read_key_fingerprints(TEST_KEY_FILE) + read_key_fingerprints(TEAM_KEY_FILE))
+
+    keyring = UserPublicKeys(homedir=homedir)
+    changes = sync_directory_to_keyring(directory, keyring, dry_run=True)
+    assert len(changes.missing) == 3
+    assert sorted(changes.files) == sorted([TEAM_KEY_FILE, TEST_KEY_FILE])
+    assert changes.imported == []
+    assert mock_run.commands == []
+
+    changes = sync_directory_to_keyring(directory, keyring)
+    assert sorted(str(key.fingerprint) for key in changes.imported) == expected
+    assert len(mock_run.commands) == 1
+    assert sorted(str(key.fingerprint) for key in UserPublicKeys(homedir=homedir)) == expected
+
+    changes = sync_directory_to_keyring(directory, UserPublicKeys(homedir=homedir))
+    assert not changes
+    assert len(mock_run.commands) == 1
+
+    keyring = UserPublicKeys(homedir=homedir)
+    with keyring.batch() as batch:
+        batch.import_key(MOCK_OPENPGP_KEYS)
+    extra = set(read_key_fingerprints(MOCK_OPENPGP_KEYS)) - set(expected)
+    assert sync_directory_to_keyring(directory, keyring).removed == []
+    changes = sync_directory_to_keyring(directory, keyring, delete=True)
+    assert sorted(str(key.fingerprint) for key in changes.removed) == sorted(extra)
+    assert sorted(changes.deleted) == sorted(extra)
+    assert len(mock_run.commands) == 3
+    assert sorted(str(key.fingerprint) for key in UserPublicKeys(homedir=homedir)) == expected
+
+
+def test_sync_directory_keeps_secret_keys(monkeypatch, tmpdir) -> None:
+    """
+    Test keys with secret keys are not deleted from keyring with delete=True
+    """
+    monkeypatch.setattr('gpg_keymanager.keys.batch.run', CountingRun())
+    homedir = get_homedir(tmpdir)
+    run(
+        ('gpg', '--homedir', str(homedir), '--batch', '--passphrase', '', '--quick-generate-key',
+         'Secret Key <secret@example.com>', 'ed25519', 'cert', 'never'),
+        capture_output=True,
+        check=True
+    )
+    keyring = UserPublicKeys(homedir=homedir)
+    secret_keys = keyring.get_secret_key_fingerprints()
+    assert len(secret_keys) == 1
+    assert [str(key.fingerprint) for key in keyring] == list(secret_keys)
+
+    with keyring.batch() as batch:
+        batch.import_key(TEST_KEY_FILE)
+    directory = PublicKeyDirectory(MOCK_SYNC_CURRENT_DIRECTORY, use_gpg=False)
+    changes = sync_directory_to_keyring(directory, keyring, delete=True)
+    assert [str(key.fingerprint) for key in changes.removed] == read_key_fingerprints(TEST_KEY_FILE)
+    assert len(changes.imported) == 1
+    expected = list(secret_keys) + read_key_fingerprints(MOCK_SYNC_CURRENT_DIRECTORY.joinpath('revoked-test.asc'))
+    assert sorted(str(key.fingerprint) for key in UserPublicKeys(homedir=homedir)) == sorted(expected)
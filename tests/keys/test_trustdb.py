@@ -6,19 +6,32 @@
 """
 Unit tests for gpg_keymanager.keys.trustdb module
 """
+import os
+import shutil
+
 from pathlib import Path
 
 import pytest
 
 from gpg_keymanager.exceptions import PGPKeyError
 from gpg_keymanager.keys.loader import UserPublicKeys
-from gpg_keymanager.keys.trustdb import TrustDBItem
+from gpg_keymanager.keys.constants import KeyTrustDB
+from gpg_keymanager.keys.trustdb import (
+    TrustDBItem,
+    get_owner_trust,
+    load_owner_trust_file,
+    read_trustdb_file,
+)
 
-from ..base import mock_called_process_error, mock_return_false
+from ..base import MockCallArguments, mock_called_process_error, mock_return_false
 from ..conftest import (
+    EXPECTED_PUBLIC_KEY_COUNT,
     MOCK_TRUSTDB_EXISTS_METHOD,
     MOCK_TRUSTDB_RUN_METHOD,
     MOCK_KEY_DATA,
+    MOCK_OWNERTRUST_DATA,
+    MOCK_TRUSTDB_FILE,
+    load_key_testdata,
 )
 
 MOCK_TRUSTDB_STALE_PROPERTY = 'gpg_keymanager.keys.trustdb.OwnerTrustDB.stale_trust'
@@ -29,6 +42,7 @@ KEY_ID = '0xCB3B6A73C71838F3'
 MISSING_KEY_ID = 'DE134CA92809EF31'
 TRUST_FINGERPRINT = '4AEA7B607FD11C25882D7C8BCB3B6A73C71838F3'
 OTHER_FINGERPRINT = 'D91CBC43256EF761A182FF2D5A7EC13A9F145EBF'
+NEW_TRUST_FINGERPRINT = 'EA1DAF5C552EEC9BBCEE08D8E8EF3D54894DBC28'
 
 
 # pylint: disable=unused-argument
@@ -220,3 +234,155 @@ def test_trustdb_remove_stale_entries_error(monkeypatch,
 
     # First rename is for backup creation, second for restore
     assert mock_rename_method.call_count == 2
+
+
+def test_trustdb_read_file(tmpdir) -> None:
+    """
+    Test reading owner trust values from trustdb.gpg file matches gpg --export-ownertrust
+    """
+    with MOCK_OWNERTRUST_DATA.open('r', encoding='utf-8') as filedescriptor:
+        expected = [
+            (line.split(':')[0], int(line.split(':')[1]))
+            for line in filedescriptor
+            if not line.startswith('#')
+        ]
+    path = Path(tmpdir, 'trustdb.gpg')
+    shutil.copyfile(MOCK_TRUSTDB_FILE, path)
+    records = read_trustdb_file(path)
+    assert list(records) == expected
+    assert read_trustdb_file(path) is records
+
+    path.write_bytes(path.read_bytes()[:-40])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    assert read_trustdb_file(path) is not records
+
+    for value in (b'', MOCK_KEY_DATA.read_bytes()):
+        path.write_bytes(value)
+        with pytest.raises(PGPKeyError):
+            read_trustdb_file(path)
+    with pytest.raises(PGPKeyError):
+        read_trustdb_file(Path(tmpdir, 'missing.gpg'))
+
+
+# pylint: disable=unused-argument
+def test_trustdb_load_from_file(monkeypatch, mock_gpg_key_list, tmpdir) -> None:
+    """
+    Test loading owner trust database from trustdb.gpg file without running gpg
+    """
+    shutil.copyfile(MOCK_TRUSTDB_FILE, Path(tmpdir, 'trustdb.gpg'))
+    keys = UserPublicKeys(homedir=tmpdir, read_trustdb_file=True)
+    monkeypatch.setattr(
+        'gpg_keymanager.keys.trustdb.run_command_lineoutput',
+        mock_called_process_error
+    )
+    keys.trustdb.load()
+    assert len(keys.trustdb) == EXPECTED_RECORD_COUNT
+    assert keys.trustdb.get(TRUST_FINGERPRINT).trust.value == 2
+
+    # Missing trust database file is exported with gpg
+    keys = UserPublicKeys(homedir=Path(tmpdir, 'missing'), read_trustdb_file=True)
+    with pytest.raises(PGPKeyError):
+        keys.trustdb.load()
+
+
+# pylint: disable=unused-argument
+def test_trustdb_fingerprint_index(mock_gpg_key_list) -> None:
+    """
+    Test trust database fingerprint index is updated when items are modified
+    """
+    keys = UserPublicKeys()
+    trustdb = keys.trustdb
+    trust = trustdb.get(TRUST_FINGERPRINT.lower())
+    assert trust == TRUST_FINGERPRINT
+    assert trustdb.keyring_fingerprints == set(str(key.fingerprint) for key in keys)
+    assert [item.fingerprint for item in trustdb.stale_trust] == [
+        item.fingerprint for item in trustdb if item.fingerprint not in trustdb.keyring_fingerprints
+    ]
+
+    del trustdb[0]
+    with pytest.raises(PGPKeyError):
+        trustdb.get(TRUST_FINGERPRINT)
+
+    trustdb.append(trust)
+    assert trustdb.get(KEY_ID) is trust
+    trustdb[-1] = TrustDBItem(OTHER_FINGERPRINT, 6)
+    assert trustdb.get(OTHER_FINGERPRINT).trust.value == 5
+    trustdb.insert(0, TrustDBItem(OTHER_FINGERPRINT, 6))
+    assert trustdb.get(OTHER_FINGERPRINT).trust.value == 6
+
+    trustdb.clear()
+    assert trustdb.__fingerprints__ == {}
+
+
+def test_trustdb_owner_trust_file(tmpdir) -> None:
+    """
+    Test loading owner trust values from trust file
+    """
+    assert get_owner_trust('full') == KeyTrustDB.FULL
+    assert get_owner_trust('6') == KeyTrustDB.ULTIMATE
+    assert get_owner_trust(KeyTrustDB.MARGINAL) == KeyTrustDB.MARGINAL
+    for value in ('invalid', 1):
+        with pytest.raises(PGPKeyError):
+            get_owner_trust(value)
+
+    trust = load_owner_trust_file(MOCK_OWNERTRUST_DATA)
+    assert len(trust) == EXPECTED_RECORD_COUNT
+    assert trust[TRUST_FINGERPRINT] == KeyTrustDB.UNKNOWN
+
+    path = Path(tmpdir, 'trust.txt')
+    path.write_text(f'\n{OTHER_FINGERPRINT}:marginal\n', encoding='utf-8')
+    assert load_owner_trust_file(path) == {OTHER_FINGERPRINT: KeyTrustDB.MARGINAL}
+    for value in ('invalid', f'{OTHER_FINGERPRINT}:5:x'):
+        path.write_text(value, encoding='utf-8')
+        with pytest.raises(PGPKeyError):
+            load_owner_trust_file(path)
+    with pytest.raises(PGPKeyError):
+        load_owner_trust_file(Path(tmpdir, 'missing.txt'))
+
+
+# pylint: disable=unused-argument
+def test_trustdb_update_trust(monkeypatch, mock_gpg_key_list, mock_gpg_commands) -> None:
+    """
+    Test updating owner trust database from fingerprint to trust mapping
+    """
+    mock_gpg_commands.handler = load_key_testdata
+    mock_run = MockCallArguments()
+    monkeypatch.setattr(MOCK_TRUSTDB_RUN_METHOD, mock_run)
+    keys = UserPublicKeys()
+    keys.load()
+    key = keys.get(NEW_TRUST_FINGERPRINT)
+    trust = {
+        TRUST_FINGERPRINT: 'full',
+        OTHER_FINGERPRINT: 5,
+        NEW_TRUST_FINGERPRINT.lower(): KeyTrustDB.MARGINAL,
+    }
+
+    changes = keys.trustdb.update_trust(trust, dry_run=True)
+    assert [str(item) for item in changes] == [
+        f'{TRUST_FINGERPRINT}:full:',
+        f'{NEW_TRUST_FINGERPRINT}:marginal:',
+    ]
+    assert mock_run.call_count == 0
+    assert keys.trustdb.get(TRUST_FINGERPRINT).trust == KeyTrustDB.UNKNOWN
+
+    assert len(keys.trustdb.update_trust(trust)) == 2
+    assert mock_run.call_count == 1
+    assert mock_run.args[0][-1] == '--import-ownertrust'
+    assert mock_run.kwargs['input'] == bytes(f'{TRUST_FINGERPRINT}:5:\n{NEW_TRUST_FINGERPRINT}:4:\n', 'utf-8')
+    assert keys.trustdb.get(TRUST_FINGERPRINT).trust == KeyTrustDB.FULL
+    assert keys.trustdb.get(NEW_TRUST_FINGERPRINT).trust == KeyTrustDB.MARGINAL
+    assert len(keys.trustdb) == EXPECTED_RECORD_COUNT + 1
+    assert mock_gpg_commands.commands[-1][-3:] == ('--list-keys', TRUST_FINGERPRINT, NEW_TRUST_FINGERPRINT)
+    assert keys.get(NEW_TRUST_FINGERPRINT) is key
+    assert len(keys) == EXPECTED_PUBLIC_KEY_COUNT
+
+    assert keys.trustdb.update_trust(trust) == []
+    assert mock_run.call_count == 1
+
+    with pytest.raises(PGPKeyError):
+        keys.trustdb.update_trust({'invalid': 'full'})
+    monkeypatch.setattr(MOCK_TRUSTDB_RUN_METHOD, MockCallArguments(returncode=2))
+    with pytest.raises(PGPKeyError):
+        keys.trustdb.update_trust({TRUST_FINGERPRINT: 'ultimate'})
+    assert keys.trustdb.get(TRUST_FINGERPRINT).trust == KeyTrustDB.FULL
@@ -9,7 +9,7 @@ Unit tests for gpg_keymanager.keys.utils module
 import pytest
 
 from gpg_keymanager.exceptions import PGPKeyError
-from gpg_keymanager.keys.utils import validate_key_ids
+from gpg_keymanager.keys.utils import gpg_command, iter_command_lineoutput, validate_key_ids
 
 VALID_IDS = (
     '0x1234567812345678',
@@ -50,3 +50,33 @@ def test_validate_key_ids_valid_errors() -> None:
     valid_invalid = VALID_IDS + INVALID_IDS
     with pytest.raises(PGPKeyError):
         validate_key_ids(valid_invalid)
+
+
+def test_iter_command_lineoutput() -> None:
+    """
+    Test streaming command output lines
+    """
+    assert list(iter_command_lineoutput('printf', 'first\\nsecond\\n')) == ['first', 'second']
+
+    # Stop reading output of an endless command
+    lines = iter_command_lineoutput('yes', 'test')
+    assert next(lines) == 'test'
+    lines.close()
+
+
+def test_iter_command_lineoutput_errors() -> None:
+    """
+    Test errors streaming command output lines
+    """
+    with pytest.raises(PGPKeyError):
+        list(iter_command_lineoutput('false'))
+    with pytest.raises(PGPKeyError):
+        list(iter_command_lineoutput('/nonexistent/command'))
+
+
+def test_gpg_command_homedir(tmpdir) -> None:
+    """
+    Test building gpg commands with and without GnuPG home directory
+    """
+    assert gpg_command('--list-keys') == ('gpg', '--list-keys')
+    assert gpg_command('--list-keys', homedir=tmpdir) == ('gpg', '--homedir', str(tmpdir), '--list-keys')
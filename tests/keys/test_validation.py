@@ -0,0 +1,62 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for gpg_keymanager.keys.validation module
+"""
+import pytest
+
+from gpg_keymanager.exceptions import PGPKeyError
+from gpg_keymanager.keys.constants import KeyCapability, KeyCapabilityFlag, KeyValidityFlag, KeyValidityTrust
+from gpg_keymanager.keys.loader import UserPublicKeys
+from gpg_keymanager.keys.validation import get_accepted_validity_flags
+
+from ..conftest import EXPECTED_PUBLIC_KEY_COUNT
+
+EXPECTED_ENCRYPTION_KEY_COUNT = 2
+
+
+def test_validation_accepted_validity_flags() -> None:
+    """
+    Test detecting accepted validity flags for minimum validity
+    """
+    assert get_accepted_validity_flags(KeyValidityTrust.MARGINAL) == (
+        KeyValidityFlag.MARGINAL | KeyValidityFlag.FULL | KeyValidityFlag.ULTIMATE
+    )
+    assert get_accepted_validity_flags('full') == KeyValidityFlag.FULL | KeyValidityFlag.ULTIMATE
+    assert get_accepted_validity_flags('ultimate') == KeyValidityFlag.ULTIMATE
+    for value in ('invalid', KeyValidityTrust.WELL_KNOWN):
+        with pytest.raises(PGPKeyError):
+            get_accepted_validity_flags(value)
+
+
+# pylint: disable=unused-argument
+def test_validation_validate_all(mock_gpg_key_list) -> None:
+    """
+    Test validating all keys in keyring
+    """
+    keys = UserPublicKeys()
+    report = keys.validate_all()
+    assert not report
+    assert len(report) == EXPECTED_PUBLIC_KEY_COUNT
+    assert len(report.valid_keys) == EXPECTED_ENCRYPTION_KEY_COUNT
+    assert len(report.invalid_keys) == EXPECTED_PUBLIC_KEY_COUNT - EXPECTED_ENCRYPTION_KEY_COUNT
+    for result in report.errors:
+        assert result.missing_capabilities == KeyCapabilityFlag.ENCRYPT
+        assert result.validity is None
+        assert result.errors == [f'Key does not have capability {KeyCapability.ENCRYPT}']
+        assert isinstance(repr(result), str)
+
+    report = keys.validate_all(capabilities=[KeyCapability.SIGN, 'certify'], min_validity='full')
+    assert report.valid_keys == keys.validate_all().valid_keys
+    for result in report.errors:
+        assert result.missing_capabilities == KeyCapabilityFlag.NONE
+        assert result.validity in (KeyValidityFlag.EXPIRED, KeyValidityFlag.REVOKED)
+        assert len(result.errors) == 1
+
+    assert keys.filter_keys(email='hile@iki.fi').validate_all(capabilities=())
+
+    with pytest.raises(PGPKeyError):
+        keys.validate_all(capabilities=['invalid'])
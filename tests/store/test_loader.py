@@ -11,6 +11,7 @@ from pathlib import Path
 import pytest
 
 from gpg_keymanager.exceptions import PasswordStoreError
+from gpg_keymanager.keys.constants import GNUPG_HOME_ENV_VAR
 from gpg_keymanager.store.constants import ENV_VAR
 from gpg_keymanager.store.loader import PasswordStore
 from gpg_keymanager.store.secret import Secret
@@ -95,6 +96,24 @@ def test_store_loader_init(mock_valid_store) -> None:
     assert isinstance(item.relative_path, str)
 
 
+# pylint: disable=unused-argument
+def test_store_loader_gpg_homedir(monkeypatch, mock_valid_store, tmpdir) -> None:
+    """
+    Test password store with GnuPG home directory
+    """
+    monkeypatch.delenv(GNUPG_HOME_ENV_VAR, raising=False)
+    assert PasswordStore().gpg_homedir is None
+    assert GNUPG_HOME_ENV_VAR not in PasswordStore().environment
+
+    store = PasswordStore(gpg_homedir=tmpdir)
+    assert store.gpg_homedir == Path(tmpdir)
+    assert store.environment[GNUPG_HOME_ENV_VAR] == str(tmpdir)
+    subdirs = [child for child in store.children if isinstance(child, PasswordStore)]
+    assert subdirs
+    for subdir in subdirs:
+        assert subdir.gpg_homedir == Path(tmpdir)
+
+
 def test_store_loader_create_mock(tmpdir, monkeypatch) -> None:
     """
     Test initializing a password store loader object with mocked create command
@@ -132,6 +132,19 @@ def test_secret_load_gpg_data_arguments(monkeypatch) -> None:
     assert args == (('gpg', '-o-', '-d', str(secret.path)),)
 
 
+def test_secret_load_gpg_data_homedir(monkeypatch, tmpdir) -> None:
+    """
+    Test gpg command for secret in store with GnuPG home directory
+    """
+    mock_run = MockStdoutCommand()
+    monkeypatch.setattr('gpg_keymanager.store.secret.run', mock_run)
+    store = PasswordStore(gpg_homedir=tmpdir)
+    secret, _other = mock_store_secrets(store)
+    assert secret.gpg_homedir == Path(tmpdir)
+    secret.__get_gpg_file_contents__()
+    assert mock_run.args[0] == (('gpg', '--homedir', str(tmpdir), '-o-', '-d', str(secret.path)),)
+
+
 def test_secret_load_gpg_data_error(monkeypatch) -> None:
     """
     Test exception running command in __get_gpg_file_contents__